@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the engine hot paths at 2, 6, 100 and 10k players.
+
+    python bench.py --save-baseline        # once, on the machine you compare on
+    python bench.py                        # compare with bench_baseline.json
+
+Results are written as JSON. A case slower than the baseline by more than
+--tolerance is reported as a regression and the exit code is 1; without a
+baseline to compare with the exit code is 2.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import timeit
+from typing import Any, Callable, Dict, List, Optional
+
+from engine import SHARES, GameEngine
+
+PLAYER_COUNTS = [2, 6, 100, 10_000]
+DEFAULT_RESULTS = "bench_results.json"
+DEFAULT_BASELINE = "bench_baseline.json"
+DEFAULT_TOLERANCE = 0.25  # Allowed slowdown before a case counts as a regression
+DEFAULT_REPEAT = 5
+MIN_BATCH_TIME = 0.05  # Seconds per timed batch
+MIN_NUMBER = 4  # Calls per timed batch, however slow the case
+ROUND_LOAN = 1000  # Loan every player carries in the end of turn cases
+
+
+def make_game(players: int, shares: int = 1000, seed: int = 0) -> GameEngine:
+    """Game in progress where nobody runs out of money or wins"""
+    game = GameEngine(target_value=10**15, clock=lambda: 0.0, seed=seed)
+    for i in range(players):
+        game.add_player(f"Player{i}")
+    for pdata in game.player_data.values():
+        pdata.balance = 10**9
+        for share in SHARES:
+            pdata.shares[share] = shares
+    return game
+
+
+def _rotating_trade(game: GameEngine, method: str) -> Callable[[], Any]:
+    """Trade one LEAD share per call, cycling through the players"""
+    trade = getattr(game, method)
+    players = game.players
+    state = {"i": 0}
+
+    def run() -> Any:
+        i = state["i"]
+        state["i"] = (i + 1) % len(players)
+        return trade(players[i], "LEAD", 1)
+
+    return run
+
+
+def bench_buy(players: int) -> Callable[[], Any]:
+    return _rotating_trade(make_game(players), "buy")
+
+
+def bench_sell(players: int) -> Callable[[], Any]:
+    return _rotating_trade(make_game(players, shares=10**9), "sell")
+
+
+def _reset_holdings(game: GameEngine, loan: int = 0) -> None:
+    """
+    Splits double holdings and interest compounds loans; keep long runs from
+    overflowing the matrix or bankrupting the table
+    """
+    for pdata in game.player_data.values():
+        pdata.shares.update(dict.fromkeys(SHARES, 1000))
+        if loan:
+            pdata.loan = loan
+
+
+def _round_table(players: int) -> GameEngine:
+    """A table where every player pays interest, so round ends do real work"""
+    game = make_game(players)
+    _reset_holdings(game, loan=ROUND_LOAN)
+    return game
+
+
+def _keep_in_range(game: GameEngine) -> None:
+    """
+    Reset holdings and loans once splits and interest have grown them far,
+    rather than on a schedule: a reset costs as much as thousands of round
+    ends, so it should rarely land in a timed batch. Every player holds and
+    owes the same, so the first one stands for the table.
+    """
+    first = game.player_data[game.players[0]]
+    if first.loan > 1000 * ROUND_LOAN or max(first.shares.values()) > 10**9:
+        _reset_holdings(game, loan=ROUND_LOAN)
+
+
+def bench_end_turn(players: int) -> Callable[[], Any]:
+    """A whole round of turns, so every call includes one round end"""
+    game = _round_table(players)
+
+    def run() -> Any:
+        _keep_in_range(game)
+        while True:
+            result = game.end_turn()
+            if result[2]:
+                return result
+
+    return run
+
+
+def bench_end_round(players: int) -> Callable[[], Any]:
+    """Only the last turn of a round: prices, news, interest and line checks"""
+    game = _round_table(players)
+    last = len(game.players) - 1
+
+    def run() -> Any:
+        _keep_in_range(game)
+        game.current_player_index = last
+        return game.end_turn()
+
+    return run
+
+
+def bench_update_share_prices_c64(players: int) -> Callable[[], Any]:
+    return make_game(players).update_share_prices_c64
+
+
+def bench_generate_market_news(players: int) -> Callable[[], Any]:
+    game = make_game(players)
+
+    def run() -> Any:
+        game.round += 1
+        if game.round % 20 == 0:
+            _reset_holdings(game)
+        return game.generate_market_news()
+
+    return run
+
+
+def bench_calculate_final_scores(players: int) -> Callable[[], Any]:
+    return make_game(players).calculate_final_scores
+
+
+def bench_split_share(players: int) -> Callable[[], Any]:
+    """A LEAD split, then one player's holding read back"""
+    game = make_game(players)
+    shares = game.player_data[game.players[-1]].shares
+    state = {"splits": 0}
+
+    def run() -> Any:
+        state["splits"] += 1
+        if state["splits"] % 20 == 0:
+            shares["LEAD"] = 1000
+        game.split_share("LEAD")
+        game.share_prices["LEAD"] = 10
+        return shares["LEAD"]
+
+    return run
+
+
+def bench_collect_loan_interest(players: int) -> Callable[[], Any]:
+    """A round of interest with every player in debt, then one loan read back"""
+    game = make_game(players)
+    for pdata in game.player_data.values():
+        pdata.loan = 1000
+    last = game.player_data[game.players[-1]]
+    state = {"rounds": 0}
+
+    def run() -> Any:
+        state["rounds"] += 1
+        if state["rounds"] % 20 == 0:
+            last.loan = 1000
+        game.collect_loan_interest()
+        return last.loan
+
+    return run
+
+
+def bench_next_player(players: int) -> Callable[[], Any]:
+    """Turn rotation when everybody but the first and last seat is bankrupt"""
+    game = make_game(players)
+    for name in game.players[1:-1]:
+        game.player_data[name].bankrupt = True
+
+    def run() -> Any:
+        game.current_player_index = game.seats.following(game.current_player_index)
+        return game.check_last_player_standing()
+
+    return run
+
+
+CASES: Dict[str, Callable[[int], Callable[[], Any]]] = {
+    "buy": bench_buy,
+    "sell": bench_sell,
+    "end_turn": bench_end_turn,
+    "end_round": bench_end_round,
+    "update_share_prices_c64": bench_update_share_prices_c64,
+    "generate_market_news": bench_generate_market_news,
+    "calculate_final_scores": bench_calculate_final_scores,
+    "split_share": bench_split_share,
+    "collect_loan_interest": bench_collect_loan_interest,
+    "next_player": bench_next_player,
+}
+
+
+def time_case(func: Callable[[], Any], repeat: int = DEFAULT_REPEAT) -> Dict[str, Any]:
+    """Seconds per call, timed in batches long enough to hide timer overhead"""
+    timer = timeit.Timer(func)
+    number = MIN_NUMBER
+    while timer.timeit(number) < MIN_BATCH_TIME:
+        number *= 2
+    times = [t / number for t in timer.repeat(repeat, number)]
+    return {
+        "number": number,
+        "min": min(times),
+        "median": statistics.median(times),
+        "mean": statistics.fmean(times),
+        "stdev": statistics.stdev(times) if len(times) > 1 else 0.0,
+    }
+
+
+def run_benchmarks(
+    cases: List[str],
+    player_counts: List[int],
+    repeat: int = DEFAULT_REPEAT,
+    progress: Optional[Callable[[str], None]] = None,
+) -> Dict[str, Any]:
+    results = {}
+    for case in cases:
+        for players in player_counts:
+            name = f"{case}[{players}]"
+            results[name] = time_case(CASES[case](players), repeat)
+            if progress:
+                progress(f"{name}: {results[name]['median'] * 1e6:.1f} us")
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "results": results,
+    }
+
+
+def compare(
+    current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float
+) -> List[str]:
+    """Cases whose median got slower than the baseline allows"""
+    regressions = []
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        ratio = result["median"] / base["median"]
+        if ratio > 1 + tolerance:
+            regressions.append(
+                f"{name}: {base['median'] * 1e6:.1f} us -> "
+                f"{result['median'] * 1e6:.1f} us ({ratio:.2f}x)"
+            )
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--cases", default=",".join(CASES), help="comma separated cases to run"
+    )
+    parser.add_argument(
+        "--players",
+        default=",".join(map(str, PLAYER_COUNTS)),
+        help="comma separated player counts",
+    )
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--output", default=DEFAULT_RESULTS)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="store these results as the baseline instead of comparing",
+    )
+    args = parser.parse_args(argv)
+
+    current = run_benchmarks(
+        args.cases.split(","),
+        [int(p) for p in args.players.split(",")],
+        repeat=args.repeat,
+        progress=lambda line: print(line, file=sys.stderr),
+    )
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(current, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(
+            f"No baseline at {args.baseline}, run with --save-baseline first",
+            file=sys.stderr,
+        )
+        return 2
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare(current, baseline, args.tolerance)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    if not regressions:
+        print(f"No regressions against {args.baseline}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,127 @@
-from typing import Dict, List, Set, Optional, Union, TypedDict, Tuple
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Set,
+    Optional,
+    Union,
+    Tuple,
+)
 import random
+import time
+import uuid
+
+from holdings import Holdings, HoldingsRow
+from rng import CounterRandom, dump_rng_state, load_rng_state
+from seats import Seats
+from thresholds import ThresholdIndex
+
+
+def loan_interest(loan: int) -> int:
+    """One round of interest on a loan"""
+    return int(loan * 0.1) if loan > 0 else 0  # 10% interest
+
+
+class Player:
+    """
+    One seat at the table. Slotted so thousands of seats stay small; the
+    share counts live in the game's Holdings matrix and `shares` is a view of
+    this seat's row. Likewise `bankrupt` is this seat's bit in the game's
+    Seats, and writing balance or loan marks the seat changed there. The loan
+    is stamped with the interest rounds it has had and catches up when read.
+    Item access (pdata.balance) still works for old code.
+    """
+
+    __slots__ = (
+        "_balance",
+        "shares",
+        "_loan",
+        "_loan_at",
+        "trades_count",
+        "_seats",
+        "_seat",
+    )
+    FIELDS = frozenset(("balance", "shares", "loan", "bankrupt", "trades_count"))
 
-
-class PlayerData(TypedDict):
-    balance: int
-    shares: Dict[str, int]
-    loan: int
-    bankrupt: bool
-    trades_count: int  # Track number of trades per player per round
+    def __init__(
+        self, shares: HoldingsRow, balance: int = 0, seats: Optional[Seats] = None
+    ):
+        # Track bankruptcy status in the seat bitset (a table of one if none)
+        self._seats: Seats = seats if seats is not None else Seats()
+        self._seat: int = self._seats.add()
+        self.balance = balance
+        self.shares: HoldingsRow = shares
+        self._loan = 0
+        self._loan_at = self._seats.interest_rounds
+        self.trades_count: int = 0  # Track number of trades per player per round
+
+    @property
+    def balance(self) -> int:
+        return self._balance
+
+    @balance.setter
+    def balance(self, value: int) -> None:
+        self._balance = value
+        self._seats.changed.add(self._seat)
+
+    @property
+    def loan(self) -> int:
+        rounds = self._seats.interest_rounds
+        if self._loan_at != rounds:
+            loan = self._loan
+            for _ in range(rounds - self._loan_at):
+                loan += loan_interest(loan)
+            self._loan = loan
+            self._loan_at = rounds
+        return self._loan
+
+    @loan.setter
+    def loan(self, value: int) -> None:
+        seats = self._seats
+        seats.borrowers += (value > 0) - (self.loan > 0)
+        self._loan = value
+        self._loan_at = seats.interest_rounds
+        seats.changed.add(self._seat)
+
+    @property
+    def bankrupt(self) -> bool:
+        return not self._seats.is_active(self._seat)
+
+    @bankrupt.setter
+    def bankrupt(self, value: bool) -> None:
+        if value != self.bankrupt:
+            self.shares.settle()  # Splits pending from before apply as they were
+        self._seats.set_active(self._seat, not value)
+
+    def __getitem__(self, field: str) -> Any:
+        if field not in Player.FIELDS:
+            raise KeyError(field)
+        return getattr(self, field)
+
+    def __setitem__(self, field: str, value: Any) -> None:
+        if field not in Player.FIELDS:
+            raise KeyError(field)
+        setattr(self, field, value)
+
+    def __contains__(self, field: object) -> bool:
+        return field in Player.FIELDS
+
+    def get(self, field: str, default: Any = None) -> Any:
+        return getattr(self, field) if field in Player.FIELDS else default
+
+    def to_wire(self) -> Dict[str, Any]:
+        """Client payload for this player"""
+        return {
+            "balance": self.balance,
+            "shares": self.shares.to_dict(),
+            "loan": self.loan,
+            "bankrupt": self.bankrupt,
+            "trades_count": self.trades_count,
+        }
+
+    def __repr__(self) -> str:
+        return repr(self.to_wire())
 
 
 SHARES = ["LEAD", "ZINC", "TIN", "GOLD"]
@@ -15,6 +129,7 @@ SHARES = ["LEAD", "ZINC", "TIN", "GOLD"]
 INITIAL_SHARE_PRICES = {"LEAD": 10, "ZINC": 50, "TIN": 250, "GOLD": 1250}
 MIN_PRICES = {"LEAD": 1, "ZINC": 5, "TIN": 25, "GOLD": 125}  # Min 1/10 av startpris
 MAX_PRICES = {k: v * 2 for k, v in INITIAL_SHARE_PRICES.items()}
+NO_VOLUME = dict.fromkeys(SHARES, 0)  # Zeroes the volume counters in place
 INITIAL_BALANCE = 1000
 DEFAULT_TARGET_VALUE = 1000000
 DEFAULT_DIFFICULTY = 1  # 1 = easy
@@ -25,11 +140,27 @@ class GameEngine:
         self,
         difficulty: int = DEFAULT_DIFFICULTY,
         target_value: int = DEFAULT_TARGET_VALUE,
+        clock: Callable[[], float] = time.time,
+        seed: Optional[int] = None,
+        rng: Optional[random.Random] = None,
     ):
+        # Wall clock used to space out flash news (simulations pass their own)
+        self.clock = clock
+        # Each game draws from its own generator so games can be replayed
+        self.rng: random.Random = rng if rng is not None else random.Random(seed)
+
         # Player management
         self.players: List[str] = []
-        self.player_data: Dict[str, PlayerData] = {}
+        self.player_data: Dict[str, Player] = {}
         self.current_player_index: int = 0
+        # Seats not yet bankrupt, so turns skip bankrupt players in O(1)
+        self.seats: Seats = Seats()
+        # Seats that may have gone below zero or reached target_value
+        self.thresholds: ThresholdIndex = ThresholdIndex(interest=loan_interest)
+
+        # Share counts for all players, one row per seat in self.players;
+        # bankrupt seats sit out share splits
+        self.holdings: Holdings = Holdings(SHARES, skip=self.seats.out)
 
         # Share prices and market state
         self.share_prices: Dict[str, int] = INITIAL_SHARE_PRICES.copy()
@@ -37,7 +168,6 @@ class GameEngine:
         self.buy_volumes: Dict[str, int] = {k: 0 for k in SHARES}
         self.sell_volumes: Dict[str, int] = {k: 0 for k in SHARES}
         self.last_prices: Dict[str, int] = self.share_prices.copy()
-        self.last_totals: Dict[str, int] = {k: 0 for k in SHARES}
 
         # Market suspension tracking
         self.market_suspended: bool = False
@@ -52,6 +182,8 @@ class GameEngine:
         self.total_trade_attempts: int = (
             0  # Counter for all trade attempts (successful or failed)
         )
+        # Players with a nonzero trades_count, reset at the end of the round
+        self._traded: Dict[str, None] = {}
 
         # Bonus/event tracking
         self._last_bonus_share: Optional[str] = None
@@ -63,37 +195,203 @@ class GameEngine:
         # Pressure history for sustained price movements
         self.pressure_history: Dict[str, List[float]] = {s: [0.0] * 3 for s in SHARES}
 
+        # Versioned client state: wire path -> version it last changed at,
+        # kept ordered oldest to newest so patches only walk recent changes
+        self.state_id: str = uuid.uuid4().hex[:8]
+        self.version: int = 0
+        self._changes: Dict[Tuple[str, ...], int] = {}
+
     def add_player(self, name: str) -> None:
         if name not in self.players:
             self.players.append(name)
-            self.player_data[name] = {
-                "balance": INITIAL_BALANCE,
-                "shares": {k: 0 for k in SHARES},
-                "loan": 0,
-                "bankrupt": False,  # Track bankruptcy status
-                "trades_count": 0,  # Initialize trades count
-            }
+            self.player_data[name] = Player(
+                self.holdings.row(self.holdings.add_row()), INITIAL_BALANCE, self.seats
+            )
+            self._touch("players", name)
+            self._touch("players_list")
+            if len(self.players) == 1:
+                self._touch("current_player")
+
+    def _touch(self, *path: str) -> None:
+        """Record that the client visible value at path has changed"""
+        self.version += 1
+        self._changes.pop(path, None)
+        self._changes[path] = self.version
+
+    def _touch_player(self, name: str, *fields: str) -> None:
+        for field in fields:
+            self._touch("players", name, field)
+
+    def _wire_value(self, path: Tuple[str, ...]) -> Any:
+        key = path[0]
+        if key == "players":
+            if len(path) == 1:
+                return self.player_states()
+            pdata = self.player_data[path[1]]
+            if len(path) == 2:
+                return pdata.to_wire()
+            if len(path) == 3:
+                return getattr(pdata, path[2])
+            return pdata.shares[path[3]]
+        if key == "share_prices":
+            return self.share_prices[path[1]]
+        if key == "current_player":
+            return self.get_current_player()
+        if key == "players_list":
+            return list(self.players)
+        if key == "round":
+            return self.round + 1
+        return self.turn + 1
+
+    def player_states(self) -> Dict[str, Dict[str, Any]]:
+        """Plain dict copy of every player, safe to serialize"""
+        player_data = self.player_data
+        return {name: player_data[name].to_wire() for name in self.players}
+
+    def state_snapshot(self) -> Dict[str, Any]:
+        """Full client state, sent on join, reconnect or a version gap"""
+        return {
+            "id": self.state_id,
+            "v": self.version,
+            "players": self.player_states(),
+            "share_prices": dict(self.share_prices),
+            "current_player": self.get_current_player(),
+            "players_list": list(self.players),
+            "round": self.round + 1,
+            "turn": self.turn + 1,
+        }
+
+    def state_patch(self, since: int) -> Optional[Dict[str, Any]]:
+        """
+        Fields changed after version `since`, nested like state_snapshot().
+        Returns None if the patch can't be built and a snapshot is needed.
+        """
+        if since > self.version:
+            return None
+        patch: Dict[str, Any] = {"id": self.state_id, "v": self.version, "base": since}
+        for path, version in reversed(self._changes.items()):
+            if version <= since:
+                break
+            value = self._wire_value(path)
+            if len(path) == 1:
+                patch[path[0]] = value
+                continue
+            node = patch
+            for key in path[:-1]:
+                node = node.setdefault(key, {})
+            node[path[-1]] = value
+        return patch
 
     def get_current_player(self) -> Optional[str]:
         if self.players:
             return self.players[self.current_player_index]
         return None
 
+    def share_value(self, username: str) -> int:
+        """Market value of one player's shares"""
+        return self.holdings.value(self.players.index(username), self.share_prices)
+
+    def share_values(self) -> List[int]:
+        """Market value of every player's shares in seat order, in one pass"""
+        return self.holdings.values(self.share_prices)
+
     def calculate_max_loan(self, username: str) -> int:
         pdata = self.player_data[username]
-        share_value = sum(pdata["shares"][s] * self.share_prices[s] for s in SHARES)
-        return int(0.5 * (share_value + pdata["balance"]) - pdata["loan"])
+        share_value = self.share_value(username)
+        return int(0.5 * (share_value + pdata.balance) - pdata.loan)
 
     def reset_game(self) -> None:
-        self.__init__(self.difficulty, self.target_value)
+        self.__init__(self.difficulty, self.target_value, self.clock, rng=self.rng)
+
+    def configure(self, difficulty: int, target_value: int) -> None:
+        """Lobby settings chosen by the host"""
+        self.difficulty = difficulty
+        self.target_value = target_value
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Complete engine state as plain JSON-compatible data"""
+        return {
+            "difficulty": self.difficulty,
+            "target_value": self.target_value,
+            "players": [
+                [
+                    name,
+                    pdata.balance,
+                    pdata.loan,
+                    pdata.bankrupt,
+                    pdata.trades_count,
+                    pdata.shares.to_list(),
+                ]
+                for name, pdata in self.player_data.items()
+            ],
+            "current_player_index": self.current_player_index,
+            "share_prices": self.share_prices,
+            "max_prices": self.max_prices,
+            "buy_volumes": self.buy_volumes,
+            "sell_volumes": self.sell_volumes,
+            "last_prices": self.last_prices,
+            "market_suspended": self.market_suspended,
+            "suspended_shares": sorted(self.suspended_shares),
+            "suspended_shares_rounds": self.suspended_shares_rounds,
+            "turn": self.turn,
+            "round": self.round,
+            "total_trade_attempts": self.total_trade_attempts,
+            "last_bonus_share": self._last_bonus_share,
+            "last_event_share": self._last_event_share,
+            "last_flash_share": self._last_flash_share,
+            "last_news_round": self._last_news_round,
+            "flash_news_count": self._flash_news_count,
+            "last_flash_news_time": getattr(self, "_last_flash_news_time", None),
+            "pressure_history": self.pressure_history,
+            "rng": dump_rng_state(self.rng),
+        }
+
+    @classmethod
+    def from_snapshot(
+        cls, data: Dict[str, Any], clock: Callable[[], float] = time.time
+    ) -> "GameEngine":
+        """Rebuild an engine from snapshot(); clients need a fresh state_snapshot"""
+        game = cls(data["difficulty"], data["target_value"], clock=clock)
+        for name, balance, loan, bankrupt, trades_count, shares in data["players"]:
+            game.add_player(name)
+            pdata = game.player_data[name]
+            pdata.balance = balance
+            pdata.loan = loan
+            pdata.bankrupt = bankrupt
+            pdata.trades_count = trades_count
+            if trades_count:
+                game._traded[name] = None
+            pdata.shares.update(zip(SHARES, shares))
+        game.seats.fallen.clear()  # Announced before the snapshot was taken
+        game.current_player_index = data["current_player_index"]
+        game.share_prices = dict(data["share_prices"])
+        game.max_prices = dict(data["max_prices"])
+        game.buy_volumes = dict(data["buy_volumes"])
+        game.sell_volumes = dict(data["sell_volumes"])
+        game.last_prices = dict(data["last_prices"])
+        game.market_suspended = data["market_suspended"]
+        game.suspended_shares = set(data["suspended_shares"])
+        game.suspended_shares_rounds = dict(data["suspended_shares_rounds"])
+        game.turn = data["turn"]
+        game.round = data["round"]
+        game.total_trade_attempts = data["total_trade_attempts"]
+        game._last_bonus_share = data["last_bonus_share"]
+        game._last_event_share = data["last_event_share"]
+        game._last_flash_share = data["last_flash_share"]
+        game._last_news_round = data["last_news_round"]
+        game._flash_news_count = data["flash_news_count"]
+        if data["last_flash_news_time"] is not None:
+            game._last_flash_news_time = data["last_flash_news_time"]
+        game.pressure_history = {
+            s: list(history) for s, history in data["pressure_history"].items()
+        }
+        game.rng = load_rng_state(data["rng"])
+        return game
 
     def get_player_values(self) -> List[Dict[str, Union[str, int]]]:
         values = []
-        for name in self.players:
-            pdata = self.player_data[name]
-            total_value = pdata["balance"] + sum(
-                pdata["shares"][s] * self.share_prices[s] for s in SHARES
-            )
+        for name, share_value in zip(self.players, self.share_values()):
+            total_value = self.player_data[name].balance + share_value
             values.append({"name": name, "totalValue": total_value})
         return values
 
@@ -103,29 +401,35 @@ class GameEngine:
 
         # Check if player is bankrupt (like original line 515-520)
         pdata = self.player_data[username]
-        if pdata.get("bankrupt", False):
+        if pdata.bankrupt:
             return False, "Cannot trade - you are bankrupt!"
 
         price = self.share_prices[share]
         cost = price * amount
-        if pdata["balance"] >= cost:
+        if pdata.balance >= cost:
             # Only increment trades_count on successful trades
-            pdata["trades_count"] += 1
-            pdata["balance"] -= cost
-            pdata["shares"][share] += amount
+            pdata.trades_count += 1
+            self._traded[username] = None
+            pdata.balance -= cost
+            pdata.shares[share] += amount
             self.buy_volumes[share] += amount
+            self._touch_player(username, "balance", "trades_count")
+            self._touch("players", username, "shares", share)
             return True, "Bought successfully"
         else:
             max_loan = self.calculate_max_loan(username)
-            additional_needed = cost - pdata["balance"]
-            if pdata["loan"] + additional_needed <= max_loan:
+            additional_needed = cost - pdata.balance
+            if pdata.loan + additional_needed <= max_loan:
                 # Only increment trades_count on successful trades
-                pdata["trades_count"] += 1
-                pdata["loan"] += additional_needed
-                pdata["balance"] += additional_needed
-                pdata["balance"] -= cost
-                pdata["shares"][share] += amount
+                pdata.trades_count += 1
+                self._traded[username] = None
+                pdata.loan += additional_needed
+                pdata.balance += additional_needed
+                pdata.balance -= cost
+                pdata.shares[share] += amount
                 self.buy_volumes[share] += amount
+                self._touch_player(username, "balance", "loan", "trades_count")
+                self._touch("players", username, "shares", share)
                 return True, "Bought with loan"
             else:
                 return False, "Insufficient funds"
@@ -136,24 +440,28 @@ class GameEngine:
 
         # Check if player is bankrupt (like original line 515-520)
         pdata = self.player_data[username]
-        if pdata.get("bankrupt", False):
+        if pdata.bankrupt:
             return False, "Cannot trade - you are bankrupt!"
 
-        if pdata["shares"][share] >= amount:
+        if pdata.shares[share] >= amount:
             # Only increment trades_count on successful trades
-            pdata["trades_count"] += 1
-            pdata["shares"][share] -= amount
+            pdata.trades_count += 1
+            self._traded[username] = None
+            pdata.shares[share] -= amount
             sale_value = self.share_prices[share] * amount
-            pdata["balance"] += sale_value
+            pdata.balance += sale_value
             self.sell_volumes[share] += amount
+            self._touch_player(username, "balance", "trades_count")
+            self._touch("players", username, "shares", share)
 
             # Auto-repay loan if possible (like original line 3770-3795)
-            if pdata["loan"] > 0:
-                if pdata["loan"] <= pdata["balance"]:
+            if pdata.loan > 0:
+                if pdata.loan <= pdata.balance:
                     # Pay off entire loan
-                    pdata["balance"] -= pdata["loan"]
-                    loan_amount = pdata["loan"]
-                    pdata["loan"] = 0
+                    pdata.balance -= pdata.loan
+                    loan_amount = pdata.loan
+                    pdata.loan = 0
+                    self._touch_player(username, "balance", "loan")
                     return True, (
                         f"Sold successfully. Bank loan of " f"£{loan_amount} repaid"
                     )
@@ -174,27 +482,28 @@ class GameEngine:
         """Repay loan manually (Q option when selling in original)"""
         pdata = self.player_data[username]
 
-        if pdata["loan"] <= 0:
+        if pdata.loan <= 0:
             return False, "No loan to repay"
 
         if amount is None:
-            amount = min(pdata["loan"], pdata["balance"])
+            amount = min(pdata.loan, pdata.balance)
 
-        if amount > pdata["balance"]:
+        if amount > pdata.balance:
             return False, "Insufficient funds to repay that amount"
 
-        if amount > pdata["loan"]:
-            amount = pdata["loan"]
+        if amount > pdata.loan:
+            amount = pdata.loan
 
-        pdata["balance"] -= amount
-        pdata["loan"] -= amount
+        pdata.balance -= amount
+        pdata.loan -= amount
+        self._touch_player(username, "balance", "loan")
 
-        if pdata["loan"] == 0:
+        if pdata.loan == 0:
             return True, f"Loan fully repaid (£{amount})"
         else:
             return (
                 True,
-                f"Partial loan repayment (£{amount}). Remaining: £{pdata['loan']}",
+                f"Partial loan repayment (£{amount}). Remaining: £{pdata.loan}",
             )
 
     def check_bankruptcy(self, username: str) -> Tuple[bool, str]:
@@ -202,29 +511,29 @@ class GameEngine:
         pdata = self.player_data[username]
 
         # Calculate total assets including shares
-        total_asset_value = pdata["balance"]
-        for share in SHARES:
-            total_asset_value += pdata["shares"][share] * self.share_prices[share]
+        total_asset_value = pdata.balance + self.share_value(username)
 
         # If loan exceeds ability to pay even with forced liquidation
-        if pdata["loan"] > total_asset_value:
+        if pdata.loan > total_asset_value:
             # Force liquidation of all shares (line 3810)
             for share in SHARES:
-                if pdata["shares"][share] > 0:
-                    sale_value = pdata["shares"][share] * self.share_prices[share]
-                    pdata["balance"] += sale_value
-                    self.sell_volumes[share] += pdata["shares"][share]
-                    pdata["shares"][share] = 0
+                if pdata.shares[share] > 0:
+                    sale_value = pdata.shares[share] * self.share_prices[share]
+                    pdata.balance += sale_value
+                    self.sell_volumes[share] += pdata.shares[share]
+                    pdata.shares[share] = 0
+                    self._touch("players", username, "shares", share)
+            self._touch_player(username, "balance", "loan")
 
             # Try to pay loan
-            if pdata["balance"] >= pdata["loan"]:
-                pdata["balance"] -= pdata["loan"]
-                pdata["loan"] = 0
+            if pdata.balance >= pdata.loan:
+                pdata.balance -= pdata.loan
+                pdata.loan = 0
                 return False, "Forced liquidation completed. Loan repaid."
             else:
                 # Bankruptcy (line 3830)
-                pdata["balance"] = 0
-                pdata["loan"] = 0
+                pdata.balance = 0
+                pdata.loan = 0
                 return True, "YOU ARE BANKRUPT SIR!"
 
         return False, ""
@@ -243,21 +552,13 @@ class GameEngine:
         self._last_bonus_share = None
 
         # Find next non-bankrupt player
-        attempts = 0
-        while attempts < len(self.players):
-            self.current_player_index = (self.current_player_index + 1) % len(
-                self.players
-            )
-            current_player = self.players[self.current_player_index]
-
-            if not self.player_data[current_player].get("bankrupt", False):
-                break
-
-            attempts += 1
+        next_index = self.seats.following(self.current_player_index)
 
         # If all players are bankrupt, end game
-        if attempts >= len(self.players):
+        if next_index is None:
             return ["GAME OVER - ALL BANKRUPT"], [], True
+        self.current_player_index = next_index
+        self._touch("current_player")
 
         news_events: List[str] = []
         is_round_end = False
@@ -266,23 +567,28 @@ class GameEngine:
             # End of round - all players have completed their turns
             is_round_end = True
             self.round += 1
+            self._touch("round")
+            if isinstance(self.rng, CounterRandom):
+                self.rng.start_round(self.round)
             self.last_prices = self.share_prices.copy()
 
             # Reset market state
             self.suspended_shares.clear()
             self.suspended_shares_rounds.clear()
             self.collect_loan_interest()
-            self.buy_volumes = {k: 0 for k in SHARES}
-            self.sell_volumes = {k: 0 for k in SHARES}
+            self.buy_volumes.update(NO_VOLUME)
+            self.sell_volumes.update(NO_VOLUME)
 
-            # Reset trade counters for all players
-            for player_data in self.player_data.values():
-                player_data["trades_count"] = 0
+            # Reset trade counters of the players who traded this round
+            for name in self._traded:
+                self.player_data[name].trades_count = 0
+                self._touch("players", name, "trades_count")
+            self._traded.clear()
 
             # Generate market news at the end of each round
             news_events = self.generate_market_news()
 
-        winners: List[str] = []
+        # Revalue only the players who could have crossed a line below
         millionaires = self.check_millionaires()
 
         # Check for bankruptcy
@@ -291,15 +597,7 @@ class GameEngine:
             news_events.extend([""] + bankruptcy_messages)
 
         # Check for winners by total value
-        for name in self.players:
-            pdata = self.player_data[name]
-            total_value = (
-                pdata["balance"]
-                + sum(pdata["shares"][s] * self.share_prices[s] for s in SHARES)
-                - pdata["loan"]
-            )
-            if total_value >= self.target_value:
-                winners.append(name)
+        winners = [self.players[seat] for seat in sorted(self.thresholds.rich)]
 
         # Add millionaires to winners list
         if millionaires:
@@ -307,64 +605,66 @@ class GameEngine:
 
         return winners, news_events, is_round_end
 
+    def revalue(self) -> None:
+        """
+        Bring the threshold index up to date: recompute the net worth of the
+        players whose balance, loan or shares changed, and of those the price
+        moves since the last call could have taken across a line.
+        """
+        index = self.thresholds
+        due = index.advance(self.holdings.price_vector(self.share_prices))
+        due.update(self.seats.changed)
+        due.update(self.holdings.take_changed())
+        self.seats.changed.clear()
+        if index.target != self.target_value:
+            index.target = self.target_value
+            due.update(range(len(self.players)))
+
+        out = self.seats.out
+        for seat in due:
+            pdata = self.player_data[self.players[seat]]
+            net = (
+                pdata.balance
+                + self.holdings.value(seat, self.share_prices)
+                - pdata.loan
+            )
+            index.record(seat, net, self.holdings.held(seat), not out[seat], pdata.loan)
+
     def check_end_of_turn_bankruptcy(self) -> List[str]:
         """Check bankruptcy status for all players at the end of a turn"""
         bankruptcy_messages: List[str] = []
+        self.revalue()
 
-        for username, pdata in self.player_data.items():
-            # Skip already bankrupt players
-            if pdata.get("bankrupt", False):
-                continue
-
-            # Calculate total assets including shares
-            total_value = pdata["balance"]
-            for share in SHARES:
-                total_value += pdata["shares"][share] * self.share_prices[share]
-
-            # Check if player is bankrupt
-            if pdata["loan"] > total_value:
-                pdata["bankrupt"] = True
-                bankruptcy_messages.append(f"{username} IS BANKRUPT!")
+        # Players whose loan exceeds their total assets including shares
+        for seat in sorted(self.thresholds.broke):
+            username = self.players[seat]
+            self.player_data[username].bankrupt = True
+            self._touch("players", username, "bankrupt")
+            bankruptcy_messages.append(f"{username} IS BANKRUPT!")
+        self.thresholds.broke.clear()
 
         return bankruptcy_messages
 
     def check_millionaires(self) -> List[str]:
         """Check if any player has reached the target value"""
-        millionaires = []
-
-        for name in self.players:
-            if self.player_data[name].get("bankrupt", False):
-                continue
-
-            pdata = self.player_data[name]
-            total_value = (
-                pdata["balance"]
-                + sum(pdata["shares"][s] * self.share_prices[s] for s in SHARES)
-                - pdata["loan"]
-            )
-            if total_value >= self.target_value:
-                millionaires.append(name)
-
-        return millionaires
+        self.revalue()
+        out = self.seats.out
+        return [
+            self.players[seat] for seat in sorted(self.thresholds.rich) if not out[seat]
+        ]
 
     def collect_loan_interest(self) -> None:
-        """Collect interest on loans at end of round"""
-        for name in self.players:
-            pdata = self.player_data[name]
-            if pdata["loan"] > 0:
-                interest = int(pdata["loan"] * 0.1)  # 10% interest
-                pdata["loan"] += interest
+        """Collect interest on loans at end of round, as each loan is next read"""
+        self.seats.interest_rounds += 1
+        self.thresholds.charge()
+        if self.seats.borrowers:
+            self._touch("players")
 
     def update_share_prices_c64(self) -> None:
         """
         Update share prices using C64-inspired algorithm with improved volume sensitivity,
         proper bonus share price adjustments, and persistent price momentum.
         """
-        total_now: Dict[str, int] = {s: 0 for s in SHARES}
-        for pdata in self.player_data.values():
-            for s in SHARES:
-                total_now[s] += pdata["shares"][s]
-
         for i, s in enumerate(SHARES):
             # Each share has different base movement
             base_step = [1, 5, 25, 125][i]  # LEAD, ZINC, TIN, GOLD
@@ -381,10 +681,9 @@ class GameEngine:
             market_pressure = 0.0
 
             if total_volume > 0:  # Only consider pressure if there is trading
-                # Convert volumes to percentages of total shares
-                total_shares = max(
-                    1, sum(pdata["shares"][s] for pdata in self.player_data.values())
-                )
+                # Convert volumes to percentages of total shares (after a
+                # split or bonus issue the total is recomputed when asked for)
+                total_shares = max(1, self.holdings.total(s))
                 buy_percent = (buys / total_shares) * 100
                 sell_percent = (sells / total_shares) * 100
 
@@ -418,9 +717,11 @@ class GameEngine:
 
             # Random factor reduced for active trading
             if total_volume > 0:
-                r = random.randint(-1, 1)  # Smaller random factor during active trading
+                r = self.rng.randint(
+                    -1, 1
+                )  # Smaller random factor during active trading
             else:
-                r = random.randint(-2, 2)  # Larger random factor for quiet periods
+                r = self.rng.randint(-2, 2)  # Larger random factor for quiet periods
 
             # Base price change from volume
             price_change = volume_factor * base_step
@@ -466,34 +767,32 @@ class GameEngine:
                 if bias > 0:  # Upward pressure - more likely to rise
                     new_price += (
                         min_change
-                        if random.random() < (0.6 + bias * 0.2)
+                        if self.rng.random() < (0.6 + bias * 0.2)
                         else -min_change
                     )
                 elif bias < 0:  # Downward pressure - more likely to fall
                     new_price += (
                         min_change
-                        if random.random() < (0.4 + bias * 0.2)
+                        if self.rng.random() < (0.4 + bias * 0.2)
                         else -min_change
                     )
                 else:  # No pressure - random movement
-                    new_price += min_change if random.random() < 0.5 else -min_change
+                    new_price += min_change if self.rng.random() < 0.5 else -min_change
                 new_price = max(MIN_PRICES[s], min(self.max_prices[s], new_price))
 
-            self.share_prices[s] = new_price
-
-        self.last_totals = total_now.copy()
-
-    def generate_flash_news(self) -> List[str]:
-        """Generate flash news during player turn"""
-        import time
+            if new_price != p:
+                self.share_prices[s] = new_price
+                self._touch("share_prices", s)
 
+    def generate_flash_news(self, now: Optional[float] = None) -> List[str]:
+        """Generate flash news during player turn (now defaults to the clock)"""
         news_events: List[str] = []
 
         # Base chance for all events decreases with trade attempts
         event_chance = max(0.1, 1.0 - (self.total_trade_attempts * 0.02))
 
         # Prevent flash news from happening too often
-        current_time = time.time()
+        current_time = self.clock() if now is None else now
         if hasattr(self, "_last_flash_news_time"):
             if (
                 current_time - self._last_flash_news_time < 5
@@ -504,17 +803,17 @@ class GameEngine:
         # Reduce chance further based on how many have happened this round
         if not hasattr(self, "_flash_news_count"):
             self._flash_news_count = 0
-        if random.random() < (self._flash_news_count * 0.2):
+        if self.rng.random() < (self._flash_news_count * 0.2):
             return []
 
         # Base check for any event
-        if random.random() > event_chance:
+        if self.rng.random() > event_chance:
             return []  # No event due to high trade attempts
 
         news_events.append("!! NEWSFLASH !!")
 
         # Pick event type with weighted probabilities
-        event_roll = random.random()
+        event_roll = self.rng.random()
 
         # Market weakness (10% base chance)
         if event_roll < 0.1:
@@ -524,40 +823,41 @@ class GameEngine:
         # Tax investigations (higher chance with more trades)
         if self.total_trade_attempts > 3 and event_roll < 0.4:
             tax_prob = min(0.8, 0.1 + (self.total_trade_attempts * 0.05))
-            if random.random() < tax_prob:
+            if self.rng.random() < tax_prob:
                 news_events.append("CAPITAL GAINS TAX INVESTIGATIONS")
 
                 # Get current player's trade count
                 current_player = self.get_current_player()
                 trades = (
-                    self.player_data[current_player]["trades_count"]
+                    self.player_data[current_player].trades_count
                     if current_player
                     else 0
                 )
 
                 # Determine tax rate based on trading activity
                 if trades <= 5:  # Few trades: low tax
-                    r_tax = random.randint(1, 3)  # 10-30%
+                    r_tax = self.rng.randint(1, 3)  # 10-30%
                 elif trades <= 10:  # Moderate trades: medium tax
-                    r_tax = random.randint(3, 5)  # 30-50%
+                    r_tax = self.rng.randint(3, 5)  # 30-50%
                 else:  # Many trades: high tax
-                    r_tax = random.randint(5, 9)  # 50-90%
+                    r_tax = self.rng.randint(5, 9)  # 50-90%
 
-                if random.random() < 0.2:  # 20% chance of relenting
+                if self.rng.random() < 0.2:  # 20% chance of relenting
                     news_events.append("TAX OFFICE RELENTS !...NO TAX DEMAND")
                 else:
                     tax_rate = r_tax * 10
                     news_events.append(f"DEMAND OF {tax_rate}% OF BANK BALANCE")
                     if current_player:
                         pdata = self.player_data[current_player]
-                        tax = int(pdata["balance"] * (r_tax * 0.1))
-                        pdata["balance"] = max(0, pdata["balance"] - tax)
+                        tax = int(pdata.balance * (r_tax * 0.1))
+                        pdata.balance = max(0, pdata.balance - tax)
+                        self._touch("players", current_player, "balance")
                 return news_events
 
         # Trading practice investigation (more likely with high trades)
         if self.total_trade_attempts > 10 and event_roll < 0.6:
             investigate_prob = min(0.9, 0.2 + (self.total_trade_attempts * 0.05))
-            if random.random() < investigate_prob:
+            if self.rng.random() < investigate_prob:
                 news_events.append("TRADING PRACTICES UNDER SUSPICION")
                 news_events.append("TAX OFFICIALS INVESTIGATE")
                 return news_events
@@ -565,21 +865,17 @@ class GameEngine:
         # Bonus shares (less likely with more trades)
         if event_roll < 0.8:
             bonus_prob = max(0.1, 1.0 - (self.total_trade_attempts * 0.02))
-            if random.random() < bonus_prob:
-                chosen_share = SHARES[random.randint(0, len(SHARES) - 1)]
+            if self.rng.random() < bonus_prob:
+                chosen_share = SHARES[self.rng.randint(0, len(SHARES) - 1)]
                 news_events.append(f"{chosen_share} SHARES BONUS ISSUE OF 1 SHARE")
                 news_events.append("FOR EVERY TWO SHARES HELD")
 
-                # Apply bonus to all players
-                for player in self.player_data.values():
-                    if chosen_share in player["shares"]:
-                        bonus_shares = player["shares"][chosen_share] // 2
-                        player["shares"][chosen_share] += bonus_shares
+                self.issue_bonus(chosen_share)
                 return news_events
 
         # Tax refund (fallback event)
         news_events.append("TAX .. REFUND")
-        r_refund = random.randint(0, 9)
+        r_refund = self.rng.randint(0, 9)
         if r_refund == 0:
             news_events.append("ERROR IN TAX OFFICE ! NO REFUND")
         else:
@@ -589,12 +885,35 @@ class GameEngine:
             current_player = self.get_current_player()
             if current_player:
                 pdata = self.player_data[current_player]
-                refund = int(pdata["balance"] * (0.1 * r_refund))
-                pdata["balance"] += refund
+                refund = int(pdata.balance * (0.1 * r_refund))
+                pdata.balance += refund
+                self._touch("players", current_player, "balance")
 
         self._flash_news_count += 1
         return news_events
 
+    def issue_bonus(self, share: str) -> None:
+        """One bonus share for every two held, for all players"""
+        prices = self.holdings.price_vector(self.share_prices)
+        self.holdings.bonus(share)  # Each row catches up when next read
+        # A holding of h grows by h // 2, worth at most half the price per share
+        self.thresholds.action(prices, prices, -(-self.share_prices[share] // 2))
+        self._touch("players")
+
+    def split_share(self, share: str) -> None:
+        """Two for every one held for players still in the game; halves the price"""
+        before = self.holdings.price_vector(self.share_prices)
+        self.holdings.split(share)  # Each row catches up when next read
+        old_price = self.share_prices[share]
+        self.share_prices[share] = max(MIN_PRICES[share], old_price // 2)
+        after = self.holdings.price_vector(self.share_prices)
+        # A holding of h is now 2h at the new price
+        self.thresholds.action(
+            before, after, abs(2 * self.share_prices[share] - old_price)
+        )
+        self._touch("players")
+        self._touch("share_prices", share)
+
     def generate_market_news(self) -> List[str]:
         """Generate market news at the end of each round"""
         news_events: List[str] = []
@@ -604,30 +923,24 @@ class GameEngine:
 
         # Market suspension events
         if not self.suspended_shares:  # Only check if no shares are suspended
-            if random.random() < event_chance * 0.2:  # 20% of event_chance
-                chosen_share = random.choice(SHARES)
+            if self.rng.random() < event_chance * 0.2:  # 20% of event_chance
+                chosen_share = self.rng.choice(SHARES)
                 if chosen_share not in self.suspended_shares:
                     self.suspended_shares.add(chosen_share)
-                    self.suspended_shares_rounds[chosen_share] = random.randint(1, 3)
+                    self.suspended_shares_rounds[chosen_share] = self.rng.randint(1, 3)
                     news_events.append(f"{chosen_share} MARKET DEALINGS SUSPENDED")
 
         # Share split events (with cooldown and reduced probability)
-        if random.random() < event_chance * 0.2:  # 20% of event_chance
+        if self.rng.random() < event_chance * 0.2:  # 20% of event_chance
             # Avoid recently split shares
             eligible_shares = [s for s in SHARES if s != self._last_event_share]
             if eligible_shares:  # Only proceed if we have eligible shares
-                chosen_share = random.choice(eligible_shares)
+                chosen_share = self.rng.choice(eligible_shares)
                 self._last_event_share = chosen_share
                 news_events.append(f"{chosen_share} SHARES SPLIT")
                 news_events.append("TWO FOR EVERY ONE HELD")
 
-                # Apply split to all players
-                for player in self.player_data.values():
-                    if not player.get("bankrupt", False):
-                        player["shares"][chosen_share] *= 2
-                self.share_prices[chosen_share] = max(
-                    MIN_PRICES[chosen_share], self.share_prices[chosen_share] // 2
-                )
+                self.split_share(chosen_share)
 
         # Process suspended shares
         for share in list(self.suspended_shares):
@@ -658,24 +971,22 @@ class GameEngine:
 
     def check_last_player_standing(self) -> Optional[str]:
         """Check if only one non-bankrupt player remains"""
-        active_players = [
-            name
-            for name in self.players
-            if not self.player_data[name].get("bankrupt", False)
-        ]
-        return active_players[0] if len(active_players) == 1 else None
+        if self.seats.count != 1:
+            return None
+        return self.players[self.seats.first()]
+
+    def take_bankruptcies(self) -> List[str]:
+        """Players gone bankrupt since the last call, in seat order"""
+        return [self.players[i] for i in sorted(self.seats.take_fallen())]
 
     def calculate_final_scores(self) -> List[Dict[str, Union[str, int]]]:
         """Calculate final scores and rankings"""
         results = []
 
-        for name in self.players:
+        for name, share_value in zip(self.players, self.share_values()):
             pdata = self.player_data[name]
 
-            total_value = pdata["balance"]
-            for share in SHARES:
-                total_value += pdata["shares"][share] * self.share_prices[share]
-            total_value -= pdata["loan"]
+            total_value = pdata.balance + share_value - pdata.loan
 
             profit_made = total_value - INITIAL_BALANCE
             divisor = max(1, self.round + self.difficulty * 5)
@@ -0,0 +1,199 @@
+"""
+Share holdings for every player stored as one players x shares integer matrix
+"""
+
+from array import array
+from itertools import repeat
+from operator import add, mul
+from typing import Dict, Iterator, List, MutableMapping, Optional, Sequence, Set
+
+# Corporate actions, applied to a column's cells as they are read
+SPLIT = 0  # Two for every one held, except in skipped rows
+BONUS = 1  # One more for every two held, rounded down, in every row
+
+
+class Holdings:
+    """
+    Row-major matrix of share counts backed by a single array('q').
+    Row i belongs to seat i, column k to the k-th share in SHARES, so the
+    value of every portfolio is one matrix-vector product with the prices.
+
+    Splits and bonus issues only append to the column's list of actions;
+    each cell remembers how many of them it has had (its epoch) and catches
+    up when it is read, one action at a time so rounding is as if they had
+    been applied at once. Rows in `skip` (bankrupt seats) don't take part in
+    splits, and must be settled before their skip flag changes.
+
+    Column totals are kept up to date by every write until an action, then
+    recomputed when next asked for. The offsets of rows written to are
+    collected in `changed`.
+    """
+
+    def __init__(self, shares: Sequence[str], skip: Optional[bytearray] = None):
+        self.shares = tuple(shares)
+        self.width = len(self.shares)
+        self.column: Dict[str, int] = {s: k for k, s in enumerate(self.shares)}
+        self.matrix = array("q")
+        self.epochs = array("q")
+        self.rows = 0
+        self.actions: List[List[int]] = [[] for _ in self.shares]
+        self.skip = skip if skip is not None else bytearray()
+        # Shares outstanding per column (Python ints: the sum can outgrow q),
+        # exact while totals_at matches the column's number of actions
+        self.totals: List[int] = [0] * self.width
+        self.totals_at: List[int] = [0] * self.width
+        self.changed: Set[int] = set()
+
+    def add_row(self) -> int:
+        self.matrix.extend(repeat(0, self.width))
+        self.epochs.extend(len(actions) for actions in self.actions)
+        self.rows += 1
+        return self.rows - 1
+
+    def row(self, i: int) -> "HoldingsRow":
+        return HoldingsRow(self, i)
+
+    def split(self, share: str) -> None:
+        self.actions[self.column[share]].append(SPLIT)
+
+    def bonus(self, share: str) -> None:
+        self.actions[self.column[share]].append(BONUS)
+
+    def cell(self, i: int, k: int) -> int:
+        """Cell at offset i (column k), brought up to date"""
+        actions = self.actions[k]
+        epoch = self.epochs[i]
+        if epoch == len(actions):
+            return self.matrix[i]
+        amount = self.matrix[i]
+        skipped = i // self.width < len(self.skip) and self.skip[i // self.width]
+        for action in actions[epoch:]:
+            if action == BONUS:
+                amount += amount // 2
+            elif not skipped:
+                amount *= 2
+        self.matrix[i] = amount
+        self.epochs[i] = len(actions)
+        return amount
+
+    def settle(self, start: int) -> None:
+        """Bring the row at offset start up to date"""
+        for k in range(self.width):
+            self.cell(start + k, k)
+
+    def settle_column(self, k: int) -> None:
+        """Bring a column's cells up to date, and its total with them"""
+        actions = self.actions[k]
+        if self.totals_at[k] != len(actions):
+            width = self.width
+            for i in range(k, len(self.matrix), width):
+                self.cell(i, k)
+            self.totals[k] = sum(self.matrix[k::width])
+            self.totals_at[k] = len(actions)
+
+    def settle_columns(self) -> None:
+        for k in range(self.width):
+            self.settle_column(k)
+
+    def get(self, i: int, share: str) -> int:
+        k = self.column[share]
+        return self.cell(i * self.width + k, k)
+
+    def set(self, i: int, share: str, amount: int) -> None:
+        self.put(i * self.width, self.column[share], amount)
+
+    def put(self, start: int, k: int, amount: int) -> None:
+        """Write one cell (row offset start, column k) and its column total"""
+        i = start + k
+        old = self.cell(i, k)
+        self.matrix[i] = amount  # Raises on overflow before the total changes
+        if self.totals_at[k] == len(self.actions[k]):
+            self.totals[k] += amount - old
+        self.changed.add(start)
+
+    def price_vector(self, prices: Dict[str, int]) -> List[int]:
+        return [prices[s] for s in self.shares]
+
+    def value(self, i: int, prices: Dict[str, int]) -> int:
+        """Market value of a single row"""
+        start = i * self.width
+        end = start + self.width
+        self.settle(start)
+        return sum(map(mul, self.matrix[start:end], self.price_vector(prices)))
+
+    def values(self, prices: Dict[str, int]) -> List[int]:
+        """Market value of every row, computed column by column"""
+        self.settle_columns()
+        totals = list(repeat(0, self.rows))
+        width = self.width
+        for k, price in enumerate(self.price_vector(prices)):
+            column = self.matrix[k::width]
+            totals = list(map(add, totals, map(mul, column, repeat(price))))
+        return totals
+
+    def held(self, i: int) -> int:
+        """Number of shares in a single row"""
+        start = i * self.width
+        end = start + self.width
+        self.settle(start)
+        return sum(self.matrix[start:end])
+
+    def take_changed(self) -> List[int]:
+        """Rows written to since the last call"""
+        changed, self.changed = self.changed, set()
+        return [start // self.width for start in changed]
+
+    def total(self, share: str) -> int:
+        k = self.column[share]
+        self.settle_column(k)
+        return self.totals[k]
+
+    def column_totals(self) -> Dict[str, int]:
+        """Total number of each share held across all rows"""
+        self.settle_columns()
+        return dict(zip(self.shares, self.totals))
+
+
+class HoldingsRow(MutableMapping[str, int]):
+    """Dict-style view of one player's row, so pdata["shares"][share] still works"""
+
+    __slots__ = ("_holdings", "_start")
+
+    def __init__(self, holdings: Holdings, i: int):
+        self._holdings = holdings
+        self._start = i * holdings.width
+
+    def __getitem__(self, share: str) -> int:
+        k = self._holdings.column[share]
+        return self._holdings.cell(self._start + k, k)
+
+    def __setitem__(self, share: str, amount: int) -> None:
+        self._holdings.put(self._start, self._holdings.column[share], amount)
+
+    def __delitem__(self, share: str) -> None:
+        raise TypeError("Shares can't be removed from a holdings row")
+
+    def __contains__(self, share: object) -> bool:
+        return share in self._holdings.column
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._holdings.shares)
+
+    def __len__(self) -> int:
+        return self._holdings.width
+
+    def settle(self) -> None:
+        self._holdings.settle(self._start)
+
+    def to_list(self) -> List[int]:
+        """Share counts in SHARES order"""
+        start = self._start
+        end = start + self._holdings.width
+        self._holdings.settle(start)
+        return self._holdings.matrix[start:end].tolist()
+
+    def to_dict(self) -> Dict[str, int]:
+        return dict(zip(self._holdings.shares, self.to_list()))
+
+    def __repr__(self) -> str:
+        return repr(self.to_dict())
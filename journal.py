@@ -0,0 +1,147 @@
+"""
+Append-only journal of game commands with periodic snapshots, so games
+survive a server restart. Recovery loads the last snapshot and replays
+the commands journaled after it.
+
+Each journal line is a compact JSON array: [seq, op, *args]
+"""
+
+import json
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from engine import GameEngine
+
+DEFAULT_SNAPSHOT_EVERY = 200  # Commands between snapshots
+
+# Commands that change engine state; read-only calls are never journaled
+COMMANDS = {
+    "add_player": lambda game, *args: game.add_player(*args),
+    "buy": lambda game, *args: game.buy(*args),
+    "sell": lambda game, *args: game.sell(*args),
+    "repay_loan": lambda game, *args: game.repay_loan(*args),
+    "end_turn": lambda game: game.end_turn(),
+    "flash_news": lambda game, now: game.generate_flash_news(now),
+    "configure": lambda game, *args: game.configure(*args),
+}
+
+
+def apply_command(game: GameEngine, op: str, args: Tuple[Any, ...]) -> Any:
+    return COMMANDS[op](game, *args)
+
+
+def replay_command(game: GameEngine, op: str, args: Tuple[Any, ...]) -> None:
+    """Apply a journaled command, failing the same way it did when recorded"""
+    try:
+        apply_command(game, op, args)
+    except Exception:  # pylint: disable=broad-except
+        pass
+
+
+class GameJournal:
+    """Journal and snapshot files for one game in a directory"""
+
+    def __init__(
+        self,
+        directory: str,
+        game_id: str,
+        snapshot_every: int = DEFAULT_SNAPSHOT_EVERY,
+        fsync: bool = False,
+    ):
+        self.directory = directory
+        self.game_id = game_id
+        self.snapshot_every = snapshot_every
+        self.fsync = fsync
+        self.journal_path = os.path.join(directory, f"{game_id}.journal")
+        self.snapshot_path = os.path.join(directory, f"{game_id}.snapshot.json")
+        self.seq = 0  # Sequence number of the last journaled command
+        self._since_snapshot = 0
+        self._file = None
+        os.makedirs(directory, exist_ok=True)
+
+    def append(self, op: str, args: Tuple[Any, ...]) -> None:
+        if self._file is None:
+            self._file = open(self.journal_path, "a", encoding="utf-8")
+        self.seq += 1
+        self._since_snapshot += 1
+        self._file.write(json.dumps([self.seq, op, *args], separators=(",", ":")))
+        self._file.write("\n")
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def needs_snapshot(self) -> bool:
+        return self._since_snapshot >= self.snapshot_every
+
+    def write_snapshot(self, game: GameEngine) -> None:
+        """Save the full state and start an empty journal after it"""
+        data = {"seq": self.seq, "saved_at": time.time(), "game": game.snapshot()}
+        tmp_path = self.snapshot_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+
+        # Commands up to seq are in the snapshot. If we crash before the
+        # truncation below, replay skips them by sequence number.
+        self.close()
+        open(self.journal_path, "w", encoding="utf-8").close()
+        self._since_snapshot = 0
+
+    def load(self, clock: Callable[[], float] = time.time) -> Optional[GameEngine]:
+        """Rebuild the game from the snapshot and journal tail, if any"""
+        game = None
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, encoding="utf-8") as f:
+                data = json.load(f)
+            self.seq = data["seq"]
+            game = GameEngine.from_snapshot(data["game"], clock=clock)
+
+        for seq, op, args in self._read_journal():
+            if seq <= self.seq:
+                continue
+            if game is None:
+                break  # Journal without its first snapshot can't be replayed
+            replay_command(game, op, args)
+            self.seq = seq
+            self._since_snapshot += 1
+        return game
+
+    def _read_journal(self) -> List[Tuple[int, str, Tuple[Any, ...]]]:
+        if not os.path.exists(self.journal_path):
+            return []
+        entries = []
+        with open(self.journal_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    seq, op, *args = json.loads(line)
+                except ValueError:
+                    break  # Torn write at the end of the file after a crash
+                entries.append((seq, op, tuple(args)))
+        return entries
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def delete(self) -> None:
+        self.close()
+        for path in (self.journal_path, self.snapshot_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def journaled_game_ids(directory: str) -> List[str]:
+    """Games with a journal or snapshot in the directory"""
+    if not os.path.isdir(directory):
+        return []
+    game_ids: Dict[str, None] = {}
+    for filename in sorted(os.listdir(directory)):
+        for suffix in (".journal", ".snapshot.json"):
+            if filename.endswith(suffix):
+                game_ids[filename[: -len(suffix)]] = None
+    return list(game_ids)
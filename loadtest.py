@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+Load generator: many python-socketio AsyncClients play scripted games
+against a running server and report latency, fan-out and throughput.
+
+    python app.py &
+    python loadtest.py --clients 400 --players 4 --rounds 5 --label eventlet
+
+Every action is emitted with an ack callback, so round-trip time is measured
+until the server has finished the handler. Fan-out is the time until every
+client at the table has received the state broadcast the action caused.
+Needs aiohttp for the asyncio client: pip install "python-socketio[asyncio_client]"
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import socketio
+
+from engine import SHARES
+
+DEFAULT_URL = "http://localhost:5000"
+DEFAULT_TIMEOUT = 10.0  # Seconds to wait for an ack or broadcast
+STATE_EVENTS = ("update", "patch")  # Events that carry game state to the table
+BATCH_EVENT = "batch"  # Several events in one frame, as [[event, data], ...]
+CONNECT_CONCURRENCY = 50  # Connections opened at the same time
+
+
+class LoadClient:
+    """One simulated player with a Socket.IO connection"""
+
+    def __init__(
+        self, username: str, state_events: Sequence[str], serializer: str = "json"
+    ):
+        self.username = username
+        self.state_events = frozenset(state_events)
+        self.expand: Optional[Callable[[Any], Dict[str, Any]]] = None
+        packet_class: Any = "default"
+        if serializer == "msgpack":
+            # pylint: disable=import-outside-toplevel
+            from server.msgpack_codec import MsgPackPacket, expand_snapshot
+
+            self.expand = expand_snapshot
+            packet_class = MsgPackPacket
+        self.sio = socketio.AsyncClient(reconnection=False, serializer=packet_class)
+        self.sio.on("*", self._on_event)
+        self.received = 0
+        self.frames = 0
+        self.current_player: Optional[str] = None
+        self.game_over = False
+        self._waiters: List[asyncio.Future] = []
+
+    async def _on_event(self, event: str, *args: Any) -> None:
+        self.frames += 1
+        if event == BATCH_EVENT and args:
+            for inner, data in args[0]:
+                self._dispatch(inner, data)
+        else:
+            self._dispatch(event, *args)
+
+    def _dispatch(self, event: str, *args: Any) -> None:
+        now = time.perf_counter()
+        self.received += 1
+        if event == "game_over":
+            self.game_over = True
+        if event not in self.state_events:
+            return
+        state = args[0] if args else None
+        if isinstance(state, list) and self.expand is not None:
+            state = self.expand(state)  # Compact msgpack snapshot
+        if isinstance(state, dict) and "current_player" in state:
+            self.current_player = state["current_player"]
+        waiters, self._waiters = self._waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(now)
+
+    def expect_state(self) -> asyncio.Future:
+        """Future resolved with the arrival time of the next state event"""
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        return waiter
+
+    async def call(self, event: str, data: Dict[str, Any]) -> float:
+        """Emit an event and return the time the server acked it"""
+        acked = asyncio.get_running_loop().create_future()
+
+        def on_ack(*_args: Any) -> None:
+            if not acked.done():
+                acked.set_result(time.perf_counter())
+
+        await self.sio.emit(event, data, callback=on_ack)
+        return await acked
+
+
+class LoadStats:
+    """Latency samples in seconds, grouped by name"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+        self.timeouts = 0
+        self.errors = 0
+        self.acked = 0
+        self.events_received = 0
+        self.frames_received = 0
+
+    def add(self, name: str, seconds: float) -> None:
+        self.samples.setdefault(name, []).append(seconds)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        result = {}
+        for name, samples in sorted(self.samples.items()):
+            samples = sorted(samples)
+            result[name] = {
+                "count": len(samples),
+                "p50_ms": _percentile(samples, 0.50) * 1000,
+                "p95_ms": _percentile(samples, 0.95) * 1000,
+                "p99_ms": _percentile(samples, 0.99) * 1000,
+                "max_ms": samples[-1] * 1000,
+            }
+        return result
+
+
+def _percentile(samples: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of sorted samples"""
+    return samples[max(0, math.ceil(fraction * len(samples)) - 1)]
+
+
+async def timed_action(
+    stats: LoadStats,
+    table: List[LoadClient],
+    client: LoadClient,
+    event: str,
+    data: Dict[str, Any],
+    timeout: float,
+) -> None:
+    """Run one action and record its round trip and table fan-out"""
+    waiters = [other.expect_state() for other in table]
+    start = time.perf_counter()
+    try:
+        acked = await asyncio.wait_for(client.call(event, data), timeout)
+        stats.acked += 1
+        stats.add(event, acked - start)
+        arrived = await asyncio.wait_for(asyncio.gather(*waiters), timeout)
+        stats.add(f"{event}_fanout", max(arrived) - start)
+    except asyncio.TimeoutError:
+        stats.timeouts += 1
+    finally:
+        for waiter in waiters:
+            waiter.cancel()
+
+
+async def play_table(
+    url: str,
+    game_id: str,
+    players: int,
+    rounds: int,
+    stats: LoadStats,
+    connect_slots: asyncio.Semaphore,
+    state_events: Sequence[str],
+    transports: Optional[List[str]],
+    timeout: float,
+    rng: random.Random,
+    serializer: str = "json",
+) -> None:
+    """Connect a table of clients, start a game and play scripted rounds"""
+    table = [
+        LoadClient(f"{game_id}_p{i}", state_events, serializer) for i in range(players)
+    ]
+    try:
+        for client in table:
+            async with connect_slots:
+                start = time.perf_counter()
+                await client.sio.connect(
+                    url, transports=transports, wait_timeout=timeout
+                )
+                stats.add("connect", time.perf_counter() - start)
+            join = {"username": client.username, "game_id": game_id}
+            start = time.perf_counter()
+            acked = await asyncio.wait_for(client.call("join", join), timeout)
+            stats.add("join", acked - start)
+
+        host = table[0]
+        settings = {"difficulty": 1, "goal": 10**9}  # Nobody wins during the run
+        await timed_action(stats, table, host, "start_game", settings, timeout)
+
+        by_name = {client.username: client for client in table}
+        turn = 0
+        for _ in range(rounds * players):
+            if any(client.game_over for client in table):
+                break
+            # Follow the server's turn order, falling back to join order
+            client = by_name.get(host.current_player or "", table[turn % players])
+            turn += 1
+            share = rng.choice(SHARES)
+            trade = {"username": client.username, "share": share, "amount": 1}
+            await timed_action(stats, table, client, "buy", trade, timeout)
+            await timed_action(stats, table, client, "sell", trade, timeout)
+            end_turn = {"username": client.username}
+            await timed_action(stats, table, client, "end_turn", end_turn, timeout)
+    except (socketio.exceptions.ConnectionError, asyncio.TimeoutError) as e:
+        stats.errors += 1
+        print(f"{game_id}: {e!r}", file=sys.stderr)
+    finally:
+        stats.events_received += sum(client.received for client in table)
+        stats.frames_received += sum(client.frames for client in table)
+        await asyncio.gather(
+            *(client.sio.disconnect() for client in table if client.sio.connected)
+        )
+
+
+async def run_load(
+    url: str,
+    clients: int,
+    players: int,
+    rounds: int,
+    label: str,
+    state_events: Sequence[str] = STATE_EVENTS,
+    transports: Optional[List[str]] = None,
+    timeout: float = DEFAULT_TIMEOUT,
+    seed: int = 0,
+    serializer: str = "json",
+) -> Dict[str, Any]:
+    """Play clients // players tables at once and return the report"""
+    stats = LoadStats()
+    rng = random.Random(seed)
+    connect_slots = asyncio.Semaphore(CONNECT_CONCURRENCY)
+    tables = max(1, clients // players)
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(
+            play_table(
+                url,
+                f"load{i}",
+                players,
+                rounds,
+                stats,
+                connect_slots,
+                state_events,
+                transports,
+                timeout,
+                random.Random(rng.random()),
+                serializer,
+            )
+            for i in range(tables)
+        )
+    )
+    elapsed = time.perf_counter() - start
+    return {
+        "label": label,
+        "url": url,
+        "clients": tables * players,
+        "tables": tables,
+        "rounds": rounds,
+        "transports": transports or ["polling", "websocket"],
+        "serializer": serializer,
+        "elapsed_s": elapsed,
+        "actions_per_s": stats.acked / elapsed,
+        "events_received_per_s": stats.events_received / elapsed,
+        "frames_received_per_s": stats.frames_received / elapsed,
+        "timeouts": stats.timeouts,
+        "errors": stats.errors,
+        "latency": stats.summary(),
+    }
+
+
+def format_reports(reports: List[Dict[str, Any]]) -> str:
+    """Side by side table of p50/p95/p99 per event for one or more runs"""
+    lines = []
+    for report in reports:
+        lines.append(
+            f"== {report['label']}: {report['clients']} clients, "
+            f"{report['actions_per_s']:.0f} actions/s, "
+            f"{report['events_received_per_s']:.0f} events/s in "
+            f"{report.get('frames_received_per_s', 0):.0f} frames/s received, "
+            f"{report['timeouts']} timeouts, {report['errors']} errors"
+        )
+        for name, row in report["latency"].items():
+            lines.append(
+                f"  {name:18} n={row['count']:<7} p50={row['p50_ms']:8.2f}ms "
+                f"p95={row['p95_ms']:8.2f}ms p99={row['p99_ms']:8.2f}ms"
+            )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default=DEFAULT_URL)
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--players", type=int, default=4, help="clients per table")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument(
+        "--label", default="unknown", help="async_mode of the server under test"
+    )
+    parser.add_argument(
+        "--transport",
+        choices=["websocket", "polling"],
+        help="force one transport (default: polling upgraded to websocket)",
+    )
+    parser.add_argument(
+        "--state-events",
+        default=",".join(STATE_EVENTS),
+        help="comma separated events that carry state to every client",
+    )
+    parser.add_argument(
+        "--serializer",
+        choices=["json", "msgpack"],
+        default="json",
+        help="must match the server's --serializer",
+    )
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write the report to this file")
+    parser.add_argument(
+        "--compare", nargs="+", metavar="REPORT", help="print saved reports and exit"
+    )
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        reports = []
+        for path in args.compare:
+            with open(path, encoding="utf-8") as f:
+                reports.append(json.load(f))
+        print(format_reports(reports))
+        return
+
+    report = asyncio.run(
+        run_load(
+            args.url,
+            args.clients,
+            args.players,
+            args.rounds,
+            args.label,
+            state_events=args.state_events.split(","),
+            transports=[args.transport] if args.transport else None,
+            timeout=args.timeout,
+            seed=args.seed,
+            serializer=args.serializer,
+        )
+    )
+    print(format_reports([report]))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Random number generators for GameEngine
+"""
+
+import hashlib
+import os
+import random
+import struct
+from operator import length_hint
+from typing import Any, Callable, List, Optional, Tuple
+
+TWO_POW_MINUS_53 = 2.0**-53
+
+
+class CounterRandom(random.Random):
+    """
+    Counter-based generator: block n of round r is SHAKE-256(seed, r, n),
+    so every round has its own stream that can be regenerated without
+    replaying the draws of earlier rounds. Words are drawn a block at a
+    time in one hash call instead of one state update per number.
+    """
+
+    BLOCK_WORDS = 256  # 64-bit words pre-drawn per refill
+
+    def __init__(self, seed: Any = None):
+        self._key = b""
+        self._stream = 0
+        self._counter = 0
+        self._words: List[int] = []
+        self._next_word: Callable[[], int] = iter(self._words).__next__
+        super().__init__(seed)
+
+    def seed(self, a: Any = None, version: int = 2) -> None:
+        if a is None:
+            a = os.urandom(32)
+        self._key = hashlib.blake2b(repr(a).encode(), digest_size=32).digest()
+        self.gauss_next = None
+        self.start_round(0)
+
+    def start_round(self, stream: int) -> None:
+        """Switch to the stream for a round and pre-draw its first block"""
+        self._stream = stream
+        self._counter = 0
+        self._refill()
+
+    def _refill(self) -> None:
+        block = hashlib.shake_256(
+            self._key + struct.pack("<QQ", self._stream, self._counter)
+        ).digest(8 * self.BLOCK_WORDS)
+        self._counter += 1
+        self._words = list(struct.unpack(f"<{self.BLOCK_WORDS}Q", block))
+        self._next_word = iter(self._words).__next__
+
+    def _word(self) -> int:
+        try:
+            return self._next_word()
+        except StopIteration:
+            self._refill()
+            return self._next_word()
+
+    def random(self) -> float:
+        try:
+            word = self._next_word()
+        except StopIteration:
+            self._refill()
+            word = self._next_word()
+        return (word >> 11) * TWO_POW_MINUS_53
+
+    def getrandbits(self, k: int) -> int:
+        if k <= 64:
+            return self._word() >> (64 - k)
+        value = 0
+        for _ in range((k + 63) // 64):
+            value = (value << 64) | self._word()
+        return value >> (-k % 64)
+
+    def getstate(self) -> Tuple[bytes, int, int, int]:
+        # Block counter and position are enough to redraw the current block
+        remaining = length_hint(self._next_word.__self__)  # type: ignore
+        return self._key, self._stream, self._counter - 1, remaining
+
+    def setstate(self, state: Tuple[bytes, int, int, int]) -> None:
+        self._key, self._stream, self._counter, remaining = state
+        self._refill()
+        for _ in range(self.BLOCK_WORDS - remaining):
+            self._next_word()
+
+
+RNG_KINDS = {"mt": random.Random, "counter": CounterRandom}
+
+
+def make_rng(kind: str = "mt", seed: Optional[Any] = None) -> random.Random:
+    """Mersenne Twister ("mt", the stdlib default) or "counter" generator"""
+    return RNG_KINDS[kind](seed)
+
+
+def dump_rng_state(rng: random.Random) -> List[Any]:
+    """Generator kind and state as JSON-compatible lists"""
+    if isinstance(rng, CounterRandom):
+        key, stream, counter, remaining = rng.getstate()
+        return ["counter", [key.hex(), stream, counter, remaining]]
+    version, internal, gauss_next = rng.getstate()
+    return ["mt", [version, list(internal), gauss_next]]
+
+
+def load_rng_state(data: List[Any]) -> random.Random:
+    kind, state = data
+    rng = RNG_KINDS[kind]()
+    if kind == "counter":
+        key, stream, counter, remaining = state
+        rng.setstate((bytes.fromhex(key), stream, counter, remaining))
+    else:
+        version, internal, gauss_next = state
+        rng.setstate((version, tuple(internal), gauss_next))
+    return rng
@@ -0,0 +1,394 @@
+"""
+Room registry that lets one server process host many game tables
+"""
+
+import logging
+import queue
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from engine import GameEngine
+from metrics import Histogram
+from journal import (
+    COMMANDS,
+    DEFAULT_SNAPSHOT_EVERY,
+    GameJournal,
+    apply_command,
+    journaled_game_ids,
+)
+from store import WriteBehind
+
+DEFAULT_GAME_ID = "default"
+DEFAULT_MAX_ROOMS = 500
+DEFAULT_IDLE_TIMEOUT = 30 * 60  # Seconds without players or activity
+MAX_GAME_ID_LENGTH = 32
+MAX_BATCH = 64  # Commands applied before their broadcasts are flushed
+STATE_UPDATE = "state"  # Outbox marker for the game state broadcast
+SAVE_AFTER = {"add_player", "configure", "end_turn"}  # Commands that snapshot
+
+log = logging.getLogger("stockmarket.rooms")
+
+COMMAND_SECONDS = Histogram(
+    "stockmarket_command_seconds", "Engine command run time", ["op"]
+)
+ROUND_END_SECONDS = Histogram(
+    "stockmarket_round_end_seconds",
+    "Run time of end_turn commands that end a round (prices, news, interest)",
+)
+
+
+class RoomLimitError(Exception):
+    """Raised when a new room is requested while the registry is full"""
+
+
+def normalize_game_id(game_id: Optional[str]) -> str:
+    """Turn a client supplied table name into a registry key (and file name)"""
+    game_id = re.sub(r"[^a-z0-9_-]", "", str(game_id or "").lower())
+    return game_id[:MAX_GAME_ID_LENGTH] or DEFAULT_GAME_ID
+
+
+class Outbox:
+    """
+    Events produced while a room applies a batch of commands. They are sent
+    in order once the batch is done, with the game state broadcast coalesced
+    into one at the position of the last command that asked for it.
+    """
+
+    def __init__(self):
+        self.events: List[Tuple[str, Any, Optional[str]]] = []
+        self._full_state = False
+
+    def emit(self, event: str, data: Any = None, to: Optional[str] = None) -> None:
+        """Queue an event for one socket (to=sid) or the whole room"""
+        self.events.append((event, data, to))
+
+    def send_state(self, full: bool = False) -> None:
+        """Broadcast the game state, as a full snapshot if full"""
+        self._full_state = self._full_state or full
+        self.events.append((STATE_UPDATE, None, None))
+
+    def drain(self) -> Iterator[Tuple[str, Any, Optional[str]]]:
+        """Events to send; the state marker carries whether it must be full"""
+        markers = [
+            i for i, (event, _, _) in enumerate(self.events) if event == STATE_UPDATE
+        ]
+        for i, (event, data, to) in enumerate(self.events):
+            if event != STATE_UPDATE:
+                yield event, data, to
+            elif i == markers[-1]:
+                yield STATE_UPDATE, self._full_state, None
+        self.events = []
+        self._full_state = False
+
+
+# A command runs on the room's worker as command(room, outbox, *args)
+Command = Callable[..., None]
+QueuedCommand = Tuple[Command, Tuple[Any, ...], threading.Event]
+
+
+class Room:
+    """One game table: an engine plus the lobby state that used to be global"""
+
+    def __init__(
+        self,
+        game_id: str,
+        now: float,
+        game: Optional[GameEngine] = None,
+        journal: Optional[GameJournal] = None,
+        store: Optional[WriteBehind] = None,
+    ):
+        self.game_id: str = game_id
+        self.game: GameEngine = game if game is not None else GameEngine()
+        self.journal: Optional[GameJournal] = journal
+        self.store: Optional[WriteBehind] = store
+        self.host_player: Optional[str] = None
+        self.sent_version: int = 0  # Game state version last broadcast
+        # ((codec, state id, version), snapshot encoded by the server)
+        self.snapshot_cache: Optional[Tuple[Tuple[Any, str, int], Any]] = None
+        self.sids: Set[str] = set()
+        self.last_active: float = now
+        # Commands from every socket at the table, applied by one worker. Any
+        # queue with put_nowait, get_nowait and empty will do; the asyncio
+        # backend swaps in an asyncio.Queue before starting the worker.
+        self.commands: "queue.Queue[Optional[QueuedCommand]]" = queue.Queue()
+        self._worker_started = False
+        self._worker_lock = threading.Lock()
+        # Commands run but not yet journaled, when saving is deferred to save()
+        self.unsaved: Optional[List[Tuple[str, Tuple[Any, ...]]]] = None
+        self._unsaved_reset = False
+
+    def touch(self, now: float) -> None:
+        self.last_active = now
+
+    def run(self, op: str, *args: Any) -> Any:
+        """Apply a state changing command to the game and journal it"""
+        if op not in COMMANDS:
+            raise ValueError(f"Unknown command: {op}")
+        if op == "flash_news" and not args:
+            args = (self.game.clock(),)
+        start = time.perf_counter()
+        try:
+            result = apply_command(self.game, op, args)
+        finally:
+            seconds = time.perf_counter() - start
+            COMMAND_SECONDS.labels(op).observe(seconds)
+            # Journaled even if it raised, replay fails the same way
+            if self.unsaved is None:
+                self._save_commands([(op, args)])
+            else:
+                self.unsaved.append((op, args))
+        if op == "end_turn" and result[2]:
+            ROUND_END_SECONDS.observe(seconds)
+        return result
+
+    def defer_saves(self) -> None:
+        """Leave journal and store writes to save(), e.g. to run them off the loop"""
+        if self.unsaved is None:
+            self.unsaved = []
+
+    def save(self) -> None:
+        """Write what the commands run since the last save changed"""
+        commands, self.unsaved = self.unsaved or [], []
+        if self._unsaved_reset:
+            # The snapshot covers the new game and whatever ran after the reset
+            self._unsaved_reset = False
+            self._save_snapshot()
+        else:
+            self._save_commands(commands)
+
+    def _save_commands(self, commands: List[Tuple[str, Tuple[Any, ...]]]) -> None:
+        if self.journal is not None:
+            for op, args in commands:
+                self.journal.append(op, args)
+            if self.journal.needs_snapshot():
+                self.journal.write_snapshot(self.game)
+        if self.store is not None and any(op in SAVE_AFTER for op, _ in commands):
+            self.store.save(self.game_id, self.game)
+
+    def _save_snapshot(self) -> None:
+        if self.journal is not None:
+            self.journal.write_snapshot(self.game)
+        if self.store is not None:
+            self.store.save(self.game_id, self.game)
+
+    def submit(
+        self, command: Command, *args: Any, done: Optional[threading.Event] = None
+    ) -> threading.Event:
+        """Queue a command; the event is set once its broadcasts are sent"""
+        if done is None:
+            done = threading.Event()
+        self.commands.put_nowait((command, args, done))
+        return done
+
+    def claim_worker(self) -> bool:
+        """True for the one caller that should start this room's worker"""
+        with self._worker_lock:
+            if self._worker_started:
+                return False
+            self._worker_started = True
+            return True
+
+    def next_batch(self, max_batch: int = MAX_BATCH) -> Optional[List[QueuedCommand]]:
+        """Wait for a command and take whatever else is queued behind it"""
+        return self.take_batch(self.commands.get(), max_batch)
+
+    def take_batch(
+        self, item: Optional[QueuedCommand], max_batch: int = MAX_BATCH
+    ) -> Optional[List[QueuedCommand]]:
+        """A command taken off the queue and whatever else is queued behind it"""
+        if item is None:
+            return None
+        batch = [item]
+        # Only the worker takes from the queue, so it can't empty in between
+        while len(batch) < max_batch and not self.commands.empty():
+            item = self.commands.get_nowait()
+            if item is None:
+                self.commands.put_nowait(None)  # Stop after this batch
+                break
+            batch.append(item)
+        return batch
+
+    def serve(self, flush: Callable[["Room", Outbox], None]) -> None:
+        """Worker loop: apply queued commands in order, flush once per batch"""
+        while True:
+            batch = self.next_batch()
+            if batch is None:
+                return
+            try:
+                flush(self, self.apply((command, args) for command, args, _ in batch))
+            finally:
+                for _, _, done in batch:
+                    done.set()
+
+    def apply(self, commands: Iterable[Tuple[Command, Tuple[Any, ...]]]) -> Outbox:
+        """Run commands in order; one failing doesn't stop the rest"""
+        outbox = Outbox()
+        for command, args in commands:
+            try:
+                command(self, outbox, *args)
+            except Exception:  # pylint: disable=broad-except
+                log.exception("command failed", extra={"room": self.game_id})
+        return outbox
+
+    def close(self) -> None:
+        """Stop the worker once the commands already queued are done"""
+        self.commands.put_nowait(None)
+
+    def reset(self) -> None:
+        """Start a fresh game at the same table (play again)"""
+        self.game = GameEngine()
+        self.host_player = None
+        self.sent_version = 0
+        self.snapshot_cache = None
+        if self.unsaved is None:
+            self._save_snapshot()
+        else:
+            self.unsaved = []  # Commands of the old game need no journaling
+            self._unsaved_reset = True
+
+    def is_idle(self, now: float, idle_timeout: float) -> bool:
+        return not self.sids and now - self.last_active >= idle_timeout
+
+
+class RoomRegistry:
+    """Keeps live rooms keyed by game id and maps socket ids to their room"""
+
+    def __init__(
+        self,
+        max_rooms: int = DEFAULT_MAX_ROOMS,
+        idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+        clock: Callable[[], float] = time.monotonic,
+        journal_dir: Optional[str] = None,
+        snapshot_every: int = DEFAULT_SNAPSHOT_EVERY,
+        store: Optional[WriteBehind] = None,
+    ):
+        self.max_rooms = max_rooms
+        self.idle_timeout = idle_timeout
+        self.journal_dir = journal_dir  # None keeps games in memory only
+        self.snapshot_every = snapshot_every
+        self.store = store  # Latest snapshot per game, written behind
+        self._clock = clock
+        self._rooms: Dict[str, Room] = {}
+        self._sid_rooms: Dict[str, str] = {}
+        self._evicted: List[str] = []  # Evicted to make room for a new one
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._rooms)
+
+    def __contains__(self, game_id: str) -> bool:
+        return normalize_game_id(game_id) in self._rooms
+
+    def get(self, game_id: str) -> Optional[Room]:
+        return self._rooms.get(normalize_game_id(game_id))
+
+    def rooms(self) -> List[Room]:
+        return list(self._rooms.values())
+
+    def get_or_create(self, game_id: Optional[str]) -> Room:
+        game_id = normalize_game_id(game_id)
+        with self._lock:
+            return self._get_or_create(game_id)
+
+    def _get_or_create(self, game_id: str) -> Room:
+        now = self._clock()
+        room = self._rooms.get(game_id)
+        if room is None:
+            if len(self._rooms) >= self.max_rooms:
+                self._evicted.extend(self._evict_idle(now))
+            if len(self._rooms) >= self.max_rooms:
+                raise RoomLimitError(f"All {self.max_rooms} game tables are in use")
+            room = Room(game_id, now, journal=self._journal(game_id), store=self.store)
+            if room.journal is not None:
+                room.journal.write_snapshot(room.game)
+            self._rooms[game_id] = room
+        room.touch(now)
+        return room
+
+    def _journal(self, game_id: str) -> Optional[GameJournal]:
+        if self.journal_dir is None:
+            return None
+        return GameJournal(self.journal_dir, game_id, self.snapshot_every)
+
+    def recover(self) -> List[str]:
+        """Rebuild journaled or stored games after a restart"""
+        recovered = []
+        with self._lock:
+            now = self._clock()
+            # The journal has every command, the store the last snapshot
+            journaled = journaled_game_ids(self.journal_dir or "")
+            stored = self.store.game_ids() if self.store is not None else []
+            for game_id in dict.fromkeys(journaled + stored):
+                if game_id in self._rooms or len(self._rooms) >= self.max_rooms:
+                    continue
+                journal = self._journal(game_id)
+                game = journal.load() if journal else None
+                if game is None and self.store is not None:
+                    game = self.store.load(game_id)
+                if game is None:
+                    continue
+                room = Room(game_id, now, game=game, journal=journal, store=self.store)
+                # The host isn't saved; the first player joined first
+                room.host_player = game.players[0] if game.players else None
+                self._rooms[game_id] = room
+                recovered.append(game_id)
+        return recovered
+
+    def join(self, sid: str, game_id: Optional[str]) -> Room:
+        """Bind a socket to a room, leaving whichever room it was in before"""
+        game_id = normalize_game_id(game_id)
+        with self._lock:
+            room = self._get_or_create(game_id)
+            previous = self._sid_rooms.get(sid)
+            if previous is not None and previous != game_id:
+                self._unbind(sid)
+            self._sid_rooms[sid] = game_id
+            room.sids.add(sid)
+            return room
+
+    def room_for(self, sid: str) -> Optional[Room]:
+        """Room the socket has joined, marking it as active"""
+        room = self._rooms.get(self._sid_rooms.get(sid, ""))
+        if room is not None:
+            room.touch(self._clock())
+        return room
+
+    def leave(self, sid: str) -> Optional[Room]:
+        """Unbind a socket (on disconnect); the room lingers until evicted"""
+        with self._lock:
+            return self._unbind(sid)
+
+    def _unbind(self, sid: str) -> Optional[Room]:
+        room = self._rooms.get(self._sid_rooms.pop(sid, ""))
+        if room is not None:
+            room.sids.discard(sid)
+            room.touch(self._clock())
+        return room
+
+    def evict_idle(self) -> List[str]:
+        """Drop rooms nobody is connected to that have been quiet too long"""
+        with self._lock:
+            return self._evict_idle(self._clock())
+
+    def take_evicted(self) -> List[str]:
+        """Rooms evicted since the last call to make space for new ones"""
+        with self._lock:
+            evicted, self._evicted = self._evicted, []
+        return evicted
+
+    def _evict_idle(self, now: float) -> List[str]:
+        evicted = [
+            game_id
+            for game_id, room in self._rooms.items()
+            if room.is_idle(now, self.idle_timeout)
+        ]
+        for game_id in evicted:
+            room = self._rooms.pop(game_id)
+            room.close()
+            if room.journal is not None:
+                room.journal.delete()
+            if room.store is not None:
+                room.store.delete(game_id)
+        return evicted
@@ -0,0 +1,67 @@
+"""
+Which seats at a table are still in the game, as one bitset over seat numbers
+"""
+
+from typing import List, Optional, Set
+
+
+class Seats:
+    """
+    Bit i of `active` is set while seat i is not bankrupt, so the next player
+    to move is the lowest set bit above the current seat and the last player
+    standing is a check of `count`. `out` holds the same flags one byte per
+    seat (1 = bankrupt) for constant time lookups and zip() over the table.
+    Seats leaving the game are queued in `fallen` until they are announced,
+    and `changed` collects seats whose standing, balance or loan changed.
+    Loans catch up on the rounds of interest charged when they are read.
+    """
+
+    def __init__(self):
+        self.active = 0
+        self.count = 0  # Seats with their bit set
+        self.size = 0
+        self.out = bytearray()
+        self.fallen: List[int] = []
+        self.changed: Set[int] = set()
+        self.interest_rounds = 0  # Rounds of loan interest charged so far
+        self.borrowers = 0  # Seats with a loan
+
+    def add(self) -> int:
+        """A new active seat after the existing ones"""
+        self.active |= 1 << self.size
+        self.out.append(0)
+        self.count += 1
+        self.size += 1
+        return self.size - 1
+
+    def is_active(self, i: int) -> bool:
+        return not self.out[i]
+
+    def set_active(self, i: int, active: bool) -> None:
+        if active == self.is_active(i):
+            return
+        self.active ^= 1 << i
+        self.out[i] = not active
+        self.changed.add(i)
+        if active:
+            self.count += 1
+        else:
+            self.count -= 1
+            self.fallen.append(i)
+
+    def following(self, i: int) -> Optional[int]:
+        """The first active seat after seat i, wrapping around (i itself last)"""
+        later = self.active >> (i + 1)
+        if later:
+            return i + (later & -later).bit_length()
+        if self.active:
+            return (self.active & -self.active).bit_length() - 1
+        return None
+
+    def first(self) -> Optional[int]:
+        return self.following(-1)
+
+    def take_fallen(self) -> List[int]:
+        """Seats that left the game since the last call and are still out"""
+        fallen, self.fallen = self.fallen, []
+        return [i for i in dict.fromkeys(fallen) if not self.is_active(i)]
@@ -0,0 +1,6 @@
+"""
+Stockmarket game server. The Socket.IO handlers are written once in
+server.core and served by the backend chosen in server.run:
+
+    python -m server --backend eventlet|gevent|threading|asgi
+"""
@@ -0,0 +1,3 @@
+from server.run import main
+
+main()
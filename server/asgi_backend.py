@@ -0,0 +1,266 @@
+"""
+Native asyncio backend: python-socketio AsyncServer as an ASGI app served by
+uvicorn. No monkey patching; GameServer routes the events as for the other
+backends, and each table's commands run on an asyncio task.
+Needs: pip install "uvicorn[standard]"
+"""
+
+import asyncio
+import json
+import os
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qsl
+
+import jinja2
+import socketio
+
+from metrics import CONTENT_TYPE
+from rooms import Outbox, Room, RoomRegistry
+from server import fastjson
+from server.cluster import Cluster, cluster_from_url
+from server.core import (
+    COMMAND_TIMEOUT,
+    EVENT_SECONDS,
+    EVENTS,
+    GameServer,
+    Transport,
+    admin_allowed,
+    metrics_text,
+    switch_room_debug,
+    use_serializer,
+)
+from server.logs import log
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class AsyncServerTransport(Transport):
+    """
+    Transport for AsyncServer. Emits are queued for one sender task that
+    awaits them in order. Each room's commands run on an asyncio task, with
+    the journal and store writes moved to a thread.
+    """
+
+    def __init__(self, sio: socketio.AsyncServer):
+        self.sio = sio
+        self._outgoing: "asyncio.Queue[Any]" = asyncio.Queue()
+        self._sender: Optional[asyncio.Future] = None
+
+    def emit(
+        self,
+        event: str,
+        data: Any = None,
+        to: Optional[str] = None,
+        skip_sid: Tuple[str, ...] = (),
+    ) -> None:
+        self._outgoing.put_nowait((event, data, to, skip_sid))
+        if self._sender is None:
+            self._sender = self.sio.start_background_task(self._send)
+
+    async def _send(self) -> None:
+        while True:
+            item = await self._outgoing.get()
+            if isinstance(item, asyncio.Future):
+                item.set_result(None)  # Everything emitted before it is sent
+                continue
+            event, data, to, skip_sid = item
+            try:
+                await self.sio.emit(event, data, to=to, skip_sid=list(skip_sid) or None)
+            except Exception:  # pylint: disable=broad-except
+                log.exception("emit failed", extra={"event": event})
+
+    async def sent(self) -> None:
+        """Wait until everything emitted so far has been sent"""
+        if self._sender is not None:
+            marker = asyncio.get_running_loop().create_future()
+            self._outgoing.put_nowait(marker)
+            await marker
+
+    def enter_room(self, sid: str, room: str) -> None:
+        self.sio.enter_room(sid, room)
+
+    def leave_room(self, sid: str, room: str) -> None:
+        self.sio.leave_room(sid, room)
+
+    def start_background_task(self, target: Callable[..., Any], *args: Any) -> Any:
+        return self.sio.start_background_task(target, *args)
+
+    def event(self) -> Any:
+        return asyncio.Event()
+
+    def start_worker(self, room: Room, flush: Callable[[Room, Outbox], None]) -> None:
+        room.commands = asyncio.Queue()  # type: ignore[assignment]
+        room.defer_saves()
+        self.sio.start_background_task(self.serve_room, room, flush)
+
+    async def serve_room(
+        self, room: Room, flush: Callable[[Room, Outbox], None]
+    ) -> None:
+        """Apply the room's commands in order and emit once per batch"""
+        while True:
+            batch = room.take_batch(await room.commands.get())  # type: ignore[misc]
+            if batch is None:
+                return  # Closed, e.g. evicted
+            try:
+                outbox = room.apply((command, args) for command, args, _ in batch)
+                # File writes; the game doesn't change until the next batch
+                await asyncio.to_thread(room.save)
+                flush(room, outbox)
+                await self.sent()
+            finally:
+                for _, _, done in batch:
+                    done.set()
+
+    def every(self, seconds: float, callback: Callable[[], None]) -> None:
+        async def repeat() -> None:
+            while True:
+                await self.sio.sleep(seconds)
+                callback()
+
+        self.sio.start_background_task(repeat)
+
+    def from_thread(self, callback: Callable[..., None]) -> Callable[..., None]:
+        loop = asyncio.get_running_loop()
+        return lambda *args: loop.call_soon_threadsafe(callback, *args)
+
+
+class AsyncGameServer(GameServer):
+    """GameServer on an AsyncServer: handlers await their commands"""
+
+    def __init__(
+        self,
+        sio: socketio.AsyncServer,
+        rooms: Optional[RoomRegistry] = None,
+        command_timeout: float = COMMAND_TIMEOUT,
+        cluster: Optional[Cluster] = None,
+    ):
+        super().__init__(AsyncServerTransport(sio), rooms, command_timeout, cluster)
+
+    async def handle(  # pylint: disable=invalid-overridden-method
+        self, event: str, sid: str, data: Any = None
+    ) -> None:
+        """Entry point for every client event"""
+        start = time.perf_counter()
+        try:
+            pending = self.dispatch(event, sid, data)
+            if pending is not None:
+                try:
+                    await asyncio.wait_for(pending.done.wait(), self.command_timeout)
+                except asyncio.TimeoutError:
+                    pending.expired()
+        finally:
+            EVENT_SECONDS.labels(event).observe(time.perf_counter() - start)
+
+
+def render_page(page: str, bundle_dir: str, msgpack: bool = False) -> bytes:
+    """Render a Flask template once, with url_for pointing at /static"""
+    env = jinja2.Environment(
+        loader=jinja2.FileSystemLoader(os.path.join(bundle_dir, "templates"))
+    )
+
+    def url_for(endpoint: str, filename: str) -> str:
+        return f"/{endpoint}/{filename}"
+
+    html = env.get_template(page).render(url_for=url_for, msgpack=msgpack)
+    return html.encode("utf-8")
+
+
+async def respond(send: Any, status: int, body: bytes, content_type: str) -> None:
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", content_type.encode("ascii"))],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+def page_app(html: bytes, server: AsyncGameServer) -> Any:
+    """
+    Minimal ASGI app: GET /metrics for Prometheus; /debug/<room> and
+    /profile with the admin token; everything else gets the game page.
+    """
+
+    async def app(scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            return
+        path = scope["path"]
+        if path == "/metrics":
+            body = metrics_text(server.rooms).encode("utf-8")
+            await respond(send, 200, body, CONTENT_TYPE)
+            return
+        if path == "/profile" or path.startswith("/debug/"):
+            headers = dict(scope.get("headers") or ())
+            authorization = headers.get(b"authorization")
+            if not admin_allowed(authorization and authorization.decode("latin-1")):
+                await respond(send, 403, b"Forbidden", "text/plain")
+                return
+        if path == "/profile":
+            query = dict(parse_qsl(scope.get("query_string", b"").decode("latin-1")))
+            body, content_type = server.profiler.handle_request(
+                scope["method"], query.get("event"), query.get("format")
+            )
+            await respond(send, 200, body, content_type)
+            return
+        if path.startswith("/debug/") and scope["method"] in ("POST", "DELETE"):
+            reply = switch_room_debug(path[7:], scope["method"] == "POST")
+            await respond(send, 200, json.dumps(reply).encode(), "application/json")
+            return
+        await respond(send, 200, html, "text/html; charset=utf-8")
+
+    return app
+
+
+def create_app(
+    page: str = "index.html",
+    bundle_dir: str = BASE_DIR,
+    log_packets: bool = False,
+    serializer: str = "json",
+    broker: Optional[str] = None,
+) -> Tuple[socketio.ASGIApp, socketio.AsyncServer, AsyncGameServer]:
+    """ASGI app serving the game page and every game event"""
+    sio = socketio.AsyncServer(
+        async_mode="asgi",
+        cors_allowed_origins="*",
+        logger=log_packets,
+        engineio_logger=log_packets,
+        json=fastjson,
+        serializer=use_serializer(serializer),
+    )
+    server = AsyncGameServer(sio, cluster=cluster_from_url(broker))
+
+    def make_handler(event: str) -> Any:
+        async def handler(sid: str, *args: Any) -> None:
+            await server.handle(event, sid, args[0] if args else None)
+
+        return handler
+
+    for event in EVENTS:
+        sio.on(event, make_handler(event))
+
+    app = socketio.ASGIApp(
+        sio,
+        other_asgi_app=page_app(
+            render_page(page, bundle_dir, msgpack=serializer == "msgpack"), server
+        ),
+        static_files={"/static": os.path.join(bundle_dir, "static")},
+        on_startup=server.start,
+    )
+    return app, sio, server
+
+
+def serve(
+    host: str,
+    port: int,
+    page: str = "index.html",
+    bundle_dir: str = BASE_DIR,
+    log_packets: bool = False,
+    serializer: str = "json",
+    broker: Optional[str] = None,
+) -> None:
+    import uvicorn  # pylint: disable=import-outside-toplevel
+
+    app, _, _ = create_app(page, bundle_dir, log_packets, serializer, broker)
+    uvicorn.run(app, host=host, port=port, log_level="warning")
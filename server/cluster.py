@@ -0,0 +1,288 @@
+"""
+Several game server processes (nodes) behind one load balancer. Each room
+is owned by one node, which keeps its GameEngine; other nodes forward their
+sockets' events for it to the owner over a pub/sub Broker, and the owner
+sends each broadcast to the nodes that have sockets in the room.
+
+    python -m server --broker redis://localhost:6379/0
+
+The load balancer must keep a socket on the node it connected to (sticky
+sessions), which Socket.IO long-polling needs anyway. LocalBroker does the
+same inside one process, for tests. RedisBroker needs: pip install redis
+"""
+
+import itertools
+import os
+import socket
+import threading
+from typing import Any, Callable, Dict, Iterable, Optional, Set, Tuple
+
+from metrics import Counter
+from server import fastjson
+
+PREFIX = "stockmarket:"
+OWNER_TTL = 180  # Seconds a room stays claimed without a refresh (3 sweeps)
+
+# Header and encoded payload of a message from another node
+MessageHandler = Callable[[Dict[str, Any], bytes], None]
+
+CLUSTER_MESSAGES = Counter(
+    "stockmarket_cluster_messages", "Messages published to other nodes", ["op"]
+)
+
+
+def node_channel(node: str) -> str:
+    return f"{PREFIX}node:{node}"
+
+
+def pack_message(header: Dict[str, Any], payload: bytes = b"") -> bytes:
+    """A JSON header line followed by an already encoded payload"""
+    return fastjson.dumps(header).encode("utf-8") + b"\n" + payload
+
+
+def unpack_message(message: bytes) -> Tuple[Dict[str, Any], bytes]:
+    header, _, payload = message.partition(b"\n")
+    return fastjson.loads(header), payload
+
+
+class Broker:
+    """Pub/sub between nodes, and which node owns each room"""
+
+    def publish(self, channel: str, message: bytes) -> None:
+        raise NotImplementedError
+
+    def listen(self, channel: str, handler: Callable[[bytes], None]) -> None:
+        """Call handler with every message published on the channel"""
+        raise NotImplementedError
+
+    def claim(self, game_id: str, node: str) -> str:
+        """The room's owner: node, unless another node already has it"""
+        raise NotImplementedError
+
+    def refresh(self, game_id: str, node: str) -> None:
+        """Keep node's claim on a room alive (or take it, if it's free)"""
+        raise NotImplementedError
+
+    def release(self, game_id: str, node: str) -> None:
+        raise NotImplementedError
+
+
+class LocalBroker(Broker):
+    """In-process broker; handlers run synchronously in the publisher"""
+
+    def __init__(self):
+        self.handlers: Dict[str, Callable[[bytes], None]] = {}
+        self.owners: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def publish(self, channel: str, message: bytes) -> None:
+        handler = self.handlers.get(channel)
+        if handler is not None:
+            handler(message)
+
+    def listen(self, channel: str, handler: Callable[[bytes], None]) -> None:
+        self.handlers[channel] = handler
+
+    def claim(self, game_id: str, node: str) -> str:
+        with self._lock:
+            return self.owners.setdefault(game_id, node)
+
+    def refresh(self, game_id: str, node: str) -> None:
+        self.claim(game_id, node)
+
+    def release(self, game_id: str, node: str) -> None:
+        with self._lock:
+            if self.owners.get(game_id) == node:
+                del self.owners[game_id]
+
+
+# Compare-and-set scripts, so a node never touches another node's claim
+_REFRESH = """
+local owner = redis.call('get', KEYS[1])
+if not owner or owner == ARGV[1] then
+    return redis.call('set', KEYS[1], ARGV[1], 'EX', ARGV[2])
+end
+return 0
+"""
+_RELEASE = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class RedisBroker(Broker):
+    """Redis pub/sub, with claims as keys that expire unless refreshed"""
+
+    def __init__(self, url: str, owner_ttl: int = OWNER_TTL):
+        import redis  # pylint: disable=import-outside-toplevel
+
+        self.redis = redis.Redis.from_url(url)
+        self.pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        self.owner_ttl = owner_ttl
+        self._listener: Any = None
+
+    def publish(self, channel: str, message: bytes) -> None:
+        self.redis.publish(channel, message)
+
+    def listen(self, channel: str, handler: Callable[[bytes], None]) -> None:
+        self.pubsub.subscribe(**{channel: lambda message: handler(message["data"])})
+        if self._listener is None:
+            self._listener = self.pubsub.run_in_thread(sleep_time=1, daemon=True)
+
+    def claim(self, game_id: str, node: str) -> str:
+        key = PREFIX + "owner:" + game_id
+        while True:
+            if self.redis.set(key, node, nx=True, ex=self.owner_ttl):
+                return node
+            owner = self.redis.get(key)
+            if owner is not None:  # Else it expired in between: try again
+                return owner.decode("utf-8")
+
+    def refresh(self, game_id: str, node: str) -> None:
+        self.redis.eval(_REFRESH, 1, PREFIX + "owner:" + game_id, node, self.owner_ttl)
+
+    def release(self, game_id: str, node: str) -> None:
+        self.redis.eval(_RELEASE, 1, PREFIX + "owner:" + game_id, node)
+
+
+def broker_from_url(url: str) -> Broker:
+    """redis://, rediss:// or unix:// for Redis; local:// for one process"""
+    if url.startswith("local:"):
+        return LocalBroker()
+    return RedisBroker(url)
+
+
+class Cluster:
+    """
+    This node's side of the cluster: the owners of rooms it forwards to,
+    its sockets in rooms owned elsewhere (remote) and, for the rooms it
+    owns, the node each forwarded socket is on (guests).
+    """
+
+    def __init__(self, broker: Broker, node: Optional[str] = None):
+        self.broker = broker
+        self.node = (
+            node
+            or os.environ.get("STOCKMARKET_NODE_ID")
+            or (f"{socket.gethostname()}:{os.getpid()}")
+        )
+        self.owners: Dict[str, str] = {}  # Room -> owner, as claimed
+        self.remote: Dict[str, str] = {}  # Local socket -> room owned elsewhere
+        self.guests: Dict[str, str] = {}  # Socket in a room here -> its node
+        self.pending: Dict[int, Any] = {}  # Forwarded command -> its waiter
+        self._seq = itertools.count(1)
+
+    def owner(self, game_id: str) -> str:
+        owner = self.owners.get(game_id)
+        if owner is None:
+            owner = self.owners[game_id] = self.broker.claim(game_id, self.node)
+        return owner
+
+    def forget(self, game_id: str) -> None:
+        """Claim the room again next time (its owner didn't answer)"""
+        self.owners.pop(game_id, None)
+
+    def listen(self, handler: MessageHandler) -> None:
+        self.broker.listen(
+            node_channel(self.node),
+            lambda message: handler(*unpack_message(message)),
+        )
+
+    def forward(self, sid: str, event: str, data: Any, waiter: Any = None) -> int:
+        """
+        Send a remote socket's event to the room's owner. The waiter is
+        returned by done() once the owner has sent what it produced.
+        """
+        seq = next(self._seq) if waiter is not None else 0
+        if waiter is not None:
+            self.pending[seq] = waiter
+        game_id = self.remote[sid]
+        header = {
+            "op": "command",
+            "node": self.node,
+            "seq": seq,
+            "game_id": game_id,
+            "sid": sid,
+            "event": event,
+            "data": data,
+        }
+        self.publish(self.owner(game_id), header)
+        return seq
+
+    def leave(self, sid: str) -> Optional[str]:
+        """Tell the owner a remote socket left; returns the room it was in"""
+        game_id = self.remote.get(sid)
+        if game_id is not None:
+            self.forward(sid, "disconnect", None)
+            del self.remote[sid]
+        return game_id
+
+    def done(self, header: Dict[str, Any]) -> Any:
+        return self.pending.pop(header["seq"], None)
+
+    def reply(self, header: Dict[str, Any]) -> None:
+        """Tell the forwarding node a command's broadcasts have been sent"""
+        if header["seq"]:
+            self.publish(header["node"], {"op": "done", "seq": header["seq"]})
+
+    def nodes_for(self, sids: Iterable[str]) -> Set[str]:
+        """Other nodes with sockets among sids"""
+        return {self.guests[sid] for sid in sids if sid in self.guests}
+
+    def emit(
+        self,
+        nodes: Iterable[str],
+        event: str,
+        payload: Optional[bytes],
+        to: str,
+        skip_sid: Tuple[str, ...] = (),
+    ) -> None:
+        """Have other nodes emit an encoded payload to their sockets"""
+        header = {
+            "op": "emit",
+            "event": event,
+            "to": to,
+            "skip": list(skip_sid),
+            "data": payload is not None,
+        }
+        for node in nodes:
+            self.publish(node, header, payload or b"")
+
+    def refresh(self, game_ids: Iterable[str]) -> None:
+        """Keep the claims on this node's rooms; drop owners nobody uses"""
+        active = set(self.remote.values())
+        for game_id in game_ids:
+            self.broker.refresh(game_id, self.node)
+            active.add(game_id)
+        self.owners = {g: o for g, o in self.owners.items() if g in active}
+
+    def release(self, game_ids: Iterable[str]) -> None:
+        for game_id in game_ids:
+            self.broker.release(game_id, self.node)
+            self.owners.pop(game_id, None)
+
+    def publish(self, node: str, header: Dict[str, Any], payload: bytes = b"") -> None:
+        CLUSTER_MESSAGES.labels(header["op"]).inc()
+        self.broker.publish(node_channel(node), pack_message(header, payload))
+
+
+class Reply(threading.Event):
+    """Done event of a forwarded command; setting it answers the sender"""
+
+    def __init__(self, cluster: Cluster, header: Dict[str, Any]):
+        super().__init__()
+        self.cluster = cluster
+        self.header = header
+
+    def set(self) -> None:
+        super().set()
+        self.cluster.reply(self.header)
+
+
+def cluster_from_url(url: Optional[str]) -> Optional["Cluster"]:
+    """A Cluster on the broker at url, or None to run as a single node"""
+    if not url:
+        return None
+    return Cluster(broker_from_url(url))
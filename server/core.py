@@ -0,0 +1,782 @@
+"""
+Transport-agnostic game server: the Socket.IO event handlers for every table,
+written once as commands that run on the table's worker and fill an Outbox.
+Backends only supply a Transport that can emit, manage rooms and run tasks.
+"""
+
+import hmac
+import os
+import threading
+import time
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from rooms import (
+    DEFAULT_IDLE_TIMEOUT,
+    DEFAULT_MAX_ROOMS,
+    STATE_UPDATE,
+    Command,
+    Outbox,
+    Room,
+    RoomLimitError,
+    RoomRegistry,
+    normalize_game_id,
+)
+from metrics import REGISTRY, SIZE_BUCKETS, Counter, Gauge, Histogram
+from store import store_from_url
+from server import fastjson
+from server.cluster import Cluster, Reply
+from server.logs import log, set_room_debug, trace
+from server.profiling import FLUSH_EVENT, HandlerProfiler
+
+# Event name, payload, recipient (a socket id or a room) and sockets to skip
+Message = Tuple[str, Any, str, Tuple[str, ...]]
+
+BATCH_EVENT = "batch"  # Several events for one recipient in a single frame
+
+ADMIN_TOKEN_ENV = "STOCKMARKET_ADMIN_TOKEN"  # Opens /profile and /debug when set
+ROOM_SWEEP_INTERVAL = 60  # Seconds between idle room sweeps
+COMMAND_TIMEOUT = 10  # Seconds a handler waits for its command to be applied
+SERIALIZERS = ("json", "msgpack")
+
+# Encodes the payloads sent many times, for the packet serializer in use
+payload_codec: Any = fastjson
+
+EVENT_SECONDS = Histogram(
+    "stockmarket_event_seconds",
+    "Socket.IO handler time, until the command's broadcasts are sent",
+    ["event"],
+)
+TRADES = Counter("stockmarket_trades", "Completed trades", ["side"])
+NEWS = Counter("stockmarket_news", "News broadcasts", ["kind"])
+BANKRUPTCIES = Counter("stockmarket_bankruptcies", "Players gone bankrupt")
+STATE_BYTES = Histogram(
+    "stockmarket_state_bytes",
+    "JSON size of game state broadcasts",
+    ["kind"],
+    buckets=SIZE_BUCKETS,
+)
+ROOMS = Gauge("stockmarket_rooms", "Live game tables")
+PLAYERS = Gauge("stockmarket_players", "Players at live tables")
+CLIENTS = Gauge("stockmarket_clients", "Sockets that have joined a table")
+
+
+def registry_from_env() -> RoomRegistry:
+    """Room registry configured from STOCKMARKET_* environment variables"""
+    return RoomRegistry(
+        max_rooms=int(os.environ.get("STOCKMARKET_MAX_ROOMS", DEFAULT_MAX_ROOMS)),
+        idle_timeout=float(
+            os.environ.get("STOCKMARKET_ROOM_IDLE_TIMEOUT", DEFAULT_IDLE_TIMEOUT)
+        ),
+        # Journal games to disk so they survive a restart (off when unset)
+        journal_dir=os.environ.get("STOCKMARKET_JOURNAL_DIR"),
+        # Latest snapshot per game, e.g. sqlite:///games.db (off when unset)
+        store=store_from_url(os.environ.get("STOCKMARKET_STORE")),
+    )
+
+
+def use_serializer(serializer: str) -> Any:
+    """
+    Encode cached payloads for json or msgpack packets. Returns the
+    serializer option for the Socket.IO server.
+    """
+    global payload_codec  # pylint: disable=global-statement
+    if serializer not in SERIALIZERS:
+        raise ValueError(
+            f"Unknown serializer {serializer!r}, choose from {SERIALIZERS}"
+        )
+    if serializer == "msgpack":
+        from server import msgpack_codec  # pylint: disable=import-outside-toplevel
+
+        payload_codec = msgpack_codec
+        return msgpack_codec.MsgPackPacket
+    payload_codec = fastjson
+    return "default"
+
+
+def metrics_text(rooms: RoomRegistry) -> str:
+    """The /metrics page, with the gauges read from the registry"""
+    live = rooms.rooms()
+    ROOMS.set(len(live))
+    PLAYERS.set(sum(len(room.game.players) for room in live))
+    CLIENTS.set(sum(len(room.sids) for room in live))
+    return REGISTRY.render()
+
+
+def admin_allowed(authorization: Optional[str]) -> bool:
+    """
+    Whether a request may use /profile and /debug: it must send
+    "Authorization: Bearer <token>" with the token in STOCKMARKET_ADMIN_TOKEN.
+    Without a token configured the pages are off, whoever asks.
+    """
+    token = os.environ.get(ADMIN_TOKEN_ENV, "")
+    if not token or authorization is None:
+        return False
+    expected = f"Bearer {token}".encode("utf-8")
+    return hmac.compare_digest(authorization.encode("utf-8"), expected)
+
+
+def switch_room_debug(game_id: str, enabled: bool) -> Dict[str, Any]:
+    """Turn full tracing of one room on or off; the reply for the endpoint"""
+    game_id = normalize_game_id(game_id)
+    set_room_debug(game_id, enabled)
+    return {"room": game_id, "debug": enabled}
+
+
+def send_lobby_update(room: Room, out: Outbox) -> None:
+    out.emit(
+        "lobby",
+        {
+            "players": room.game.players,
+            "host_player": room.host_player,
+            "game_id": room.game_id,
+        },
+    )
+
+
+def join_command(room: Room, out: Outbox, sid: str, data: Dict[str, str]) -> None:
+    username = data["username"]
+
+    # Reconnecting player: just resend the full state
+    if data.get("resume") and username in room.game.player_data:
+        out.emit("update", snapshot_payload(room), to=sid)
+        return
+
+    room.run("add_player", username)
+
+    # First player at the table becomes host
+    if room.host_player is None:
+        room.host_player = username
+
+    # Send lobby update with host information
+    send_lobby_update(room, out)
+
+
+def start_game_command(room: Room, out: Outbox, sid: str, data: Dict[str, Any]) -> None:
+    difficulty = int(data.get("difficulty", 1))
+    goal = int(data.get("goal", 1000000))
+
+    # Reset game with new settings
+    room.run("configure", difficulty, goal)
+
+    # Start the game by sending the full state
+    out.send_state(full=True)
+
+
+def buy_command(room: Room, out: Outbox, sid: str, data: Dict[str, Any]) -> None:
+    game = room.game
+    username: str = str(data["username"])
+    share: str = str(data["share"])
+    amount: int = int(data["amount"])
+
+    # Check if it's the player's turn
+    current_player = game.get_current_player()
+    if username != current_player:
+        out.emit("message", {"msg": "Not your turn!"}, to=sid)
+        return
+
+    success, msg = room.run("buy", username, share, amount)
+
+    # Check for flash news during trading (GOSUB 2600 in original)
+    flash_news = room.run("flash_news")
+
+    # Send result message to the player who made the transaction
+    out.emit("message", {"msg": msg}, to=sid)
+
+    # Send activity log to all players
+    if success:
+        TRADES.labels("buy").inc()
+        out.emit(
+            "activity",
+            {
+                "type": "trade",
+                "message": f"bought {amount} {share} shares",
+                "playerName": username,
+            },
+        )
+
+    # Always send update to ensure UI is synchronized
+    out.send_state()
+
+    # Send flash news if any
+    if flash_news:
+        NEWS.labels("flash").inc()
+        out.emit("flash_news", {"events": flash_news})
+
+
+def sell_command(
+    room: Room, out: Outbox, sid: str, data: Dict[str, Union[str, int]]
+) -> None:
+    game = room.game
+    username = str(data["username"])
+    share = str(data["share"])
+    amount = int(data["amount"])
+
+    # Check if it's the player's turn
+    current_player = game.get_current_player()
+    if username != current_player:
+        out.emit("message", {"msg": "Not your turn!"}, to=sid)
+        return
+
+    success, msg = room.run("sell", username, share, amount)
+
+    # Check for flash news during trading (like original gosub 2600)
+    flash_news = room.run("flash_news")
+
+    # Send result message to the player who made the transaction
+    out.emit("message", {"msg": msg}, to=sid)
+
+    # Send activity log to all players
+    if success:
+        TRADES.labels("sell").inc()
+        out.emit(
+            "activity",
+            {
+                "type": "trade",
+                "message": f"sold {amount} {share} shares",
+                "playerName": username,
+            },
+        )
+
+    # Always send update to ensure UI is synchronized
+    out.send_state()
+
+    # Send flash news if any
+    if flash_news:
+        NEWS.labels("flash").inc()
+        out.emit("flash_news", {"events": flash_news})
+
+
+def end_turn_command(room: Room, out: Outbox, sid: str, data: Dict[str, Any]) -> None:
+    game = room.game
+
+    # Get username from data or session
+    username: str = str(data.get("username", "unknown"))
+    current_player = game.get_current_player()
+
+    # Commands run one at a time, so a repeated end_turn lands here too
+    if username != current_player:
+        trace(room.game_id, "end_turn ignored, not their turn", player=username)
+        return
+
+    winners, news_events, is_round_end = room.run("end_turn")
+
+    # After the turn ends and before next player starts
+    winner = game.check_last_player_standing()
+    if winner:
+        final_scores = game.calculate_final_scores()
+        out.emit(
+            "game_over",
+            {
+                "winner": winner,
+                "reason": "Last player standing - others went bankrupt",
+                "final_scores": final_scores,
+            },
+        )
+        return
+
+    next_player = game.get_current_player()
+    out.emit("message", {"msg": f"{next_player}'s turn!"})
+
+    # Send activity log about turn ending
+    out.emit(
+        "activity",
+        {"type": "turn", "message": "ended their turn", "playerName": username},
+    )
+
+    out.send_state()
+
+    # Announce the players gone bankrupt since the last turn ended
+    bankrupted_players = game.take_bankruptcies()
+    if bankrupted_players:
+        BANKRUPTCIES.inc(len(bankrupted_players))
+        for player in bankrupted_players:
+            out.emit(
+                "activity",
+                {
+                    "type": "bankruptcy",
+                    "message": "has gone bankrupt!",
+                    "playerName": player,
+                },
+            )
+
+    # Send news events only if it's the end of a round
+    if is_round_end and news_events:
+        NEWS.labels("market").inc()
+        out.emit("news", {"events": news_events})
+
+    if winners:
+        # Check for millionaires specifically
+        millionaires = game.check_millionaires()
+        if millionaires:
+            for millionaire in millionaires:
+                out.emit("millionaire", {"name": millionaire})
+
+        # Send final scores
+        final_scores = game.calculate_final_scores()
+        out.emit("game_over", {"winners": winners, "final_scores": final_scores})
+
+
+def request_update_command(room: Room, out: Outbox, sid: str, data: Any = None) -> None:
+    out.emit("update", snapshot_payload(room), to=sid)
+
+
+def refresh_lobby_command(room: Room, out: Outbox, sid: str, data: Any = None) -> None:
+    send_lobby_update(room, out)
+
+
+def repay_loan_command(room: Room, out: Outbox, sid: str, data: Dict[str, Any]) -> None:
+    username: str = str(data["username"])
+    amount: Optional[int] = int(data["amount"]) if "amount" in data else None
+    success, msg = room.run("repay_loan", username, amount)
+    out.emit("message", {"msg": msg}, to=sid)
+
+    # Send activity log to all players
+    if success:
+        if amount:
+            out.emit(
+                "activity",
+                {
+                    "type": "trade",
+                    "message": f"repaid ${amount} loan",
+                    "playerName": username,
+                },
+            )
+        else:
+            out.emit(
+                "activity",
+                {
+                    "type": "trade",
+                    "message": "repaid entire loan",
+                    "playerName": username,
+                },
+            )
+
+    out.send_state()
+
+
+def final_scores_command(room: Room, out: Outbox, sid: str, data: Any = None) -> None:
+    if room.game.players:
+        scores = room.game.calculate_final_scores()
+        out.emit("final_scores", {"scores": scores})
+    else:
+        out.emit("error", {"message": "No game in progress"}, to=sid)
+
+
+def play_again_command(room: Room, out: Outbox, sid: str, data: Any = None) -> None:
+    # Reset the game at this table
+    room.reset()
+    out.emit("game_reset")
+
+
+def end_game_response_command(
+    room: Room, out: Outbox, sid: str, data: Dict[str, bool]
+) -> None:
+    want_to_end = data.get("end_game", False)
+    if want_to_end:
+        # Calculate final scores and end game
+        final_scores = room.game.calculate_final_scores()
+        out.emit(
+            "game_over",
+            {"winners": [], "final_scores": final_scores, "ended_early": True},
+        )
+    else:
+        # Continue playing
+        out.send_state()
+
+
+def update_settings_command(
+    room: Room, out: Outbox, sid: str, data: Dict[str, Any]
+) -> None:
+    # Get username from the data
+    username = data.get("username")
+    if username != room.host_player:
+        return
+
+    difficulty = int(data.get("difficulty", 1))
+    goal = int(data.get("goal", 1000000))
+
+    # Update game settings
+    room.run("configure", difficulty, goal)
+
+    # Broadcast the new settings to all players
+    out.emit("settings_update", {"difficulty": difficulty, "goal": goal})
+
+
+def ask_end_game_command(room: Room, out: Outbox, sid: str, data: Any = None) -> None:
+    """Ask players if they want to end the game (like original line 770)"""
+    out.emit("ask_end_game_prompt")
+
+
+# Client events handled as commands on the table's worker
+EVENT_COMMANDS: Dict[str, Command] = {
+    "start_game": start_game_command,
+    "buy": buy_command,
+    "sell": sell_command,
+    "end_turn": end_turn_command,
+    "request_update": request_update_command,
+    "refresh_lobby": refresh_lobby_command,
+    "repay_loan": repay_loan_command,
+    "get_final_scores": final_scores_command,
+    "play_again": play_again_command,
+    "ask_end_game": ask_end_game_command,
+    "end_game_response": end_game_response_command,
+    "update_settings": update_settings_command,
+}
+
+# Every event a backend has to register a handler for
+EVENTS = ("join", "disconnect", *EVENT_COMMANDS)
+
+
+def game_update(room: Room, full: bool = False) -> Tuple[str, Any]:
+    """
+    What changed since the last broadcast as a patch. Clients that are
+    behind ask for a full snapshot with request_update.
+    """
+    game = room.game
+    patch = None if full else game.state_patch(room.sent_version)
+    trace(
+        room.game_id,
+        "game update",
+        round=game.round + 1,
+        turn=game.turn + 1,
+        version=game.version,
+        full=patch is None,
+    )
+    room.sent_version = game.version
+    if patch is None:
+        event, data = "update", snapshot_payload(room)
+    else:
+        event, data = "patch", payload_codec.encode(patch)
+    STATE_BYTES.labels(event).observe(len(data))
+    return event, data
+
+
+def snapshot_payload(room: Room) -> Any:
+    """The full state, encoded once per state version however often it is sent"""
+    game = room.game
+    key = (payload_codec, game.state_id, game.version)
+    cached = room.snapshot_cache
+    if cached is None or cached[0] != key:
+        payload = payload_codec.encode_snapshot(game.state_snapshot())
+        cached = room.snapshot_cache = (key, payload)
+    return cached[1]
+
+
+def relay(
+    cluster: Cluster,
+    room: Room,
+    event: str,
+    data: Any,
+    to: str,
+    skip_sid: Tuple[str, ...] = (),
+) -> None:
+    """Pass a message on to the other nodes with sockets it is for"""
+    nodes = cluster.nodes_for(room.sids if to == room.game_id else (to,))
+    if nodes:
+        payload = None if data is None else payload_codec.pack(data)
+        cluster.emit(nodes, event, payload, to, skip_sid)
+
+
+def frame(events: List[Tuple[str, Any]]) -> Tuple[str, Any]:
+    """One event as itself, several as a batch the client dispatches in order"""
+    if len(events) == 1:
+        return events[0]
+    return BATCH_EVENT, [[event, data] for event, data in events]
+
+
+def outbox_messages(room: Room, outbox: Outbox) -> Iterator[Message]:
+    """
+    One frame per recipient for an outbox. Sockets that were sent events of
+    their own get them in order with the room broadcasts; the rest of the
+    room shares a single frame.
+    """
+    broadcast: List[Tuple[str, Any]] = []
+    private: Dict[str, List[Tuple[str, Any]]] = {}
+    for event, data, to in outbox.drain():
+        if event == STATE_UPDATE:
+            event, data = game_update(room, full=data)
+        if to is None:
+            broadcast.append((event, data))
+            for sid, events in private.items():
+                if sid in room.sids:
+                    events.append((event, data))
+        else:
+            if to not in private:
+                private[to] = list(broadcast) if to in room.sids else []
+            private[to].append((event, data))
+
+    for sid, events in private.items():
+        yield (*frame(events), sid, ())
+    if broadcast:
+        yield (*frame(broadcast), room.game_id, tuple(private))
+
+
+class Pending(NamedTuple):
+    """What a handler waits for before it returns and the client gets its ack"""
+
+    done: Any  # Set by the room's worker, or by the owner's reply
+    expired: Callable[[], None] = lambda: None  # Called if it isn't set in time
+
+
+class Transport:
+    """
+    The parts of a Socket.IO server that GameServer needs. The defaults run
+    each room's worker and the idle sweep as background tasks that block;
+    an event loop backend overrides them with tasks of its own.
+    """
+
+    def emit(
+        self,
+        event: str,
+        data: Any = None,
+        to: Optional[str] = None,
+        skip_sid: Tuple[str, ...] = (),
+    ) -> None:
+        raise NotImplementedError
+
+    def enter_room(self, sid: str, room: str) -> None:
+        raise NotImplementedError
+
+    def leave_room(self, sid: str, room: str) -> None:
+        raise NotImplementedError
+
+    def start_background_task(self, target: Callable[..., Any], *args: Any) -> Any:
+        raise NotImplementedError
+
+    def sleep(self, seconds: float) -> None:
+        raise NotImplementedError
+
+    def event(self) -> Any:
+        """A done event for Pending, set from the worker with set()"""
+        return threading.Event()
+
+    def start_worker(self, room: Room, flush: Callable[[Room, Outbox], None]) -> None:
+        """Apply the room's commands as they are submitted"""
+        self.start_background_task(room.serve, flush)
+
+    def every(self, seconds: float, callback: Callable[[], None]) -> None:
+        """Call callback in the background every so many seconds"""
+
+        def repeat() -> None:
+            while True:
+                self.sleep(seconds)
+                callback()
+
+        self.start_background_task(repeat)
+
+    def from_thread(self, callback: Callable[..., None]) -> Callable[..., None]:
+        """callback, made safe to call from other threads (the broker's)"""
+        return callback
+
+
+class GameServer:
+    """Routes client events to the tables and sends what the commands produce"""
+
+    def __init__(
+        self,
+        transport: Transport,
+        rooms: Optional[RoomRegistry] = None,
+        command_timeout: float = COMMAND_TIMEOUT,
+        cluster: Optional[Cluster] = None,
+    ):
+        self.transport = transport
+        self.rooms = rooms if rooms is not None else registry_from_env()
+        self.command_timeout = command_timeout
+        self.profiler = HandlerProfiler()
+        self.cluster = cluster  # None runs every room in this process
+
+    def handle(self, event: str, sid: str, data: Any = None) -> None:
+        """Entry point for every client event"""
+        start = time.perf_counter()
+        try:
+            pending = self.dispatch(event, sid, data)
+            if pending is not None and not pending.done.wait(self.command_timeout):
+                pending.expired()
+        finally:
+            EVENT_SECONDS.labels(event).observe(time.perf_counter() - start)
+
+    def dispatch(self, event: str, sid: str, data: Any = None) -> Optional[Pending]:
+        """Route an event to its room; what to wait for before acking it"""
+        if event == "join":
+            return self.on_join(sid, data)
+        if event == "disconnect":
+            self.rooms.leave(sid)
+            if self.cluster is not None:
+                self.cluster.leave(sid)
+            return None
+        room = self.rooms.room_for(sid)
+        if room is None:
+            if self.cluster is not None and sid in self.cluster.remote:
+                return self.forward(sid, event, data)
+            if event == "get_final_scores":
+                self.transport.emit("error", {"message": "No game in progress"}, to=sid)
+            return None
+        trace(room.game_id, "event", event=event, sid=sid)
+        command = EVENT_COMMANDS[event]
+        if self.profiler.enabled:
+            command = self.profiler.wrap(event, command)
+        return self.submit(room, command, sid, data)
+
+    def on_join(self, sid: str, data: Dict[str, str]) -> Optional[Pending]:
+        if self.cluster is not None:
+            forwarded = self.join_remote(sid, data)
+            if forwarded is not None:
+                return forwarded
+        previous = self.rooms.room_for(sid)
+        try:
+            room = self.rooms.join(sid, data.get("game_id"))
+        except RoomLimitError as e:
+            self.transport.emit("error", {"message": str(e)}, to=sid)
+            return None
+        finally:
+            self.drop_rooms(self.rooms.take_evicted())
+
+        if previous is not None and previous is not room:
+            self.transport.leave_room(sid, previous.game_id)
+        self.transport.enter_room(sid, room.game_id)
+        command = join_command
+        if self.profiler.enabled:
+            command = self.profiler.wrap("join", command)
+        return self.submit(room, command, sid, data)
+
+    def join_remote(self, sid: str, data: Dict[str, str]) -> Optional[Pending]:
+        """Forward a join to the node owning the room; None if it is this one"""
+        assert self.cluster is not None
+        game_id = normalize_game_id(data.get("game_id"))
+        owner = self.cluster.owner(game_id)
+        previous = self.cluster.remote.get(sid)
+        if previous is not None and (previous != game_id or owner == self.cluster.node):
+            self.cluster.leave(sid)
+            if previous != game_id:
+                self.transport.leave_room(sid, previous)
+        if owner == self.cluster.node:
+            return None
+
+        local = self.rooms.leave(sid)
+        if local is not None:
+            self.transport.leave_room(sid, local.game_id)
+        self.transport.enter_room(sid, game_id)
+        self.cluster.remote[sid] = game_id
+        return self.forward(sid, "join", data)
+
+    def forward(self, sid: str, event: str, data: Any) -> Pending:
+        """Run a remote socket's event on the room's owner"""
+        cluster = self.cluster
+        assert cluster is not None
+        trace(cluster.remote[sid], "forwarded", event=event, sid=sid)
+        waiter = self.transport.event()
+        seq = cluster.forward(sid, event, data, waiter)
+
+        def expired() -> None:
+            cluster.pending.pop(seq, None)
+            cluster.forget(cluster.remote.get(sid, ""))
+
+        return Pending(waiter, expired)
+
+    def on_cluster_message(self, header: Dict[str, Any], payload: bytes) -> None:
+        """A forwarded command for a room here, a reply, or sockets to emit to"""
+        assert self.cluster is not None
+        if header["op"] == "emit":
+            data = payload_codec.unpack(payload) if header["data"] else None
+            skip_sid = tuple(header["skip"])
+            self.transport.emit(header["event"], data, header["to"], skip_sid)
+        elif header["op"] == "done":
+            waiter = self.cluster.done(header)
+            if waiter is not None:
+                waiter.set()
+        else:
+            self.run_forwarded(header)
+
+    def run_forwarded(self, header: Dict[str, Any]) -> None:
+        assert self.cluster is not None
+        sid, event, game_id = header["sid"], header["event"], header["game_id"]
+        if event == "disconnect":
+            self.rooms.leave(sid)
+            self.cluster.guests.pop(sid, None)
+            return
+        if game_id not in self.rooms:
+            owner = self.cluster.owner(game_id)
+            if owner != self.cluster.node:  # It moved: pass it on
+                self.cluster.publish(owner, header)
+                return
+        self.cluster.guests[sid] = header["node"]
+        room = self.rooms.room_for(sid)
+        if room is None or room.game_id != game_id:
+            try:
+                room = self.rooms.join(sid, game_id)
+            except RoomLimitError as e:
+                self.cluster.release([game_id])
+                error = payload_codec.pack({"message": str(e)})
+                self.cluster.emit([header["node"]], "error", error, sid)
+                self.cluster.reply(header)
+                return
+            finally:
+                self.drop_rooms(self.rooms.take_evicted())
+        command = join_command if event == "join" else EVENT_COMMANDS[event]
+        if self.profiler.enabled:
+            command = self.profiler.wrap(event, command)
+        if room.claim_worker():
+            self.transport.start_worker(room, self.flush)
+        room.submit(command, sid, header["data"], done=Reply(self.cluster, header))
+
+    def submit(self, room: Room, command: Command, sid: str, data: Any) -> Pending:
+        """
+        Queue a command for the room's worker. The handler waits until its
+        broadcasts have been sent, so the client's ack arrives after them.
+        """
+        if room.claim_worker():
+            self.transport.start_worker(room, self.flush)
+        return Pending(room.submit(command, sid, data, done=self.transport.event()))
+
+    def flush(self, room: Room, outbox: Outbox) -> None:
+        """Send the events a batch of commands produced"""
+        messages: Iterable[Message] = outbox_messages(room, outbox)
+        if self.profiler.enabled:
+            # Only the encoding: an emit can yield to other rooms' green
+            # threads, and their time would end up in this profile
+            now = time.perf_counter()
+            messages = self.profiler.run(FLUSH_EVENT, room, now, list, messages)
+        self.send(room, messages)
+
+    def send(self, room: Room, messages: Iterable[Message]) -> None:
+        for event, data, to, skip_sid in messages:
+            self.transport.emit(event, data, to=to, skip_sid=skip_sid)
+            if self.cluster is not None:
+                relay(self.cluster, room, event, data, to, skip_sid)
+
+    def sweep_idle_rooms(self) -> None:
+        """Evict rooms nobody has used for a while; runs every sweep interval"""
+        self.drop_rooms(self.rooms.evict_idle())
+        if self.cluster is not None:
+            self.cluster.refresh(room.game_id for room in self.rooms.rooms())
+
+    def drop_rooms(self, evicted: List[str]) -> None:
+        """
+        Let go of evicted rooms, whether the sweep or a new room at the limit
+        evicted them. Eviction already stopped their workers.
+        """
+        if evicted:
+            log.info("evicted idle rooms", extra={"rooms": ",".join(evicted)})
+            if self.cluster is not None:
+                self.cluster.release(evicted)
+
+    def start(self) -> None:
+        """Recover journaled tables and start the background tasks"""
+        recovered = self.rooms.recover()
+        for game_id in recovered:
+            log.info("recovered table", extra={"room": game_id})
+        if self.cluster is not None:
+            self.cluster.refresh(recovered)
+            self.cluster.listen(self.transport.from_thread(self.on_cluster_message))
+        self.transport.every(ROOM_SWEEP_INTERVAL, self.sweep_idle_rooms)
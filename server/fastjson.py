@@ -0,0 +1,96 @@
+"""
+JSON module for the Socket.IO packet serializer: orjson when it is
+installed, the standard library otherwise. Payloads wrapped in RawJSON are
+encoded once and spliced into every packet that carries them, so a state
+broadcast to N sockets (or N requests for the same version) costs one
+encode instead of N.
+
+    socketio.Server(json=fastjson)
+"""
+
+import json as _json
+import secrets
+from typing import Any, Callable, List
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+# Placeholder for a RawJSON inside a packet; the random part keeps client
+# supplied strings from ever matching it
+_MARKER = f"\x00raw-{secrets.token_hex(8)}-"
+
+
+class RawJSON:
+    """A payload already encoded as JSON text"""
+
+    __slots__ = ("text",)
+
+    def __init__(self, text: str):
+        self.text = text
+
+    def __len__(self) -> int:
+        return len(self.text)
+
+    def __repr__(self) -> str:
+        return f"RawJSON({self.text[:40]!r}...)"
+
+
+def _stdlib_dumps(obj: Any, default: Any = None) -> str:
+    return _json.dumps(obj, separators=(",", ":"), default=default)
+
+
+def _orjson_dumps(obj: Any, default: Any = None) -> str:
+    try:
+        return orjson.dumps(obj, default=default).decode("utf-8")
+    except TypeError:
+        # Integers beyond 64 bits and other types orjson refuses
+        return _stdlib_dumps(obj, default)
+
+
+_dumps: Callable[..., str] = _orjson_dumps if orjson is not None else _stdlib_dumps
+
+
+def encode(obj: Any) -> RawJSON:
+    """Encode a payload once, to be sent any number of times"""
+    return RawJSON(dumps(obj))
+
+
+encode_snapshot = encode  # JSON keeps the snapshot's dict shape
+
+
+def pack(obj: Any) -> bytes:
+    """A payload as bytes for another server node, encoded once"""
+    raw = obj if isinstance(obj, RawJSON) else encode(obj)
+    return raw.text.encode("utf-8")
+
+
+def unpack(data: bytes) -> RawJSON:
+    return RawJSON(data.decode("utf-8"))
+
+
+def dumps(obj: Any, **_options: Any) -> str:
+    """Compact JSON; the separators python-socketio passes are the default"""
+    raws: List[str] = []
+
+    def default(value: Any) -> str:
+        if isinstance(value, RawJSON):
+            raws.append(value.text)
+            return f"{_MARKER}{len(raws) - 1}"
+        raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+    text = _dumps(obj, default)
+    for i, raw in enumerate(raws):
+        # Both encoders escape the NUL in the marker as \u0000
+        marker = _dumps(f"{_MARKER}{i}")
+        text = text.replace(marker, raw, 1)
+    return text
+
+
+def loads(text: Any, **_options: Any) -> Any:
+    if orjson is not None:
+        return orjson.loads(text)
+    return _json.loads(text)
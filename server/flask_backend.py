@@ -0,0 +1,138 @@
+"""
+Flask-SocketIO backend for the eventlet, gevent and threading async modes.
+For eventlet and gevent the caller must monkey patch before importing this.
+"""
+
+import os
+from typing import Any, Callable, Optional, Tuple
+
+from flask import Flask, Response, abort, jsonify, render_template, request
+from flask_socketio import SocketIO
+
+from metrics import CONTENT_TYPE
+from server import fastjson
+from server.cluster import cluster_from_url
+from server.core import (
+    EVENTS,
+    GameServer,
+    Transport,
+    admin_allowed,
+    metrics_text,
+    switch_room_debug,
+    use_serializer,
+)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class FlaskSocketIOTransport(Transport):
+    def __init__(self, socketio: SocketIO):
+        self.socketio = socketio
+
+    def emit(
+        self,
+        event: str,
+        data: Any = None,
+        to: Optional[str] = None,
+        skip_sid: Tuple[str, ...] = (),
+    ) -> None:
+        skip = list(skip_sid) or None
+        if data is None:
+            self.socketio.emit(event, to=to, skip_sid=skip)
+        else:
+            self.socketio.emit(event, data, to=to, skip_sid=skip)
+
+    def enter_room(self, sid: str, room: str) -> None:
+        self.socketio.server.enter_room(sid, room, namespace="/")
+
+    def leave_room(self, sid: str, room: str) -> None:
+        self.socketio.server.leave_room(sid, room, namespace="/")
+
+    def start_background_task(self, target: Callable[..., Any], *args: Any) -> Any:
+        return self.socketio.start_background_task(target, *args)
+
+    def sleep(self, seconds: float) -> None:
+        self.socketio.sleep(seconds)
+
+
+def create_app(
+    async_mode: str,
+    page: str = "index.html",
+    bundle_dir: str = BASE_DIR,
+    log_packets: bool = False,
+    serializer: str = "json",
+    broker: Optional[str] = None,
+) -> Tuple[Flask, SocketIO, GameServer]:
+    """Flask app serving the game page with every game event registered"""
+    app = Flask(
+        __name__,
+        static_folder=os.path.join(bundle_dir, "static"),
+        template_folder=os.path.join(bundle_dir, "templates"),
+    )
+    app.config["SECRET_KEY"] = "stockmarket_secret"
+    socketio = SocketIO(
+        app,
+        async_mode=async_mode,
+        logger=log_packets,
+        engineio_logger=log_packets,
+        cors_allowed_origins="*",
+        json=fastjson,
+        serializer=use_serializer(serializer),
+    )
+    server = GameServer(
+        FlaskSocketIOTransport(socketio), cluster=cluster_from_url(broker)
+    )
+
+    @app.route("/")
+    def index() -> str:
+        return render_template(page, msgpack=serializer == "msgpack")
+
+    @app.route("/metrics")
+    def metrics() -> Response:
+        return Response(metrics_text(server.rooms), content_type=CONTENT_TYPE)
+
+    @app.route("/profile", methods=["GET", "POST", "DELETE"])
+    def profile() -> Response:
+        if not admin_allowed(request.headers.get("Authorization")):
+            abort(403)
+        body, content_type = server.profiler.handle_request(
+            request.method, request.args.get("event"), request.args.get("format")
+        )
+        return Response(body, content_type=content_type)
+
+    @app.route("/debug/<game_id>", methods=["POST", "DELETE"])
+    def room_debug(game_id: str) -> Any:
+        if not admin_allowed(request.headers.get("Authorization")):
+            abort(403)
+        return jsonify(switch_room_debug(game_id, request.method == "POST"))
+
+    def make_handler(event: str) -> Callable[..., None]:
+        def handler(*args: Any) -> None:
+            server.handle(event, request.sid, args[0] if args else None)
+
+        return handler
+
+    for event in EVENTS:
+        socketio.on_event(event, make_handler(event))
+    return app, socketio, server
+
+
+def serve(
+    async_mode: str,
+    host: str,
+    port: int,
+    page: str = "index.html",
+    bundle_dir: str = BASE_DIR,
+    log_packets: bool = False,
+    serializer: str = "json",
+    broker: Optional[str] = None,
+) -> None:
+    app, socketio, server = create_app(
+        async_mode, page, bundle_dir, log_packets, serializer, broker
+    )
+    server.start()
+    options = {}
+    if async_mode == "threading":
+        # Werkzeug serves the threading mode, with WebSocket from simple-websocket
+        options["allow_unsafe_werkzeug"] = True
+    socketio.run(app, host=host, port=port, debug=False, use_reloader=False, **options)
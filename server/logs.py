@@ -0,0 +1,131 @@
+"""
+Logging for the game server. Records go through a queue to a listener
+thread, so handlers never wait on stderr. Per-event traces (every trade,
+every state broadcast) are sampled, or always on for rooms with debug
+tracing switched on at runtime.
+
+    STOCKMARKET_LOG_LEVEL=DEBUG         # level for the stockmarket loggers
+    STOCKMARKET_LOG_FORMAT=json         # one JSON object per line
+    STOCKMARKET_TRACE_SAMPLE=0.01       # share of traces kept at DEBUG
+    STOCKMARKET_DEBUG_ROOMS=fredag,t2   # rooms traced in full from the start
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+from typing import Any, Optional, Set
+
+LOGGER_NAME = "stockmarket"
+DEFAULT_LEVEL = "INFO"
+DEFAULT_TRACE_SAMPLE = 0.01
+
+log = logging.getLogger(LOGGER_NAME)
+trace_log = logging.getLogger(f"{LOGGER_NAME}.trace")
+
+# Attributes every LogRecord has; anything else was passed in extra=
+_RECORD_ATTRS = frozenset(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+_debug_rooms: Set[str] = set()
+_trace_sample = DEFAULT_TRACE_SAMPLE
+_rng = random.Random()
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def fields_of(record: logging.LogRecord) -> dict:
+    """Structured fields passed with extra="""
+    return {k: v for k, v in vars(record).items() if k not in _RECORD_ATTRS}
+
+
+class KeyValueFormatter(logging.Formatter):
+    """time level logger message key=value ..."""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = " ".join(f"{k}={v}" for k, v in fields_of(record).items())
+        return f"{line} {fields}" if fields else line
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, fields at the top level"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": record.created,
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            **fields_of(record),
+        }
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        return json.dumps(data, default=str)
+
+
+def configure_logging(
+    level: Optional[str] = None,
+    json_format: Optional[bool] = None,
+    trace_sample: Optional[float] = None,
+) -> None:
+    """Send stockmarket logs through a queue to stderr (env vars as defaults)"""
+    global _listener, _trace_sample  # pylint: disable=global-statement
+    level = level or os.environ.get("STOCKMARKET_LOG_LEVEL", DEFAULT_LEVEL)
+    if json_format is None:
+        json_format = os.environ.get("STOCKMARKET_LOG_FORMAT") == "json"
+    if trace_sample is None:
+        trace_sample = float(
+            os.environ.get("STOCKMARKET_TRACE_SAMPLE", DEFAULT_TRACE_SAMPLE)
+        )
+    _trace_sample = trace_sample
+    for game_id in os.environ.get("STOCKMARKET_DEBUG_ROOMS", "").split(","):
+        if game_id:
+            set_room_debug(game_id, True)
+
+    stream = logging.StreamHandler(sys.stderr)
+    stream.setFormatter(JsonFormatter() if json_format else KeyValueFormatter())
+    records: "queue.Queue[logging.LogRecord]" = queue.Queue()
+    if _listener is not None:
+        _listener.stop()
+    _listener = logging.handlers.QueueListener(records, stream)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+    log.handlers[:] = [logging.handlers.QueueHandler(records)]
+    log.setLevel(level.upper())
+    log.propagate = False
+
+
+def set_room_debug(game_id: str, enabled: bool) -> None:
+    """Trace every event of one room, whatever the level and sample rate"""
+    if enabled:
+        _debug_rooms.add(game_id)
+    else:
+        _debug_rooms.discard(game_id)
+
+
+def room_debug(game_id: str) -> bool:
+    return game_id in _debug_rooms
+
+
+def trace(game_id: str, msg: str, **fields: Any) -> None:
+    """
+    Per-event trace. Costs a set lookup unless the room is being debugged
+    or DEBUG is on and the event is sampled.
+    """
+    if game_id not in _debug_rooms:
+        if not trace_log.isEnabledFor(logging.DEBUG):
+            return
+        if _rng.random() >= _trace_sample:
+            return
+    record = trace_log.makeRecord(
+        trace_log.name, logging.DEBUG, "", 0, msg, (), None, extra=fields
+    )
+    record.room = game_id
+    trace_log.handle(record)
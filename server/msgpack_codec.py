@@ -0,0 +1,132 @@
+"""
+MessagePack serializer for Socket.IO (--serializer msgpack). Pairs with the
+socket.io.msgpack client build, which the page loads in this mode.
+
+Full state snapshots use a compact positional schema instead of nested
+dicts; static/game.js expands it back with expandSnapshot():
+
+    [id, v, [price per SHARES], current_player, players_list, round, turn,
+     [[balance, [shares per SHARES], loan, bankrupt, trades_count], ...]]
+
+Players are in players_list order. Patches keep the dict shape, they are
+small. Needs: pip install msgpack
+"""
+
+import secrets
+from typing import Any, Dict, List
+
+import msgpack
+from socketio import msgpack_packet
+
+from engine import SHARES
+
+PLAYER_FIELDS = ("balance", "shares", "loan", "bankrupt", "trades_count")
+
+# Placeholder for a Packed payload inside a packet, as msgpack bin data
+_MARKER = b"\x00packed-" + secrets.token_hex(8).encode("ascii") + b"-"
+
+
+class Packed:
+    """A payload already encoded as MessagePack"""
+
+    __slots__ = ("data",)
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __repr__(self) -> str:
+        return f"Packed({len(self.data)} bytes)"
+
+
+def dumps(obj: Any) -> bytes:
+    """MessagePack with any Packed payloads inside spliced in as they are"""
+    packed: List[bytes] = []
+
+    def default(value: Any) -> bytes:
+        if isinstance(value, Packed):
+            packed.append(value.data)
+            return _MARKER + str(len(packed) - 1).encode("ascii")
+        raise TypeError(f"{type(value).__name__} can't be packed")
+
+    data = msgpack.packb(obj, default=default)
+    for i, payload in enumerate(packed):
+        marker = msgpack.packb(_MARKER + str(i).encode("ascii"))
+        data = data.replace(marker, payload, 1)
+    return data
+
+
+def encode(obj: Any) -> Packed:
+    """Encode a payload once, to be sent any number of times"""
+    return Packed(dumps(obj))
+
+
+def encode_snapshot(state: Dict[str, Any]) -> Packed:
+    return encode(compact_snapshot(state))
+
+
+def pack(obj: Any) -> bytes:
+    """A payload as bytes for another server node, encoded once"""
+    return (obj if isinstance(obj, Packed) else encode(obj)).data
+
+
+def unpack(data: bytes) -> Packed:
+    return Packed(data)
+
+
+def compact_snapshot(state: Dict[str, Any]) -> List[Any]:
+    players = state["players"]
+    return [
+        state["id"],
+        state["v"],
+        [state["share_prices"][share] for share in SHARES],
+        state["current_player"],
+        state["players_list"],
+        state["round"],
+        state["turn"],
+        [
+            [
+                players[name]["balance"],
+                [players[name]["shares"][share] for share in SHARES],
+                players[name]["loan"],
+                players[name]["bankrupt"],
+                players[name]["trades_count"],
+            ]
+            for name in state["players_list"]
+        ],
+    ]
+
+
+def expand_snapshot(compact: List[Any]) -> Dict[str, Any]:
+    """Inverse of compact_snapshot (the client does the same in game.js)"""
+    state_id, version, prices, current, names, round_, turn, players = compact
+    return {
+        "id": state_id,
+        "v": version,
+        "players": {
+            name: {
+                "balance": balance,
+                "shares": dict(zip(SHARES, shares)),
+                "loan": loan,
+                "bankrupt": bankrupt,
+                "trades_count": trades_count,
+            }
+            for name, (balance, shares, loan, bankrupt, trades_count) in zip(
+                names, players
+            )
+        },
+        "share_prices": dict(zip(SHARES, prices)),
+        "current_player": current,
+        "players_list": names,
+        "round": round_,
+        "turn": turn,
+    }
+
+
+class MsgPackPacket(msgpack_packet.MsgPackPacket):
+    """python-socketio's msgpack packet, splicing in Packed payloads"""
+
+    def encode(self) -> bytes:
+        return dumps(self._to_dict())
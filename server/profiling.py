@@ -0,0 +1,216 @@
+"""
+cProfile hook for the game commands, switched on at runtime by a client
+with the admin token (STOCKMARKET_ADMIN_TOKEN):
+
+    H="Authorization: Bearer $STOCKMARKET_ADMIN_TOKEN"
+    curl -H "$H" -X POST localhost:5000/profile                       # start
+    curl -H "$H" localhost:5000/profile?event=end_turn > end_turn.folded
+    curl -H "$H" "localhost:5000/profile?format=pstats" > all.prof   # snakeviz
+    curl -H "$H" -X DELETE localhost:5000/profile                     # stop
+
+While off, the only cost is checking HandlerProfiler.enabled per event.
+While on, each command (and each flush's JSON encoding) is profiled on the
+room's worker and kept in a ring buffer. The time a command waited in the
+queue is recorded too, which shows scheduling delays that no profile of the
+command itself can.
+
+cProfile follows the OS thread, not the green thread. Under eventlet and
+gevent every room shares one thread, so a profile taken around code that
+yields would also record the other rooms that ran meanwhile. Only code that
+doesn't yield is profiled: the commands and the encoding, not the emits.
+"""
+
+import collections
+import cProfile
+import json
+import marshal
+import os
+import pstats
+import threading
+import time
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from rooms import Command, Room
+
+DEFAULT_CAPACITY = 500  # Profiles kept, oldest dropped first
+FLUSH_EVENT = "flush"  # Profiles of encoding a batch's broadcasts
+MAX_STACK_DEPTH = 100
+
+# pstats key: (filename, line number, function name)
+FunctionKey = Tuple[str, int, str]
+
+
+class ProfileRecord:
+    """One profiled command"""
+
+    __slots__ = ("event", "room", "queued", "elapsed", "stats")
+
+    def __init__(
+        self, event: str, room: str, queued: float, elapsed: float, stats: Any
+    ):
+        self.event = event
+        self.room = room
+        self.queued = queued  # Seconds between submit and start
+        self.elapsed = elapsed
+        self.stats = stats  # pstats-style dict
+
+
+class HandlerProfiler:
+    """Ring buffer of per-event cProfile results"""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self.enabled = False
+        self.records: Deque[ProfileRecord] = collections.deque(maxlen=capacity)
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._lock:
+            self.records.clear()
+        self.enabled = True
+
+    def stop(self) -> None:
+        self.enabled = False
+
+    def wrap(self, event: str, command: Command) -> Command:
+        """The command, profiled when it runs on the room's worker"""
+        submitted = time.perf_counter()
+
+        def profiled(room: Room, *args: Any) -> None:
+            self.run(event, room, submitted, command, room, *args)
+
+        return profiled
+
+    def run(
+        self,
+        event: str,
+        room: Room,
+        submitted: float,
+        func: Callable[..., Any],
+        *args: Any,
+    ) -> Any:
+        start = time.perf_counter()
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            return func(*args)
+        finally:
+            profile.disable()
+            elapsed = time.perf_counter() - start
+            profile.create_stats()
+            record = ProfileRecord(
+                event, room.game_id, start - submitted, elapsed, profile.stats
+            )
+            with self._lock:
+                self.records.append(record)
+
+    def selected(self, event: Optional[str] = None) -> List[ProfileRecord]:
+        with self._lock:
+            records = list(self.records)
+        return [r for r in records if event is None or r.event == event]
+
+    def merged_stats(self, event: Optional[str] = None) -> Dict[Any, Any]:
+        """All matching profiles added up, in the pstats dict format"""
+        records = self.selected(event)
+        if not records:
+            return {}
+        stats = pstats.Stats(_StatsSource(dict(records[0].stats)))
+        for record in records[1:]:
+            stats.add(pstats.Stats(_StatsSource(record.stats)))
+        return stats.stats  # type: ignore[attr-defined]
+
+    def pstats_bytes(self, event: Optional[str] = None) -> bytes:
+        """A .prof file for snakeviz, gprof2dot or pstats.Stats"""
+        return marshal.dumps(self.merged_stats(event))
+
+    def collapsed(self, event: Optional[str] = None) -> str:
+        """
+        Collapsed stacks for flamegraph.pl or speedscope, in microseconds,
+        rooted at the event name with the queue wait as its own frame
+        """
+        queued: Dict[str, float] = collections.defaultdict(float)
+        for record in self.selected(event):
+            queued[record.event] += record.queued
+        lines = []
+        for name, seconds in queued.items():
+            if int(seconds * 1e6) > 0:
+                lines.append(f"{name};(queued) {int(seconds * 1e6)}")
+            stacks = collapsed_stacks(self.merged_stats(name))
+            lines.extend(f"{name};{stack} {micros}" for stack, micros in stacks.items())
+        return "\n".join(lines) + "\n"
+
+    def handle_request(
+        self, method: str, event: Optional[str] = None, fmt: Optional[str] = None
+    ) -> Tuple[bytes, str]:
+        """Body and content type for the /profile endpoint"""
+        if method == "POST":
+            self.start()
+        elif method == "DELETE":
+            self.stop()
+        elif fmt == "pstats":
+            return self.pstats_bytes(event), "application/octet-stream"
+        elif fmt != "summary":
+            return self.collapsed(event).encode("utf-8"), "text/plain; charset=utf-8"
+        return json.dumps(self.summary()).encode("utf-8"), "application/json"
+
+    def summary(self) -> Dict[str, Any]:
+        records = self.selected()
+        events: Dict[str, Dict[str, float]] = {}
+        for record in records:
+            row = events.setdefault(
+                record.event, {"count": 0, "elapsed_s": 0.0, "queued_s": 0.0}
+            )
+            row["count"] += 1
+            row["elapsed_s"] += record.elapsed
+            row["queued_s"] += record.queued
+        return {"profiling": self.enabled, "profiles": len(records), "events": events}
+
+
+class _StatsSource:
+    """What pstats.Stats needs to load a stats dict it didn't read from disk"""
+
+    def __init__(self, stats: Dict[Any, Any]):
+        self.stats = stats
+
+    def create_stats(self) -> None:
+        pass
+
+
+def function_label(key: FunctionKey) -> str:
+    filename, line, name = key
+    if filename == "~":
+        return name  # Built-in, e.g. <built-in method time.perf_counter>
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+def collapsed_stacks(stats: Dict[Any, Any]) -> Dict[str, int]:
+    """
+    Rebuild call stacks from cProfile's caller/callee graph. A function's
+    time is split between its callers in proportion to the time each call
+    site spent in it, which is as close to real stacks as cProfile gets.
+    """
+    callees: Dict[FunctionKey, Dict[FunctionKey, float]] = {}
+    for func, (_, _, _, _, callers) in stats.items():
+        for caller, (_, _, _, edge_cumulative) in callers.items():
+            callees.setdefault(caller, {})[func] = edge_cumulative
+    roots = [func for func, entry in stats.items() if not entry[4]]
+
+    stacks: Dict[str, float] = collections.defaultdict(float)
+
+    def walk(func: FunctionKey, path: List[str], seen: set, budget: float) -> None:
+        _, _, inline, cumulative, _ = stats[func]
+        if cumulative <= 0 or budget <= 0 or len(path) >= MAX_STACK_DEPTH:
+            return
+        scale = min(1.0, budget / cumulative)
+        path = path + [function_label(func)]
+        stacks[";".join(path)] += inline * scale
+        for callee, edge in callees.get(func, {}).items():
+            if callee not in seen and callee in stats:
+                walk(callee, path, seen | {callee}, edge * scale)
+
+    for root in roots:
+        walk(root, [], {root}, stats[root][3])
+    return {
+        stack: int(seconds * 1e6)
+        for stack, seconds in stacks.items()
+        if int(seconds * 1e6) > 0
+    }
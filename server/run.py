@@ -0,0 +1,140 @@
+"""
+Backend selector and command line entry point for the game server
+"""
+
+import argparse
+import os
+import threading
+import time
+import webbrowser
+from typing import List, Optional
+
+from server.logs import configure_logging
+
+DEFAULT_BACKEND = "eventlet"
+DEFAULT_PORT = 5000
+BACKENDS = ("eventlet", "gevent", "threading", "asgi")
+SERIALIZERS = ("json", "msgpack")  # Same as server.core, without importing it
+
+
+def patch_for(backend: str) -> None:
+    """Monkey patch the standard library for green thread backends"""
+    if backend == "eventlet":
+        import eventlet  # pylint: disable=import-outside-toplevel
+
+        eventlet.monkey_patch()
+    elif backend == "gevent":
+        from gevent import monkey  # pylint: disable=import-outside-toplevel
+
+        monkey.patch_all()
+
+
+def open_browser_later(url: str, delay: float = 2.0) -> None:
+    def delayed_open() -> None:
+        time.sleep(delay)  # Give the server time to start
+        print(f"Opening game at {url}")
+        webbrowser.open(url)
+
+    threading.Thread(target=delayed_open, daemon=True).start()
+
+
+def serve(
+    backend: str = DEFAULT_BACKEND,
+    host: str = "0.0.0.0",
+    port: int = DEFAULT_PORT,
+    page: str = "index.html",
+    bundle_dir: Optional[str] = None,
+    log_packets: bool = False,
+    open_browser: bool = False,
+    log_level: Optional[str] = None,
+    serializer: str = "json",
+    broker: Optional[str] = None,
+) -> None:
+    """Start the game server on the chosen backend (blocks)"""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}, choose from {BACKENDS}")
+    if open_browser:
+        open_browser_later(f"http://127.0.0.1:{port}")
+    # pylint: disable=import-outside-toplevel
+    if backend == "asgi":
+        # Plain asyncio: nothing to patch and no Flask
+        configure_logging(log_level)
+        from server import asgi_backend
+
+        asgi_backend.serve(
+            host,
+            port,
+            page=page,
+            bundle_dir=bundle_dir or asgi_backend.BASE_DIR,
+            log_packets=log_packets,
+            serializer=serializer,
+            broker=broker,
+        )
+        return
+
+    patch_for(backend)
+    configure_logging(log_level)  # After patching, so the listener is green too
+    from server import flask_backend
+
+    flask_backend.serve(
+        backend,
+        host,
+        port,
+        page=page,
+        bundle_dir=bundle_dir or flask_backend.BASE_DIR,
+        log_packets=log_packets,
+        serializer=serializer,
+        broker=broker,
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Stockmarket game server")
+    parser.add_argument(
+        "--backend",
+        choices=BACKENDS,
+        default=os.environ.get("STOCKMARKET_BACKEND", DEFAULT_BACKEND),
+    )
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--page", default="index.html", help="template to serve")
+    parser.add_argument(
+        "--log-packets", action="store_true", help="log every Socket.IO packet"
+    )
+    parser.add_argument(
+        "--serializer",
+        choices=SERIALIZERS,
+        default=os.environ.get("STOCKMARKET_SERIALIZER", "json"),
+        help="Socket.IO packet format (msgpack needs: pip install msgpack)",
+    )
+    parser.add_argument(
+        "--broker",
+        default=os.environ.get("STOCKMARKET_BROKER"),
+        help="pub/sub for several server nodes, e.g. redis://localhost:6379/0",
+    )
+    parser.add_argument(
+        "--log-level", help="DEBUG, INFO, WARNING... (default STOCKMARKET_LOG_LEVEL)"
+    )
+    args = parser.parse_args(argv)
+
+    print("🎮 Stockmarket Clone - C64 Style Game")
+    print("=" * 40)
+    print(f"🚀 Starting game server ({args.backend})...")
+    print(f"🌐 Open in your browser: http://localhost:{args.port}")
+    print(f"📱 Others can join at: http://[your-ip]:{args.port}")
+    print("❌ To stop the game, close this window or press Ctrl+C")
+    print("=" * 40)
+
+    try:
+        serve(
+            args.backend,
+            args.host,
+            args.port,
+            page=args.page,
+            log_packets=args.log_packets,
+            log_level=args.log_level,
+            serializer=args.serializer,
+            broker=args.broker,
+        )
+    except KeyboardInterrupt:
+        print("\n🛑 Game stopped by user")
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Headless batch simulation: bots play complete games against GameEngine
+without Socket.IO, sharded over a process pool.
+
+    python simulate.py --games 100000 --players 4 --strategy random,momentum
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from engine import (
+    DEFAULT_DIFFICULTY,
+    DEFAULT_TARGET_VALUE,
+    INITIAL_SHARE_PRICES,
+    SHARES,
+    GameEngine,
+)
+from rng import RNG_KINDS, make_rng
+
+DEFAULT_MAX_ROUNDS = 200
+DEFAULT_SHARD_SIZE = 250
+TRADE_SECONDS = 3.0  # Simulated time a player spends on each trade
+ALL_BANKRUPT = "GAME OVER - ALL BANKRUPT"
+
+
+class SimulatedClock:
+    """Stands in for time.time so flash news spacing follows simulated play"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class Table:
+    """Runs bot commands as the command functions in server/core.py apply events"""
+
+    def __init__(self, game: GameEngine, clock: SimulatedClock):
+        self.game = game
+        self.clock = clock
+        self.trades = 0
+        self.flash_news = 0
+
+    def _after_trade(self, success: bool) -> None:
+        self.trades += success
+        self.clock.now += TRADE_SECONDS
+        if self.game.generate_flash_news():
+            self.flash_news += 1
+
+    def buy(self, name: str, share: str, amount: int) -> bool:
+        success, _ = self.game.buy(name, share, amount)
+        self._after_trade(success)
+        return success
+
+    def sell(self, name: str, share: str, amount: int) -> bool:
+        success, _ = self.game.sell(name, share, amount)
+        self._after_trade(success)
+        return success
+
+    def repay_loan(self, name: str) -> bool:
+        success, _ = self.game.repay_loan(name)
+        return success
+
+
+# A strategy plays one turn for a seat: strategy(table, name, rng)
+Strategy = Callable[[Table, str, random.Random], None]
+
+
+def idle_strategy(table: Table, name: str, rng: random.Random) -> None:
+    """Never trades, a baseline for how prices drift on their own"""
+
+
+def random_strategy(table: Table, name: str, rng: random.Random) -> None:
+    """A few random trades per turn, sized by what the player can afford"""
+    game = table.game
+    for _ in range(rng.randint(0, 3)):
+        pdata = game.player_data[name]
+        share = rng.choice(SHARES)
+        if rng.random() < 0.5:
+            affordable = pdata.balance // game.share_prices[share]
+            if affordable > 0:
+                table.buy(name, share, rng.randint(1, affordable))
+        elif pdata.shares[share] > 0:
+            table.sell(name, share, rng.randint(1, pdata.shares[share]))
+
+
+def momentum_strategy(table: Table, name: str, rng: random.Random) -> None:
+    """Sells shares that fell last round, borrows to buy the strongest riser"""
+    game = table.game
+    pdata = game.player_data[name]
+    moves = {s: game.share_prices[s] - game.last_prices[s] for s in SHARES}
+
+    for share in SHARES:
+        if moves[share] < 0 and pdata.shares[share] > 0:
+            table.sell(name, share, pdata.shares[share])
+    if pdata.loan > 0:
+        table.repay_loan(name)
+
+    best = max(SHARES, key=lambda s: (moves[s], rng.random()))
+    if moves[best] >= 0:
+        budget = pdata.balance + max(0, game.calculate_max_loan(name)) // 2
+        amount = budget // game.share_prices[best]
+        if amount > 0:
+            table.buy(name, best, amount)
+
+
+STRATEGIES: Dict[str, Strategy] = {
+    "idle": idle_strategy,
+    "random": random_strategy,
+    "momentum": momentum_strategy,
+}
+
+
+def play_game(
+    seed: int,
+    strategies: List[str],
+    difficulty: int = DEFAULT_DIFFICULTY,
+    target_value: int = DEFAULT_TARGET_VALUE,
+    max_rounds: int = DEFAULT_MAX_ROUNDS,
+    rng_kind: str = "mt",
+) -> Dict[str, Any]:
+    """Play one complete game, one seat per entry in strategies"""
+    rng = random.Random(f"{seed}/bots")  # Kept apart from the market's draws
+    clock = SimulatedClock()
+    game = GameEngine(
+        difficulty, target_value, clock=clock, rng=make_rng(rng_kind, seed)
+    )
+    table = Table(game, clock)
+    seats = {}
+    for i, strategy in enumerate(strategies):
+        name = f"{strategy}{i + 1}"
+        game.add_player(name)
+        seats[name] = STRATEGIES[strategy]
+
+    winners: List[str] = []
+    reason = "max_rounds"
+    while game.round < max_rounds:
+        name = game.get_current_player()
+        if name is not None and not game.player_data[name].bankrupt:
+            seats[name](table, name, rng)
+        clock.now += TRADE_SECONDS
+
+        winners, _, _ = game.end_turn()
+        if winners == [ALL_BANKRUPT]:
+            winners, reason = [], "all_bankrupt"
+            break
+        if winners:
+            winners, reason = list(dict.fromkeys(winners)), "target"
+            break
+        if len(game.players) > 1:
+            last_player = game.check_last_player_standing()
+            if last_player:
+                winners, reason = [last_player], "last_player"
+                break
+
+    return {
+        "seed": seed,
+        "reason": reason,
+        "rounds": game.round,
+        "winners": winners,
+        "winning_strategies": [n.rstrip("0123456789") for n in winners],
+        "players": len(game.players),
+        "bankrupt": sum(1 for p in game.player_data.values() if p.bankrupt),
+        "trades": table.trades,
+        "flash_news": table.flash_news,
+        "final_prices": dict(game.share_prices),
+    }
+
+
+class SimulationStats:
+    """Aggregated results that can be merged across shards"""
+
+    def __init__(self):
+        self.games = 0
+        self.players = 0
+        self.bankrupt = 0
+        self.trades = 0
+        self.flash_news = 0
+        self.reasons: Dict[str, int] = {}
+        self.strategy_wins: Dict[str, int] = {}
+        self.rounds_to_win: Dict[int, int] = {}  # rounds -> games won then
+        self.final_prices: Dict[str, Dict[int, int]] = {s: {} for s in SHARES}
+
+    def add(self, result: Dict[str, Any]) -> None:
+        self.games += 1
+        self.players += result["players"]
+        self.bankrupt += result["bankrupt"]
+        self.trades += result["trades"]
+        self.flash_news += result["flash_news"]
+        _count(self.reasons, result["reason"])
+        for strategy in result["winning_strategies"]:
+            _count(self.strategy_wins, strategy)
+        if result["reason"] in ("target", "last_player"):
+            _count(self.rounds_to_win, result["rounds"])
+        for share, price in result["final_prices"].items():
+            _count(self.final_prices[share], price)
+
+    def merge(self, other: "SimulationStats") -> None:
+        self.games += other.games
+        self.players += other.players
+        self.bankrupt += other.bankrupt
+        self.trades += other.trades
+        self.flash_news += other.flash_news
+        for target, source in [
+            (self.reasons, other.reasons),
+            (self.strategy_wins, other.strategy_wins),
+            (self.rounds_to_win, other.rounds_to_win),
+        ] + [(self.final_prices[s], other.final_prices[s]) for s in SHARES]:
+            for key, count in source.items():
+                _count(target, key, count)
+
+    def summary(self) -> Dict[str, Any]:
+        won = sum(self.rounds_to_win.values())
+        return {
+            "games": self.games,
+            "end_reasons": dict(sorted(self.reasons.items())),
+            "strategy_wins": dict(sorted(self.strategy_wins.items())),
+            "bankruptcy_rate": round(self.bankrupt / max(1, self.players), 4),
+            "trades_per_game": round(self.trades / max(1, self.games), 2),
+            "flash_news_per_game": round(self.flash_news / max(1, self.games), 2),
+            "rounds_to_win": {
+                "games": won,
+                "mean": round(_mean(self.rounds_to_win), 2) if won else None,
+                "p10": _percentile(self.rounds_to_win, 0.10),
+                "p50": _percentile(self.rounds_to_win, 0.50),
+                "p90": _percentile(self.rounds_to_win, 0.90),
+            },
+            "final_prices": {
+                share: {
+                    "start": INITIAL_SHARE_PRICES[share],
+                    "mean": round(_mean(prices), 2) if prices else None,
+                    "p10": _percentile(prices, 0.10),
+                    "p50": _percentile(prices, 0.50),
+                    "p90": _percentile(prices, 0.90),
+                }
+                for share, prices in self.final_prices.items()
+            },
+        }
+
+
+def _count(counter: Dict[Any, int], key: Any, amount: int = 1) -> None:
+    counter[key] = counter.get(key, 0) + amount
+
+
+def _mean(histogram: Dict[int, int]) -> float:
+    return sum(v * n for v, n in histogram.items()) / sum(histogram.values())
+
+
+def _percentile(histogram: Dict[int, int], fraction: float) -> Optional[int]:
+    total = sum(histogram.values())
+    seen = 0
+    for value in sorted(histogram):
+        seen += histogram[value]
+        if seen >= fraction * total:
+            return value
+    return None
+
+
+# (first game index, number of games, base seed, play_game keyword arguments)
+Shard = Tuple[int, int, int, Dict[str, Any]]
+
+
+def game_seed(seed: int, game_index: int) -> int:
+    """
+    A game's own seed, hashed from the base seed and its index so runs with
+    nearby base seeds don't share games
+    """
+    return random.Random(f"{seed}/{game_index}").getrandbits(64)
+
+
+def run_shard(shard: Shard) -> SimulationStats:
+    first, count, seed, options = shard
+    stats = SimulationStats()
+    for game_index in range(first, first + count):
+        # Seeds depend only on the game index, so results don't depend on
+        # how the games were spread over workers
+        stats.add(play_game(game_seed(seed, game_index), **options))
+    return stats
+
+
+def simulate(
+    games: int,
+    strategies: List[str],
+    workers: Optional[int] = None,
+    seed: int = 0,
+    shard_size: int = DEFAULT_SHARD_SIZE,
+    **options: Any,
+) -> Iterator[SimulationStats]:
+    """
+    Play `games` games on a process pool, yielding the running totals each
+    time a shard finishes. The last value yielded covers every game.
+    """
+    for strategy in strategies:
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown strategy: {strategy}")
+    options["strategies"] = strategies
+    shards: List[Shard] = [
+        (first, min(shard_size, games - first), seed, options)
+        for first in range(0, games, shard_size)
+    ]
+    workers = workers or os.cpu_count() or 1
+    totals = SimulationStats()
+
+    if workers == 1 or len(shards) == 1:
+        for shard in shards:
+            totals.merge(run_shard(shard))
+            yield totals
+        return
+
+    with multiprocessing.Pool(min(workers, len(shards))) as pool:
+        for stats in pool.imap_unordered(run_shard, shards):
+            totals.merge(stats)
+            yield totals
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--players", type=int, default=4, help="seats per game")
+    parser.add_argument(
+        "--strategy",
+        default="random",
+        help=f"bot per seat, comma separated and repeated to fill the table "
+        f"({', '.join(STRATEGIES)})",
+    )
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--difficulty", type=int, default=DEFAULT_DIFFICULTY)
+    parser.add_argument("--target", type=int, default=DEFAULT_TARGET_VALUE)
+    parser.add_argument("--max-rounds", type=int, default=DEFAULT_MAX_ROUNDS)
+    parser.add_argument("--shard-size", type=int, default=DEFAULT_SHARD_SIZE)
+    parser.add_argument("--rng", choices=sorted(RNG_KINDS), default="mt")
+    args = parser.parse_args(argv)
+
+    names = args.strategy.split(",")
+    strategies = [names[i % len(names)] for i in range(args.players)]
+
+    stats = SimulationStats()
+    for stats in simulate(
+        args.games,
+        strategies,
+        workers=args.workers,
+        seed=args.seed,
+        shard_size=args.shard_size,
+        difficulty=args.difficulty,
+        target_value=args.target,
+        max_rounds=args.max_rounds,
+        rng_kind=args.rng,
+    ):
+        print(f"{stats.games}/{args.games} games", file=sys.stderr)
+    print(json.dumps(stats.summary(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
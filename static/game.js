@@ -1,4 +1,6 @@
 const socket = io();
+// Game table to join, e.g. http://host:5000/?game=friday
+const gameId = new URLSearchParams(window.location.search).get("game") || "default";
 let username = null;
 let currentMode = "intro";
 let currentShare = "";
@@ -6,6 +8,7 @@ let isHost = false;
 let selectedDifficulty = 1;
 let selectedGoal = 1000000;
 let activityLog = [];
+let gameState = null; // Last full state from "update", kept current by "patch"
 
 const screen = document.getElementById("screen");
 const gameContent = document.getElementById("game-content");
@@ -122,6 +125,7 @@ function askForName() {
 function showLobby(players) {
   switchToSingleColumnLayout();
   let content = printHeader();
+  content += `Table: ${gameId.toUpperCase()}\n`;
   content += "Waiting for players to join...\n\n";
   content += "Connected players:\n";
   players.forEach(p => content += "- " + p + "\n");
@@ -158,7 +162,7 @@ input.addEventListener("keydown", (e) => {
       return;
     }
     username = cmd;
-    socket.emit("join", { username });
+    socket.emit("join", { username, game_id: gameId });
     let content = printHeader();
     content += `Welcome, ${username}!\n`;
     content += "Connecting to market...";
@@ -442,7 +446,7 @@ socket.on("activity", (data) => {
   }
 });
 
-socket.on("update", (data) => {
+function showGameState() {
   // Switch to two-column layout when game starts
   if (currentMode !== "game-active") {
     switchToTwoColumnLayout();
@@ -450,7 +454,70 @@ socket.on("update", (data) => {
   }
   
   // Always redraw status to ensure fresh data
-  drawStatus(data);
+  drawStatus(gameState);
+}
+
+function mergePatch(target, patch) {
+  for (const [key, value] of Object.entries(patch)) {
+    if (value !== null && typeof value === "object" && !Array.isArray(value) &&
+        target[key] !== null && typeof target[key] === "object") {
+      mergePatch(target[key], value);
+    } else {
+      target[key] = value;
+    }
+  }
+}
+
+const SHARES = ["LEAD", "ZINC", "TIN", "GOLD"]; // Order of the compact arrays
+
+function expandSnapshot(compact) {
+  // Positional snapshot from a msgpack server, see server/msgpack_codec.py
+  const [id, v, prices, current_player, players_list, round, turn, seats] = compact;
+  const players = {};
+  const share_prices = {};
+  SHARES.forEach((share, i) => { share_prices[share] = prices[i]; });
+  players_list.forEach((name, i) => {
+    const [balance, held, loan, bankrupt, trades_count] = seats[i];
+    const shares = {};
+    SHARES.forEach((share, j) => { shares[share] = held[j]; });
+    players[name] = { balance, shares, loan, bankrupt, trades_count };
+  });
+  return { id, v, players, share_prices, current_player, players_list, round, turn };
+}
+
+socket.on("update", (data) => {
+  // Full snapshot (join, reconnect or after a missed patch)
+  gameState = Array.isArray(data) ? expandSnapshot(data) : data;
+  showGameState();
+});
+
+socket.on("patch", (patch) => {
+  if (gameState && patch.id === gameState.id && patch.v <= gameState.v) {
+    return; // Already included in a newer snapshot
+  }
+  if (!gameState || patch.id !== gameState.id || patch.base > gameState.v) {
+    socket.emit("request_update"); // Missed a version, resync
+    return;
+  }
+  const { id, base, ...changes } = patch;
+  mergePatch(gameState, changes);
+  showGameState();
+});
+
+socket.on("batch", (events) => {
+  // Several events in one frame: run each through its normal handler, in order
+  for (const [event, data] of events) {
+    for (const handler of socket.listeners(event)) {
+      handler(data);
+    }
+  }
+});
+
+socket.on("connect", () => {
+  // After a reconnect the server has forgotten this socket, join again
+  if (username && gameState) {
+    socket.emit("join", { username, game_id: gameId, resume: true });
+  }
 });
 
 socket.on("lobby", (data) => {
@@ -458,6 +525,16 @@ socket.on("lobby", (data) => {
   showLobby(data.players);
 });
 
+socket.on("error", (data) => {
+  addActivityEntry("system", data.message, username);
+  if (currentMode === "waiting") {
+    let content = printHeader();
+    content += `${data.message}\n`;
+    content += "Please try again later.";
+    setScreenContent(content);
+  }
+});
+
 socket.on("message", (data) => {
   // Don't show transaction messages in activity log for current player
   // The player knows what they did, and it clutters the log
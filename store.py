@@ -0,0 +1,254 @@
+"""
+Snapshot store for game tables: the latest GameEngine.snapshot() per game
+in a pluggable backend, written behind the game. The room's worker only
+encodes the snapshot; a background writer saves the newest one per game
+in a single transaction every flush interval, so saving after each turn
+adds no disk latency to the turn.
+
+    STOCKMARKET_STORE=sqlite:///var/lib/stockmarket/games.db
+"""
+
+import atexit
+import json
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+from engine import GameEngine
+from metrics import Histogram
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+try:
+    from eventlet import patcher
+except ImportError:  # pragma: no cover - depends on the environment
+    patcher = None
+
+DEFAULT_FLUSH_INTERVAL = 1.0  # Seconds between write-behind flushes
+
+log = logging.getLogger("stockmarket.store")
+
+FLUSH_SECONDS = Histogram(
+    "stockmarket_store_flush_seconds", "Time to write a batch of snapshots"
+)
+
+# Snapshots to write; None deletes the game
+Batch = List[Tuple[str, Optional[bytes]]]
+
+
+def native_threading() -> Any:
+    """
+    The threading module as it was before eventlet patched it. The writer
+    waits on the disk, so it needs an OS thread: as a green thread every
+    commit would stall the hub and every table with it.
+    """
+    if patcher is not None and patcher.is_monkey_patched("thread"):
+        return patcher.original("threading")
+    return threading
+
+
+def encode_snapshot(game: GameEngine) -> bytes:
+    data = game.snapshot()
+    if orjson is not None:
+        try:
+            return orjson.dumps(data)
+        except TypeError:
+            pass  # Integers beyond 64 bits
+    return json.dumps(data, separators=(",", ":")).encode("utf-8")
+
+
+def decode_snapshot(data: bytes, clock: Any = time.time) -> GameEngine:
+    return GameEngine.from_snapshot(json.loads(data), clock=clock)
+
+
+class SnapshotStore:
+    """Backend keeping one encoded snapshot per game"""
+
+    def write(self, batch: Batch) -> None:
+        raise NotImplementedError
+
+    def load(self, game_id: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def game_ids(self) -> List[str]:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class MemoryStore(SnapshotStore):
+    def __init__(self):
+        self.snapshots: Dict[str, bytes] = {}
+
+    def write(self, batch: Batch) -> None:
+        for game_id, data in batch:
+            if data is None:
+                self.snapshots.pop(game_id, None)
+            else:
+                self.snapshots[game_id] = data
+
+    def load(self, game_id: str) -> Optional[bytes]:
+        return self.snapshots.get(game_id)
+
+    def game_ids(self) -> List[str]:
+        return sorted(self.snapshots)
+
+
+class SQLiteStore(SnapshotStore):
+    """
+    One row per game in an SQLite file in WAL mode: a commit appends to the
+    log instead of rewriting pages, and readers never block the writer.
+    Snapshots are zlib compressed.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        # Durable at checkpoints; a power cut can lose the last commits only
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS games ("
+            "game_id TEXT PRIMARY KEY, saved_at REAL NOT NULL, data BLOB NOT NULL)"
+        )
+        self._lock = native_threading().Lock()
+
+    def write(self, batch: Batch) -> None:
+        now = time.time()
+        saved = [
+            (game_id, now, zlib.compress(data, 1))
+            for game_id, data in batch
+            if data is not None
+        ]
+        deleted = [(game_id,) for game_id, data in batch if data is None]
+        with self._lock, self.db:
+            self.db.executemany("INSERT OR REPLACE INTO games VALUES (?, ?, ?)", saved)
+            self.db.executemany("DELETE FROM games WHERE game_id = ?", deleted)
+
+    def load(self, game_id: str) -> Optional[bytes]:
+        with self._lock:
+            row = self.db.execute(
+                "SELECT data FROM games WHERE game_id = ?", (game_id,)
+            ).fetchone()
+        return zlib.decompress(row[0]) if row else None
+
+    def game_ids(self) -> List[str]:
+        with self._lock:
+            rows = self.db.execute("SELECT game_id FROM games ORDER BY game_id")
+            return [game_id for game_id, in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self.db.close()
+
+
+class WriteBehind:
+    """Queues the newest snapshot per game and writes them in batches"""
+
+    def __init__(
+        self, store: SnapshotStore, flush_interval: float = DEFAULT_FLUSH_INTERVAL
+    ):
+        self.store = store
+        self.flush_interval = flush_interval
+        self._pending: Dict[str, Optional[bytes]] = {}
+        self._writing: Dict[str, Optional[bytes]] = {}  # The batch being written
+        self._threading = native_threading()
+        self._lock = self._threading.Lock()
+        self._wake = self._threading.Event()
+        self._stopped = False
+        self._writer: Optional[threading.Thread] = None
+
+    def save(self, game_id: str, game: GameEngine) -> None:
+        """Snapshot the game now, write it later"""
+        self._put(game_id, encode_snapshot(game))
+
+    def delete(self, game_id: str) -> None:
+        self._put(game_id, None)
+
+    def _put(self, game_id: str, data: Optional[bytes]) -> None:
+        with self._lock:
+            self._pending[game_id] = data
+            if self._writer is None:
+                self._writer = self._threading.Thread(
+                    target=self._run, name="snapshot-writer", daemon=True
+                )
+                self._writer.start()
+
+    def load(self, game_id: str) -> Optional[GameEngine]:
+        """The newest snapshot; the backend is only read on a miss"""
+        with self._lock:
+            unwritten = {**self._writing, **self._pending}
+        if game_id in unwritten:
+            data = unwritten[game_id]
+        else:
+            data = self.store.load(game_id)
+        return decode_snapshot(data) if data is not None else None
+
+    def game_ids(self) -> List[str]:
+        with self._lock:
+            unwritten = {**self._writing, **self._pending}
+        game_ids = set(self.store.game_ids())
+        for game_id, data in unwritten.items():
+            if data is None:
+                game_ids.discard(game_id)
+            else:
+                game_ids.add(game_id)
+        return sorted(game_ids)
+
+    def flush(self) -> int:
+        """Write what is pending now; the number of games written"""
+        with self._lock:
+            self._writing, self._pending = self._pending, {}
+            batch = list(self._writing.items())
+        if batch:
+            with FLUSH_SECONDS.time():
+                try:
+                    self.store.write(batch)
+                except Exception:  # pylint: disable=broad-except
+                    log.exception("snapshot write failed", extra={"games": len(batch)})
+                    with self._lock:
+                        # Keep them for the next flush, unless saved again
+                        self._pending = {**self._writing, **self._pending}
+                    return 0
+                finally:
+                    with self._lock:
+                        self._writing = {}
+        return len(batch)
+
+    def _run(self) -> None:
+        while not self._stopped:
+            self._wake.wait(self.flush_interval)
+            self.flush()
+
+    def close(self) -> None:
+        """Write what is pending and close the backend"""
+        self._stopped = True
+        self._wake.set()
+        if self._writer is not None:
+            self._writer.join()
+        self.flush()
+        self.store.close()
+
+
+def store_from_url(url: Optional[str]) -> Optional[WriteBehind]:
+    """sqlite:///path/to/file.db or memory:, None for no store"""
+    if not url:
+        return None
+    scheme = "sqlite://"
+    if url.startswith(scheme):
+        start = len(scheme)
+        store = WriteBehind(SQLiteStore(url[start:]))
+    elif url.startswith("memory:"):
+        store = WriteBehind(MemoryStore())
+    else:
+        raise ValueError(f"Unknown store {url!r}, use sqlite:///path or memory:")
+    # What is still pending at shutdown; a crash loses one flush interval
+    atexit.register(store.close)
+    return store
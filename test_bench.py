@@ -0,0 +1,47 @@
+import os
+import tempfile
+import unittest
+from bench import CASES, compare, main, run_benchmarks
+
+
+def result(median):
+    return {"median": median}
+
+
+class TestBench(unittest.TestCase):
+    def test_every_case_runs(self):
+        report = run_benchmarks(list(CASES), [2], repeat=1)
+        self.assertEqual(set(report["results"]), {f"{case}[2]" for case in CASES})
+        for timing in report["results"].values():
+            self.assertGreater(timing["median"], 0)
+
+    def test_compare_flags_slowdowns(self):
+        baseline = {"results": {"buy[2]": result(1e-6), "sell[2]": result(1e-6)}}
+        current = {
+            "results": {
+                "buy[2]": result(1.2e-6),  # Within tolerance
+                "sell[2]": result(2e-6),
+                "end_turn[2]": result(5e-6),  # Not in the baseline
+            }
+        }
+        regressions = compare(current, baseline, tolerance=0.25)
+        self.assertEqual(len(regressions), 1)
+        self.assertTrue(regressions[0].startswith("sell[2]"))
+
+    def test_missing_baseline_fails(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            args = ["--cases", "buy", "--players", "2", "--repeat", "1"]
+            args += ["--output", os.path.join(tmp, "results.json")]
+            args += ["--baseline", os.path.join(tmp, "baseline.json")]
+            self.assertEqual(main(args), 2)
+            self.assertEqual(main(args + ["--save-baseline"]), 0)
+            self.assertIn(main(args), (0, 1))
+
+    def test_end_turn_plays_whole_rounds(self):
+        run = CASES["end_turn"](3)
+        for _ in range(3):
+            self.assertTrue(run()[2])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import json
+import unittest
+from unittest import mock
+from rooms import RoomRegistry
+from server import fastjson
+from server.core import snapshot_payload
+
+
+class TestFastJson(unittest.TestCase):
+    def test_raw_payloads_are_spliced_in(self):
+        state = {"v": 3, "players": {"Player1": {"balance": 1000}}}
+        raw = fastjson.encode(state)
+        packet = fastjson.dumps(["batch", [["update", raw], ["patch", raw]]])
+        self.assertEqual(
+            json.loads(packet), ["batch", [["update", state], ["patch", state]]]
+        )
+
+    def test_stdlib_fallback(self):
+        raw = fastjson.encode({"v": 1})
+        with mock.patch.object(fastjson, "_dumps", fastjson._stdlib_dumps):
+            self.assertEqual(fastjson.dumps(["update", raw]), '["update",{"v":1}]')
+
+    def test_client_strings_are_not_markers(self):
+        data = {"msg": "\x00raw-0", "big": 2**70}
+        self.assertEqual(fastjson.loads(fastjson.dumps(data)), data)
+
+    def test_socketio_options_are_accepted(self):
+        text = fastjson.dumps({"a": [1, 2]}, separators=(",", ":"))
+        self.assertEqual(text, '{"a":[1,2]}')
+
+    def test_snapshot_encoded_once_per_version(self):
+        room = RoomRegistry().get_or_create("t1")
+        room.run("add_player", "Player1")
+        first = snapshot_payload(room)
+        self.assertIs(snapshot_payload(room), first)
+        self.assertEqual(json.loads(first.text), room.game.state_snapshot())
+
+        room.run("buy", "Player1", "LEAD", 1)
+        second = snapshot_payload(room)
+        self.assertIsNot(second, first)
+        self.assertEqual(json.loads(second.text)["v"], room.game.version)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+import os
+import shutil
+import tempfile
+import unittest
+from engine import GameEngine
+from journal import GameJournal
+from rooms import RoomRegistry
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def play(room, clock, turns=30):
+    """Trade and end turns through the room so everything is journaled"""
+    for turn in range(turns):
+        name = room.game.get_current_player()
+        room.run("buy", name, ["LEAD", "ZINC", "TIN", "GOLD"][turn % 4], 3)
+        clock.now += 10  # Past the flash news throttle
+        room.run("flash_news")
+        if turn % 3 == 0:
+            room.run("sell", name, "LEAD", 1)
+        room.run("end_turn")
+
+
+class TestJournal(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.clock = FakeClock()
+
+    def new_room(self, snapshot_every=1000):
+        rooms = RoomRegistry(journal_dir=self.directory, snapshot_every=snapshot_every)
+        room = rooms.get_or_create("table1")
+        room.game.clock = self.clock
+        room.run("add_player", "Player1")
+        room.run("add_player", "Player2")
+        room.run("configure", 2, 50000)
+        return room
+
+    def recovered(self):
+        rooms = RoomRegistry(journal_dir=self.directory)
+        self.assertEqual(rooms.recover(), ["table1"])
+        room = rooms.get("table1")
+        self.assertEqual(room.host_player, "Player1")
+        return room.game
+
+    def test_replay_rebuilds_game(self):
+        room = self.new_room()
+        play(room, self.clock)
+        room.journal.close()
+        self.assertEqual(self.recovered().snapshot(), room.game.snapshot())
+
+    def test_snapshot_and_tail(self):
+        room = self.new_room(snapshot_every=7)
+        play(room, self.clock)
+        room.journal.close()
+        with open(room.journal.journal_path, encoding="utf-8") as f:
+            self.assertLess(len(f.readlines()), 7)
+
+        game = self.recovered()
+        self.assertEqual(game.snapshot(), room.game.snapshot())
+
+        # The recovered game keeps playing the same way
+        game.clock = self.clock
+        for _ in range(5):
+            game.end_turn()
+            room.game.end_turn()
+        self.assertEqual(game.snapshot(), room.game.snapshot())
+
+    def test_torn_last_line_is_ignored(self):
+        room = self.new_room()
+        play(room, self.clock, turns=5)
+        expected = room.game.snapshot()
+        room.journal.close()
+        with open(room.journal.journal_path, "a", encoding="utf-8") as f:
+            f.write('[999,"buy","Pla')
+        self.assertEqual(self.recovered().snapshot(), expected)
+
+    def test_entries_in_snapshot_are_skipped(self):
+        room = self.new_room()
+        play(room, self.clock, turns=5)
+        room.journal.close()
+        with open(room.journal.journal_path, encoding="utf-8") as f:
+            lines = f.readlines()
+
+        # Crash after writing the snapshot but before truncating the journal
+        room.journal.write_snapshot(room.game)
+        with open(room.journal.journal_path, "w", encoding="utf-8") as f:
+            f.writelines(lines)
+        self.assertEqual(self.recovered().snapshot(), room.game.snapshot())
+
+    def test_snapshots_with_dropped_fields_load(self):
+        room = self.new_room()
+        play(room, self.clock, turns=5)
+        data = room.game.snapshot()
+        data["last_totals"] = {"LEAD": 9, "ZINC": 0, "TIN": 0, "GOLD": 0}
+        game = GameEngine.from_snapshot(data, clock=self.clock)
+        self.assertEqual(game.snapshot(), room.game.snapshot())
+
+    def test_failed_commands_replay_the_same(self):
+        room = self.new_room()
+        with self.assertRaises(KeyError):
+            room.run("buy", "Nobody", "LEAD", 1)
+        room.journal.close()
+        self.assertEqual(self.recovered().snapshot(), room.game.snapshot())
+
+    def test_deferred_saves(self):
+        room = self.new_room(snapshot_every=7)
+        room.defer_saves()
+        play(room, self.clock, turns=5)
+        self.assertEqual(self.recovered().players, ["Player1", "Player2"])
+        room.save()
+        room.journal.close()
+        self.assertEqual(self.recovered().snapshot(), room.game.snapshot())
+
+        # A reset in the batch: the snapshot covers what ran after it
+        play(room, self.clock, turns=2)
+        room.reset()
+        room.run("add_player", "Player1")
+        room.save()
+        room.journal.close()
+        self.assertEqual(self.recovered().snapshot(), room.game.snapshot())
+
+    def test_evicted_room_is_forgotten(self):
+        rooms = RoomRegistry(journal_dir=self.directory, idle_timeout=0)
+        journal = rooms.get_or_create("table1").journal
+        self.assertTrue(os.path.exists(journal.snapshot_path))
+        rooms.evict_idle()
+        self.assertFalse(os.path.exists(journal.snapshot_path))
+        self.assertEqual(GameJournal(self.directory, "table1").load(), None)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -43,6 +43,32 @@ class TestLastPlayer(unittest.TestCase):
         self.assertIn("Player2", non_bankrupt)
         self.assertIn("Player3", non_bankrupt)
 
+    def test_turns_skip_bankrupt_seats(self):
+        self.game.add_player("Player4")
+        self.game.player_data["Player2"]["bankrupt"] = True
+        self.game.player_data["Player3"]["bankrupt"] = True
+        self.assertEqual(self.game.take_bankruptcies(), ["Player2", "Player3"])
+        self.assertEqual(self.game.take_bankruptcies(), [])
+
+        order = []
+        for _ in range(4):
+            self.game.end_turn()
+            order.append(self.game.get_current_player())
+        self.assertEqual(order, ["Player4", "Player1", "Player4", "Player1"])
+        self.assertEqual(self.game.round, 2)
+
+        # Back in the game (e.g. a restored snapshot) and next in line again
+        self.game.player_data["Player2"]["bankrupt"] = False
+        self.game.end_turn()
+        self.assertEqual(self.game.get_current_player(), "Player2")
+
+        for name in self.game.players:
+            self.game.player_data[name]["bankrupt"] = True
+        self.assertEqual(self.game.end_turn(), (["GAME OVER - ALL BANKRUPT"], [], True))
+        self.assertEqual(
+            self.game.take_bankruptcies(), ["Player1", "Player2", "Player4"]
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+from loadtest import LoadStats, format_reports
+
+
+class TestLoadStats(unittest.TestCase):
+    def test_percentiles(self):
+        stats = LoadStats()
+        for ms in range(1, 101):
+            stats.add("buy", ms / 1000)
+        summary = stats.summary()["buy"]
+        self.assertEqual(summary["count"], 100)
+        self.assertAlmostEqual(summary["p50_ms"], 50)
+        self.assertAlmostEqual(summary["p95_ms"], 95)
+        self.assertAlmostEqual(summary["p99_ms"], 99)
+        self.assertAlmostEqual(summary["max_ms"], 100)
+
+    def test_percentiles_of_few_samples(self):
+        stats = LoadStats()
+        for ms in range(10, 0, -1):
+            stats.add("buy", ms / 1000)
+        summary = stats.summary()["buy"]
+        self.assertAlmostEqual(summary["p50_ms"], 5)
+        self.assertAlmostEqual(summary["p95_ms"], 10)
+        stats.add("sell", 0.003)
+        self.assertAlmostEqual(stats.summary()["sell"]["p50_ms"], 3)
+
+    def test_format_reports(self):
+        stats = LoadStats()
+        stats.add("end_turn_fanout", 0.004)
+        report = {
+            "label": "threading",
+            "clients": 8,
+            "actions_per_s": 120.0,
+            "events_received_per_s": 900.0,
+            "timeouts": 0,
+            "errors": 0,
+            "latency": stats.summary(),
+        }
+        text = format_reports([report])
+        self.assertIn("== threading: 8 clients, 120 actions/s", text)
+        self.assertIn("end_turn_fanout", text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import json
+import logging
+import unittest
+from server import logs
+
+
+class Capture(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class TestTrace(unittest.TestCase):
+    def setUp(self):
+        self.capture = Capture()
+        logs.log.addHandler(self.capture)
+        self.addCleanup(logs.log.removeHandler, self.capture)
+        level = logs.log.level
+        self.addCleanup(logs.log.setLevel, level)
+        self.addCleanup(logs.set_room_debug, "t1", False)
+
+    def test_off_by_default(self):
+        logs.log.setLevel(logging.INFO)
+        logs.trace("t1", "game update", round=1)
+        self.assertEqual(self.capture.records, [])
+
+    def test_room_debug_traces_everything(self):
+        logs.log.setLevel(logging.INFO)
+        logs.set_room_debug("t1", True)
+        for _ in range(10):
+            logs.trace("t1", "game update", round=1)
+        logs.trace("t2", "game update", round=1)
+        self.assertEqual(len(self.capture.records), 10)
+        self.assertEqual(self.capture.records[0].room, "t1")
+        self.assertEqual(
+            logs.fields_of(self.capture.records[0]), {"round": 1, "room": "t1"}
+        )
+
+    def test_debug_level_is_sampled(self):
+        logs.log.setLevel(logging.DEBUG)
+        original = logs._trace_sample
+        self.addCleanup(setattr, logs, "_trace_sample", original)
+        logs._trace_sample = 0.25
+        for _ in range(2000):
+            logs.trace("t2", "event")
+        self.assertTrue(300 < len(self.capture.records) < 700)
+
+    def test_formatters(self):
+        record = logging.makeLogRecord(
+            {"name": "stockmarket", "levelname": "INFO", "msg": "recovered table"}
+        )
+        record.room = "t1"
+        self.assertTrue(
+            logs.KeyValueFormatter()
+            .format(record)
+            .endswith("INFO stockmarket recovered table room=t1")
+        )
+        data = json.loads(logs.JsonFormatter().format(record))
+        self.assertEqual(data["msg"], "recovered table")
+        self.assertEqual(data["room"], "t1")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+from metrics import Counter, Gauge, Histogram, Registry
+from rooms import RoomRegistry
+from server.core import metrics_text
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.registry = Registry()
+
+    def test_counter(self):
+        trades = Counter("trades", "Trades", ["side"], registry=self.registry)
+        trades.labels("buy").inc()
+        trades.labels("buy").inc(2)
+        trades.labels('se"ll').inc()
+        text = self.registry.render()
+        self.assertIn("# TYPE trades counter", text)
+        self.assertIn('trades_total{side="buy"} 3', text)
+        self.assertIn('trades_total{side="se\\"ll"} 1', text)
+
+    def test_unlabelled_metrics_start_at_zero(self):
+        Counter("bankruptcies", "Bankruptcies", registry=self.registry)
+        Gauge("rooms", "Rooms", callback=lambda: 4, registry=self.registry)
+        text = self.registry.render()
+        self.assertIn("bankruptcies_total 0", text)
+        self.assertIn("rooms 4", text)
+
+    def test_histogram_buckets_are_cumulative(self):
+        seconds = Histogram(
+            "seconds", "Seconds", buckets=[0.1, 1.0], registry=self.registry
+        )
+        for value in (0.05, 0.1, 0.5, 3.0):
+            seconds.observe(value)
+        text = self.registry.render()
+        self.assertIn('seconds_bucket{le="0.1"} 2', text)
+        self.assertIn('seconds_bucket{le="1.0"} 3', text)
+        self.assertIn('seconds_bucket{le="+Inf"} 4', text)
+        self.assertIn("seconds_sum 3.65", text)
+        self.assertIn("seconds_count 4", text)
+
+    def test_labels_must_match(self):
+        trades = Counter("trades", "Trades", ["side"], registry=self.registry)
+        with self.assertRaises(ValueError):
+            trades.labels()
+
+    def test_server_metrics(self):
+        rooms = RoomRegistry()
+        room = rooms.join("sid1", "t1")
+        room.run("add_player", "Player1")
+        room.run("end_turn")  # One player: every turn ends a round
+        text = metrics_text(rooms)
+        self.assertIn("stockmarket_rooms 1", text)
+        self.assertIn("stockmarket_players 1", text)
+        self.assertIn("stockmarket_clients 1", text)
+        self.assertIn('stockmarket_command_seconds_count{op="add_player"}', text)
+        self.assertIn("stockmarket_round_end_seconds_count", text)
+        self.assertIn("stockmarket_bankruptcies", text)
+
+
+if __name__ == "__main__":
+    unittest.main()
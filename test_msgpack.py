@@ -0,0 +1,53 @@
+import unittest
+from rooms import RoomRegistry
+from server import core, fastjson
+
+try:
+    import msgpack
+    from server import msgpack_codec
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+
+@unittest.skipUnless(msgpack, "msgpack is not installed")
+class TestMsgPack(unittest.TestCase):
+    def setUp(self):
+        self.room = RoomRegistry().get_or_create("t1")
+        self.room.run("add_player", "Player1")
+        self.room.run("add_player", "Player2")
+        self.room.run("buy", "Player1", "LEAD", 1)
+
+    def tearDown(self):
+        core.use_serializer("json")
+
+    def test_compact_snapshot_round_trip(self):
+        state = self.room.game.state_snapshot()
+        compact = msgpack_codec.compact_snapshot(state)
+        self.assertEqual(msgpack_codec.expand_snapshot(compact), state)
+
+    def test_packed_payloads_are_spliced_in(self):
+        payload = msgpack_codec.encode({"v": 3})
+        packet = msgpack_codec.MsgPackPacket(data=["batch", [["update", payload]]])
+        decoded = msgpack_codec.MsgPackPacket(encoded_packet=packet.encode())
+        self.assertEqual(decoded.data, ["batch", [["update", {"v": 3}]]])
+
+    def test_packed_batch_for_another_node(self):
+        batch = ["batch", [["patch", msgpack_codec.encode({"v": 3})]]]
+        payload = msgpack_codec.unpack(msgpack_codec.pack(batch))
+        self.assertEqual(
+            msgpack.unpackb(payload.data), ["batch", [["patch", {"v": 3}]]]
+        )
+
+    def test_snapshot_payload_follows_serializer(self):
+        self.assertIsInstance(core.snapshot_payload(self.room), fastjson.RawJSON)
+        self.assertIs(core.use_serializer("msgpack"), msgpack_codec.MsgPackPacket)
+        payload = core.snapshot_payload(self.room)
+        self.assertIsInstance(payload, msgpack_codec.Packed)
+        self.assertEqual(
+            msgpack_codec.expand_snapshot(msgpack.unpackb(payload.data)),
+            self.room.game.state_snapshot(),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
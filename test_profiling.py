@@ -0,0 +1,74 @@
+import os
+import pstats
+import tempfile
+import unittest
+from rooms import Outbox, RoomRegistry
+from server.profiling import HandlerProfiler
+
+
+def inner(n):
+    return sum(range(n))
+
+
+def slow_command(room, out, sid, n):
+    for _ in range(20):
+        inner(n)
+    out.emit("done", n, to=sid)
+
+
+class TestHandlerProfiler(unittest.TestCase):
+    def setUp(self):
+        self.room = RoomRegistry().get_or_create("t1")
+        self.profiler = HandlerProfiler(capacity=3)
+        self.profiler.start()
+
+    def run_command(self, event="buy"):
+        out = Outbox()
+        self.profiler.wrap(event, slow_command)(self.room, out, "sid1", 20000)
+        return out
+
+    def test_wrapped_command_still_runs(self):
+        out = self.run_command()
+        self.assertEqual(out.events, [("done", 20000, "sid1")])
+        self.assertEqual(self.profiler.summary()["events"]["buy"]["count"], 1)
+
+    def test_ring_buffer_keeps_the_newest(self):
+        for event in ("buy", "sell", "end_turn", "end_turn"):
+            self.run_command(event)
+        self.assertEqual(
+            [r.event for r in self.profiler.selected()],
+            ["sell", "end_turn", "end_turn"],
+        )
+        self.profiler.start()
+        self.assertEqual(self.profiler.selected(), [])
+
+    def test_collapsed_stacks(self):
+        self.run_command()
+        lines = self.profiler.collapsed("buy").splitlines()
+        stacks = {line.rsplit(" ", 1)[0] for line in lines}
+        self.assertIn(
+            "buy;slow_command (test_profiling.py:13);inner (test_profiling.py:9)",
+            stacks,
+        )
+        self.assertTrue(all(int(line.rsplit(" ", 1)[1]) > 0 for line in lines))
+
+    def test_pstats_file(self):
+        self.run_command()
+        self.run_command()
+        fd, path = tempfile.mkstemp(suffix=".prof")
+        self.addCleanup(os.remove, path)
+        with os.fdopen(fd, "wb") as f:
+            f.write(self.profiler.pstats_bytes())
+        stats = pstats.Stats(path)
+        calls = {func[2]: entry[1] for func, entry in stats.stats.items()}
+        self.assertEqual(calls["inner"], 40)
+
+    def test_stop(self):
+        self.profiler.stop()
+        body, content_type = self.profiler.handle_request("GET", fmt="summary")
+        self.assertEqual(content_type, "application/json")
+        self.assertIn(b'"profiling": false', body)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,162 @@
+import threading
+import unittest
+from rooms import (
+    DEFAULT_GAME_ID,
+    STATE_UPDATE,
+    Outbox,
+    Room,
+    RoomLimitError,
+    RoomRegistry,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestRoomRegistry(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.rooms = RoomRegistry(max_rooms=2, idle_timeout=60, clock=self.clock)
+
+    def test_rooms_have_separate_games(self):
+        table1 = self.rooms.join("sid1", "table1")
+        table2 = self.rooms.join("sid2", "table2")
+        table1.game.add_player("Player1")
+        table2.game.add_player("Player2")
+
+        self.assertIsNot(table1.game, table2.game)
+        self.assertEqual(table1.game.players, ["Player1"])
+        self.assertEqual(table2.game.players, ["Player2"])
+        self.assertIs(self.rooms.room_for("sid1"), table1)
+        self.assertIs(self.rooms.room_for("sid2"), table2)
+
+    def test_game_id_is_normalized(self):
+        room = self.rooms.join("sid1", "  Friday ")
+        self.assertEqual(room.game_id, "friday")
+        self.assertIs(self.rooms.get("FRIDAY"), room)
+        self.assertEqual(self.rooms.join("sid2", None).game_id, DEFAULT_GAME_ID)
+
+    def test_switching_rooms_unbinds_old_room(self):
+        table1 = self.rooms.join("sid1", "table1")
+        table2 = self.rooms.join("sid1", "table2")
+        self.assertNotIn("sid1", table1.sids)
+        self.assertIn("sid1", table2.sids)
+
+    def test_idle_rooms_are_evicted(self):
+        self.rooms.join("sid1", "table1")
+        self.rooms.join("sid2", "table2")
+        self.rooms.leave("sid1")
+
+        self.clock.now = 30
+        self.assertEqual(self.rooms.evict_idle(), [])
+
+        # Rooms with connected players are never evicted
+        self.clock.now = 120
+        self.assertEqual(self.rooms.evict_idle(), ["table1"])
+        self.assertIn("table2", self.rooms)
+
+    def test_room_cap(self):
+        self.rooms.join("sid1", "table1")
+        self.rooms.join("sid2", "table2")
+        with self.assertRaises(RoomLimitError):
+            self.rooms.join("sid3", "table3")
+
+        # An idle room makes space for a new one
+        self.rooms.leave("sid1")
+        self.clock.now = 120
+        self.assertEqual(self.rooms.join("sid3", "table3").game_id, "table3")
+        self.assertNotIn("table1", self.rooms)
+        self.assertEqual(len(self.rooms), 2)
+        self.assertEqual(self.rooms.take_evicted(), ["table1"])
+        self.assertEqual(self.rooms.take_evicted(), [])
+
+    def test_reset_keeps_table(self):
+        room = self.rooms.join("sid1", "table1")
+        room.game.add_player("Player1")
+        room.host_player = "Player1"
+        room.reset()
+        self.assertEqual(room.game.players, [])
+        self.assertIsNone(room.host_player)
+        self.assertIs(self.rooms.room_for("sid1"), room)
+
+
+def buy_command(room, out, sid, share):
+    success, msg = room.run("buy", room.game.get_current_player(), share, 1)
+    out.emit("message", {"msg": msg}, to=sid)
+    out.send_state()
+
+
+class TestCommandQueue(unittest.TestCase):
+    def setUp(self):
+        self.room = Room("table1", 0)
+        self.room.game.add_player("Player1")
+        self.flushed = []
+
+    def flush(self, room, outbox):
+        self.flushed.append(list(outbox.drain()))
+
+    def test_batch_coalesces_state_updates(self):
+        for i, share in enumerate(["LEAD", "ZINC", "TIN"]):
+            self.room.submit(buy_command, f"sid{i}", share)
+        self.room.close()
+        self.room.serve(self.flush)
+
+        # One batch, replies in order and a single state broadcast at the end
+        self.assertEqual(len(self.flushed), 1)
+        events = self.flushed[0]
+        self.assertEqual([to for _, _, to in events[:3]], ["sid0", "sid1", "sid2"])
+        self.assertEqual(events[3], (STATE_UPDATE, False, None))
+        shares = self.room.game.player_data["Player1"].shares
+        self.assertEqual((shares["LEAD"], shares["ZINC"], shares["TIN"]), (1, 1, 1))
+
+    def test_commands_from_many_threads_are_not_lost(self):
+        self.room.game.player_data["Player1"].balance = 10**6
+        worker = threading.Thread(target=self.room.serve, args=(self.flush,))
+        worker.start()
+
+        def client():
+            for _ in range(50):
+                self.room.submit(buy_command, "sid", "LEAD").wait(5)
+
+        clients = [threading.Thread(target=client) for _ in range(4)]
+        for thread in clients:
+            thread.start()
+        for thread in clients:
+            thread.join()
+        self.room.close()
+        worker.join(5)
+
+        self.assertEqual(self.room.game.player_data["Player1"].shares["LEAD"], 200)
+        self.assertEqual(
+            sum(len(batch) for batch in self.flushed), 200 + len(self.flushed)
+        )
+
+    def test_failing_command_does_not_stop_worker(self):
+        def broken(room, out, sid):
+            raise RuntimeError("boom")
+
+        done = self.room.submit(broken, "sid")
+        self.room.submit(buy_command, "sid", "GOLD")
+        self.room.close()
+        self.room.serve(self.flush)
+        self.assertTrue(done.is_set())
+        self.assertEqual(self.room.game.player_data["Player1"].shares["GOLD"], 1)
+
+    def test_full_state_wins_when_coalesced(self):
+        outbox = Outbox()
+        outbox.send_state(full=True)
+        outbox.emit("news", {"events": []})
+        outbox.send_state()
+        self.assertEqual(
+            list(outbox.drain()),
+            [("news", {"events": []}, None), (STATE_UPDATE, True, None)],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
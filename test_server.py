@@ -0,0 +1,325 @@
+import asyncio
+import json
+import os
+import threading
+import time
+import unittest
+from rooms import RoomRegistry
+from server.asgi_backend import AsyncGameServer, page_app, render_page
+from server.cluster import Cluster, LocalBroker
+from server.fastjson import RawJSON
+from server.core import (
+    ADMIN_TOKEN_ENV,
+    BATCH_EVENT,
+    EVENTS,
+    GameServer,
+    Transport,
+    admin_allowed,
+)
+
+
+class FakeTransport(Transport):
+    """Records what would be sent, per socket, with rooms and batches resolved"""
+
+    def __init__(self):
+        self.members = {}
+        self.received = {}
+        self.frames = {}
+        self.lock = threading.Lock()
+
+    def emit(self, event, data=None, to=None, skip_sid=()):
+        if isinstance(data, RawJSON):  # Relayed by another node
+            data = json.loads(data.text)
+        events = data if event == BATCH_EVENT else [(event, data)]
+        with self.lock:
+            sids = self.members.get(to, {to})
+            for sid in sids - set(skip_sid):
+                self.frames[sid] = self.frames.get(sid, 0) + 1
+                self.received.setdefault(sid, []).extend(map(tuple, events))
+
+    def enter_room(self, sid, room):
+        self.members.setdefault(room, set()).add(sid)
+
+    def leave_room(self, sid, room):
+        self.members.get(room, set()).discard(sid)
+
+    def start_background_task(self, target, *args):
+        thread = threading.Thread(target=target, args=args, daemon=True)
+        thread.start()
+        return thread
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+    def events(self, sid):
+        with self.lock:
+            events, self.received[sid] = self.received.get(sid, []), []
+        return [event for event, _ in events]
+
+
+class TestGameServer(unittest.TestCase):
+    def setUp(self):
+        self.transport = FakeTransport()
+        self.server = GameServer(self.transport, RoomRegistry())
+        self.server.handle("join", "sid1", {"username": "Player1", "game_id": "t1"})
+        self.server.handle("join", "sid2", {"username": "Player2", "game_id": "t1"})
+        self.server.handle("start_game", "sid1", {"difficulty": 1, "goal": 10**6})
+        # Flash news could split or bonus the shares being counted
+        self.server.rooms.get("t1").game._last_flash_news_time = float("inf")
+        self.transport.events("sid1")
+        self.transport.events("sid2")
+        self.transport.frames.clear()
+
+    def test_every_event_is_handled(self):
+        self.assertIn("join", EVENTS)
+        self.assertIn("buy", EVENTS)
+        self.assertIn("update_settings", EVENTS)
+
+    def test_buy_replies_to_sender_and_broadcasts(self):
+        trade = {"username": "Player1", "share": "LEAD", "amount": 5}
+        self.server.handle("buy", "sid1", trade)
+        self.assertEqual(
+            self.transport.events("sid1")[:3], ["message", "activity", "patch"]
+        )
+        self.assertEqual(self.transport.events("sid2")[:2], ["activity", "patch"])
+        self.assertEqual(self.transport.frames, {"sid1": 1, "sid2": 1})
+
+        game = self.server.rooms.get("t1").game
+        self.assertEqual(game.player_data["Player1"].shares["LEAD"], 5)
+
+    def test_not_your_turn(self):
+        trade = {"username": "Player2", "share": "LEAD", "amount": 5}
+        self.server.handle("buy", "sid2", trade)
+        self.assertEqual(self.transport.events("sid2"), ["message"])
+        self.assertEqual(self.transport.events("sid1"), [])
+
+    def test_tables_are_separate(self):
+        self.server.handle("join", "sid3", {"username": "Player3", "game_id": "t2"})
+        self.assertEqual(self.transport.events("sid3"), ["lobby"])
+        self.assertEqual(self.transport.events("sid1"), [])
+        self.assertEqual(self.server.rooms.get("t2").game.players, ["Player3"])
+
+    def test_events_without_a_table(self):
+        self.server.handle("get_final_scores", "sid9", None)
+        self.assertEqual(self.transport.events("sid9"), ["error"])
+        self.server.handle("buy", "sid9", {})  # Ignored
+        self.assertEqual(self.transport.events("sid9"), [])
+
+    def test_flush_profiles_encoding_without_emits(self):
+        self.server.profiler.start()
+        trade = {"username": "Player1", "share": "LEAD", "amount": 1}
+        self.server.handle("buy", "sid1", trade)
+        self.assertIn("patch", self.transport.events("sid2"))
+        names = {func[2] for func in self.server.profiler.merged_stats("flush")}
+        self.assertIn("outbox_messages", names)
+        self.assertNotIn("emit", names)
+
+
+class TestCluster(unittest.TestCase):
+    """Two nodes on one broker: node a owns t1, sid2 is connected to node b"""
+
+    def setUp(self):
+        broker = LocalBroker()
+        self.a, self.b = FakeTransport(), FakeTransport()
+        self.node_a = GameServer(self.a, RoomRegistry(), cluster=Cluster(broker, "a"))
+        self.node_b = GameServer(self.b, RoomRegistry(), cluster=Cluster(broker, "b"))
+        self.node_a.start()
+        self.node_b.start()
+        self.node_a.handle("join", "sid1", {"username": "Player1", "game_id": "t1"})
+        self.node_b.handle("join", "sid2", {"username": "Player2", "game_id": "t1"})
+        self.room = self.node_a.rooms.get("t1")
+        self.room.game._last_flash_news_time = float("inf")
+
+    def test_room_lives_on_its_owner(self):
+        self.assertNotIn("t1", self.node_b.rooms)
+        self.assertEqual(self.room.game.players, ["Player1", "Player2"])
+        self.assertEqual(self.room.sids, {"sid1", "sid2"})
+        self.assertEqual(self.b.events("sid2"), ["lobby"])
+        self.assertEqual(self.a.events("sid1"), ["lobby", "lobby"])
+
+    def test_broadcasts_reach_every_node(self):
+        self.node_b.handle("start_game", "sid2", {"difficulty": 1, "goal": 10**6})
+        self.a.events("sid1")
+        self.b.events("sid2")
+        self.b.frames.clear()
+
+        trade = {"username": "Player1", "share": "LEAD", "amount": 5}
+        self.node_a.handle("buy", "sid1", trade)
+        self.assertEqual(self.a.events("sid1")[:3], ["message", "activity", "patch"])
+        self.assertEqual(self.b.events("sid2")[:2], ["activity", "patch"])
+        self.assertEqual(self.b.frames, {"sid2": 1})
+
+        # Replies to a remote socket only go to its node
+        self.node_b.handle("buy", "sid2", {**trade, "username": "Player2"})
+        self.assertEqual(self.b.events("sid2"), ["message"])
+        self.assertEqual(self.a.events("sid1"), [])
+
+    def test_claims(self):
+        broker = self.node_a.cluster.broker
+        self.assertEqual(broker.claim("t1", "b"), "a")
+        broker.release("t1", "b")  # Not b's to release
+        self.assertEqual(broker.claim("t1", "b"), "a")
+        self.node_a.cluster.release(["t1"])
+        self.assertEqual(broker.claim("t1", "b"), "b")
+
+    def test_disconnect_and_rejoin_elsewhere(self):
+        self.node_b.handle("disconnect", "sid2")
+        self.assertEqual(self.room.sids, {"sid1"})
+        self.assertEqual(self.node_a.cluster.guests, {})
+
+        self.node_b.handle("join", "sid3", {"username": "Player3", "game_id": "t2"})
+        self.assertEqual(self.node_b.rooms.get("t2").game.players, ["Player3"])
+        self.node_b.handle("join", "sid3", {"username": "Player3", "game_id": "t1"})
+        self.assertNotIn("sid3", self.node_b.rooms.get("t2").sids)
+        self.assertIn("Player3", self.room.game.players)
+
+
+class FakeAsyncServer:
+    """Stands in for socketio.AsyncServer"""
+
+    def __init__(self):
+        self.transport = FakeTransport()
+        self.tasks = []
+
+    async def emit(self, event, data=None, to=None, skip_sid=None):
+        self.transport.emit(event, data, to, skip_sid or ())
+
+    def enter_room(self, sid, room):
+        self.transport.enter_room(sid, room)
+
+    def leave_room(self, sid, room):
+        self.transport.leave_room(sid, room)
+
+    def start_background_task(self, target, *args):
+        task = asyncio.ensure_future(target(*args))
+        self.tasks.append((args, task))
+        return task
+
+    async def sleep(self, seconds):
+        await asyncio.sleep(seconds)
+
+
+class TestAsyncGameServer(unittest.IsolatedAsyncioTestCase):
+    async def test_commands_run_on_room_task(self):
+        sio = FakeAsyncServer()
+        server = AsyncGameServer(sio, RoomRegistry())
+        await server.handle("join", "sid1", {"username": "Player1", "game_id": "t1"})
+        await server.handle("join", "sid2", {"username": "Player2", "game_id": "t1"})
+        await server.handle("start_game", "sid1", {"difficulty": 1, "goal": 10**6})
+        server.rooms.get("t1").game._last_flash_news_time = float("inf")
+        sio.transport.events("sid1")
+        sio.transport.events("sid2")
+
+        # Trades sent at once are applied in order on the table's task
+        trade = {"username": "Player1", "share": "LEAD", "amount": 1}
+        await asyncio.gather(*(server.handle("buy", "sid1", trade) for _ in range(5)))
+        self.assertEqual(
+            server.rooms.get("t1").game.player_data["Player1"].shares["LEAD"], 5
+        )
+        self.assertIn("patch", sio.transport.events("sid2"))
+
+        for room in server.rooms.rooms():
+            room.close()
+
+    async def test_cluster_forwards_to_owner(self):
+        broker = LocalBroker()
+        sio_a, sio_b = FakeAsyncServer(), FakeAsyncServer()
+        node_a = AsyncGameServer(sio_a, RoomRegistry(), cluster=Cluster(broker, "a"))
+        node_b = AsyncGameServer(sio_b, RoomRegistry(), cluster=Cluster(broker, "b"))
+        node_a.start()
+        node_b.start()
+        await node_a.handle("join", "sid1", {"username": "Player1", "game_id": "t1"})
+        await node_b.handle("join", "sid2", {"username": "Player2", "game_id": "t1"})
+        self.assertEqual(node_a.rooms.get("t1").game.players, ["Player1", "Player2"])
+        self.assertNotIn("t1", node_b.rooms)
+        self.assertEqual(sio_b.transport.events("sid2"), ["lobby"])
+
+        for room in node_a.rooms.rooms():
+            room.close()
+
+    async def test_rooms_evicted_at_the_limit_stop_their_task(self):
+        sio = FakeAsyncServer()
+        server = AsyncGameServer(sio, RoomRegistry(max_rooms=1, idle_timeout=0))
+        await server.handle("join", "sid1", {"username": "Player1", "game_id": "t1"})
+        first = server.rooms.get("t1")
+        await server.handle("disconnect", "sid1")
+        await server.handle("join", "sid2", {"username": "Player2", "game_id": "t2"})
+        self.assertNotIn("t1", server.rooms)
+
+        await asyncio.sleep(0)
+        workers = [task for args, task in sio.tasks if args and args[0] is first]
+        self.assertEqual(len(workers), 1)
+        self.assertTrue(workers[0].done())
+        server.rooms.get("t2").close()
+
+    async def test_saves_run_off_the_event_loop(self):
+        sio = FakeAsyncServer()
+        server = AsyncGameServer(sio, RoomRegistry())
+        await server.handle("join", "sid1", {"username": "Player1", "game_id": "t1"})
+        room = server.rooms.get("t1")
+        saved = []
+
+        def slow_save():
+            time.sleep(0.2)  # A slow disk
+            saved.append(room.unsaved)
+
+        room.save = slow_save
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker = asyncio.ensure_future(tick())
+        await server.handle("join", "sid2", {"username": "Player2", "game_id": "t1"})
+        ticker.cancel()
+        self.assertEqual(saved, [[("add_player", ("Player2",))]])
+        self.assertGreater(ticks, 5)
+        room.close()
+
+    async def test_admin_pages_need_the_token(self):
+        app = page_app(b"page", AsyncGameServer(FakeAsyncServer(), RoomRegistry()))
+
+        async def status(path, headers=()):
+            sent = []
+
+            async def send(message):
+                sent.append(message)
+
+            scope = {
+                "type": "http",
+                "method": "GET",
+                "path": path,
+                "client": ("127.0.0.1", 1),  # Same host, e.g. a reverse proxy
+                "headers": list(headers),
+            }
+            await app(scope, None, send)
+            return sent[0]["status"]
+
+        token = [(b"authorization", b"Bearer s3cret")]
+        self.assertEqual(await status("/profile", token), 403)  # No token set
+        os.environ[ADMIN_TOKEN_ENV] = "s3cret"
+        self.addCleanup(os.environ.pop, ADMIN_TOKEN_ENV)
+        self.assertEqual(await status("/profile"), 403)
+        self.assertEqual(await status("/profile", [(b"authorization", b"x")]), 403)
+        self.assertEqual(await status("/profile", token), 200)
+        self.assertEqual(await status("/"), 200)
+
+    def test_admin_token_must_match(self):
+        os.environ.pop(ADMIN_TOKEN_ENV, None)
+        self.assertFalse(admin_allowed("Bearer "))
+        os.environ[ADMIN_TOKEN_ENV] = "s3cret"
+        self.addCleanup(os.environ.pop, ADMIN_TOKEN_ENV)
+        self.assertTrue(admin_allowed("Bearer s3cret"))
+        self.assertFalse(admin_allowed("Bearer s3cre"))
+        self.assertFalse(admin_allowed(None))
+
+    def test_page_is_rendered_without_flask(self):
+        html = render_page("index.html", ".").decode("utf-8")
+        self.assertIn('src="/static/game.js"', html)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+from simulate import SimulationStats, game_seed, play_game, run_shard, simulate
+
+
+class TestSimulate(unittest.TestCase):
+    def test_game_ends(self):
+        result = play_game(1, ["random", "momentum"], max_rounds=30)
+        self.assertIn(
+            result["reason"], ["target", "last_player", "all_bankrupt", "max_rounds"]
+        )
+        self.assertLessEqual(result["rounds"], 30)
+        self.assertEqual(result["players"], 2)
+
+    def test_low_target_is_reached(self):
+        result = play_game(3, ["random", "random"], target_value=1500)
+        self.assertEqual(result["reason"], "target")
+        self.assertTrue(result["winners"])
+        self.assertEqual(
+            result["winning_strategies"], ["random"] * len(result["winners"])
+        )
+
+    def test_same_seed_same_game(self):
+        self.assertEqual(
+            play_game(7, ["random", "momentum"], max_rounds=20),
+            play_game(7, ["random", "momentum"], max_rounds=20),
+        )
+
+    def test_results_do_not_depend_on_sharding(self):
+        options = {"strategies": ["random", "idle"], "max_rounds": 10}
+        whole = run_shard((0, 6, 42, options))
+        parts = SimulationStats()
+        parts.merge(run_shard((0, 2, 42, options)))
+        parts.merge(run_shard((2, 4, 42, options)))
+        self.assertEqual(whole.summary(), parts.summary())
+
+    def test_nearby_base_seeds_share_no_games(self):
+        one = {game_seed(1, i) for i in range(100)}
+        two = {game_seed(2, i) for i in range(100)}
+        self.assertEqual(len(one), 100)
+        self.assertFalse(one & two)
+        self.assertEqual(game_seed(1, 5), game_seed(1, 5))
+
+    def test_simulate_streams_running_totals(self):
+        totals = [
+            stats.games
+            for stats in simulate(
+                5, ["random", "idle"], workers=1, shard_size=2, max_rounds=5
+            )
+        ]
+        self.assertEqual(totals, [2, 4, 5])
+
+    def test_unknown_strategy(self):
+        with self.assertRaises(ValueError):
+            next(simulate(1, ["psychic"], workers=1))
+
+
+if __name__ == "__main__":
+    unittest.main()
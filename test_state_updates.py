@@ -0,0 +1,74 @@
+import copy
+import unittest
+from engine import GameEngine
+
+
+def merge_patch(state, patch):
+    """Apply a patch the same way static/game.js does"""
+    for key, value in patch.items():
+        if isinstance(value, dict) and isinstance(state.get(key), dict):
+            merge_patch(state[key], value)
+        else:
+            state[key] = value
+
+
+class TestStateUpdates(unittest.TestCase):
+    def setUp(self):
+        self.game = GameEngine()
+        self.game.add_player("Player1")
+        self.game.add_player("Player2")
+        self.client = self.game.state_snapshot()
+
+    def sync(self):
+        """Bring the client state up to date with a patch and compare"""
+        patch = self.game.state_patch(self.client["v"])
+        self.assertIsNotNone(patch)
+        self.assertEqual(patch["base"], self.client["v"])
+        merge_patch(self.client, {k: v for k, v in patch.items() if k != "base"})
+        self.assertEqual(self.client, self.game.state_snapshot())
+        return patch
+
+    def test_trade_patch_only_has_changed_fields(self):
+        self.game.buy("Player1", "LEAD", 10)
+        patch = self.sync()
+        self.assertEqual(
+            patch["players"],
+            {"Player1": {"balance": 900, "trades_count": 1, "shares": {"LEAD": 10}}},
+        )
+        self.assertNotIn("share_prices", patch)
+
+    def test_patches_follow_a_game(self):
+        self.game.buy("Player1", "GOLD", 1)  # Bought with loan
+        self.sync()
+        self.game.end_turn()
+        self.sync()
+        self.game.sell("Player2", "LEAD", 1)  # Fails, nothing changes
+        patch = self.sync()
+        self.assertEqual(set(patch), {"id", "v", "base"})
+        for _ in range(10):
+            self.game.end_turn()
+            self.sync()
+
+    def test_patch_can_skip_versions(self):
+        old_client = copy.deepcopy(self.client)
+        self.game.buy("Player1", "LEAD", 5)
+        self.game.end_turn()
+        self.game.add_player("Player3")
+        self.sync()
+
+        # A patch from an older version carries everything since then
+        self.client = old_client
+        patch = self.sync()
+        self.assertIn("Player3", patch["players"])
+
+    def test_unknown_version_needs_snapshot(self):
+        self.assertIsNone(self.game.state_patch(self.game.version + 1))
+
+    def test_reset_changes_state_id(self):
+        state_id = self.game.state_id
+        self.game.reset_game()
+        self.assertNotEqual(self.game.state_id, state_id)
+
+
+if __name__ == "__main__":
+    unittest.main()
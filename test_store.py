@@ -0,0 +1,156 @@
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from rooms import RoomRegistry
+from store import MemoryStore, SQLiteStore, WriteBehind
+
+try:
+    import eventlet
+except ImportError:  # pragma: no cover - optional dependency
+    eventlet = None
+
+# A commit that blocks the OS thread for half a second, under eventlet
+EVENTLET_SLOW_COMMIT = """
+import eventlet
+eventlet.monkey_patch()
+from eventlet import patcher
+import store
+
+class SlowStore(store.MemoryStore):
+    def write(self, batch):
+        patcher.original("time").sleep(0.5)
+        super().write(batch)
+
+ticks = []
+def tick():
+    while True:
+        eventlet.sleep(0.01)
+        ticks.append(1)
+
+writer = store.WriteBehind(SlowStore(), flush_interval=0)
+eventlet.spawn(tick)
+writer.delete("t1")
+eventlet.sleep(0.4)
+print(len(ticks))
+"""
+
+
+def play(room, turns=12):
+    for turn in range(turns):
+        name = room.game.get_current_player()
+        room.run("buy", name, ["LEAD", "ZINC", "TIN", "GOLD"][turn % 4], 2)
+        room.run("end_turn")
+
+
+class CountingStore(MemoryStore):
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+
+    def write(self, batch):
+        self.batches.append(batch)
+        super().write(batch)
+
+
+class TestStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = os.path.join(self.directory, "games.db")
+
+    def new_room(self, store, game_id="table1"):
+        rooms = RoomRegistry(store=store)
+        room = rooms.get_or_create(game_id)
+        room.run("add_player", "Player1")
+        room.run("add_player", "Player2")
+        return room
+
+    def test_restart_from_sqlite(self):
+        store = WriteBehind(SQLiteStore(self.path), flush_interval=60)
+        room = self.new_room(store)
+        play(room)
+        store.close()
+
+        rooms = RoomRegistry(store=WriteBehind(SQLiteStore(self.path)))
+        self.assertEqual(rooms.recover(), ["table1"])
+        restored = rooms.get("table1").game
+        self.assertEqual(restored.snapshot(), room.game.snapshot())
+        self.assertEqual(rooms.get("table1").host_player, "Player1")
+
+        # Same RNG state: the next turns move prices the same way
+        for game in (room.game, restored):
+            game.end_turn()
+            game.end_turn()
+        self.assertEqual(restored.share_prices, room.game.share_prices)
+        rooms.store.close()
+
+    def test_sqlite_uses_wal(self):
+        SQLiteStore(self.path).close()
+        with sqlite3.connect(self.path) as db:
+            self.assertEqual(db.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+
+    def test_saves_are_written_behind_in_batches(self):
+        backend = CountingStore()
+        store = WriteBehind(backend, flush_interval=60)
+        play(self.new_room(store, "table1"))
+        play(self.new_room(store, "table2"))
+        self.assertEqual(backend.batches, [])
+        self.assertEqual(store.game_ids(), ["table1", "table2"])
+
+        self.assertEqual(store.flush(), 2)  # Newest snapshot per game only
+        self.assertEqual(len(backend.batches), 1)
+        self.assertEqual(store.flush(), 0)
+
+    def test_saves_do_not_wait_for_a_commit(self):
+        release = threading.Event()
+        writing = threading.Event()
+
+        class SlowStore(MemoryStore):
+            def write(self, batch):
+                writing.set()
+                release.wait(5)
+                super().write(batch)
+
+        store = WriteBehind(SlowStore(), flush_interval=0)
+        room = self.new_room(store)
+        self.assertTrue(writing.wait(5))
+        start = time.perf_counter()
+        play(room, turns=4)
+        self.assertLess(time.perf_counter() - start, 1)
+        self.assertEqual(store.load("table1").snapshot(), room.game.snapshot())
+        release.set()
+        store.close()
+        self.assertEqual(store.store.game_ids(), ["table1"])
+
+    @unittest.skipUnless(eventlet, "eventlet is not installed")
+    def test_commits_do_not_stall_eventlet(self):
+        here = os.path.dirname(os.path.abspath(__file__))
+        result = subprocess.run(
+            [sys.executable, "-c", EVENTLET_SLOW_COMMIT],
+            cwd=here,
+            capture_output=True,
+            text=True,
+            timeout=10,
+            check=True,
+        )
+        self.assertGreater(int(result.stdout), 20)  # Green threads kept running
+
+    def test_eviction_deletes(self):
+        store = WriteBehind(MemoryStore(), flush_interval=60)
+        rooms = RoomRegistry(store=store, idle_timeout=0)
+        rooms.get_or_create("table1").run("add_player", "Player1")
+        store.flush()
+        self.assertEqual(rooms.evict_idle(), ["table1"])
+        self.assertEqual(store.game_ids(), [])
+        store.flush()
+        self.assertEqual(store.store.snapshots, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
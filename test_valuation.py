@@ -0,0 +1,214 @@
+import random
+import unittest
+from engine import SHARES, GameEngine, Player
+from holdings import Holdings
+
+
+class TestHoldings(unittest.TestCase):
+    def test_rows_are_dict_views(self):
+        holdings = Holdings(SHARES)
+        row = holdings.row(holdings.add_row())
+        other = holdings.row(holdings.add_row())
+        row["TIN"] = 3
+        row["TIN"] += 2
+        self.assertEqual(row["TIN"], 5)
+        self.assertEqual(other["TIN"], 0)
+        self.assertEqual(dict(row), {"LEAD": 0, "ZINC": 0, "TIN": 5, "GOLD": 0})
+        self.assertIn("GOLD", row)
+        self.assertNotIn("IRON", row)
+
+    def test_values_is_matrix_vector_product(self):
+        holdings = Holdings(SHARES)
+        prices = {"LEAD": 3, "ZINC": 40, "TIN": 200, "GOLD": 1500}
+        rows = []
+        for _ in range(50):
+            row = holdings.row(holdings.add_row())
+            for s in SHARES:
+                row[s] = random.randint(0, 1000)
+            rows.append(row)
+
+        expected = [sum(row[s] * prices[s] for s in SHARES) for row in rows]
+        self.assertEqual(holdings.values(prices), expected)
+        self.assertEqual(holdings.value(7, prices), expected[7])
+        self.assertEqual(
+            holdings.column_totals(),
+            {s: sum(row[s] for row in rows) for s in SHARES},
+        )
+
+    def test_splits_and_bonus_issues_apply_on_read(self):
+        skip = bytearray()
+        holdings = Holdings(SHARES, skip=skip)
+        rows = []
+        for amount in (0, 1, 3, 7, 10):
+            rows.append(holdings.row(holdings.add_row()))
+            skip.append(0)
+            rows[-1]["ZINC"] = amount
+        skip[4] = 1  # Sits out splits
+
+        holdings.bonus("ZINC")
+        holdings.split("ZINC")
+        holdings.bonus("ZINC")
+        expected = []
+        for i, amount in enumerate((0, 1, 3, 7, 10)):
+            amount += amount // 2
+            amount *= 1 if skip[i] else 2
+            expected.append(amount + amount // 2)
+        self.assertEqual(holdings.column_totals()["ZINC"], sum(expected))
+        self.assertEqual([row["ZINC"] for row in rows], expected)
+
+        # A row settled before its flag changes keeps the splits it had
+        rows[3].settle()
+        skip[3] = 1
+        holdings.split("ZINC")
+        rows[2]["ZINC"] += 1
+        self.assertEqual(rows[3]["ZINC"], expected[3])
+        self.assertEqual(rows[2]["ZINC"], expected[2] * 2 + 1)
+        self.assertEqual(holdings.total("ZINC"), sum(row["ZINC"] for row in rows))
+
+
+class TestPlayer(unittest.TestCase):
+    def test_slotted_record_with_item_access(self):
+        game = GameEngine()
+        game.add_player("Player1")
+        pdata = game.player_data["Player1"]
+        self.assertIsInstance(pdata, Player)
+        self.assertFalse(hasattr(pdata, "__dict__"))
+
+        pdata["balance"] += 5
+        pdata.shares["ZINC"] = 3
+        self.assertEqual(pdata.balance, 1005)
+        self.assertEqual(pdata["shares"]["ZINC"], 3)
+        self.assertFalse(pdata.get("bankrupt", True))
+        self.assertIsNone(pdata.get("missing"))
+        with self.assertRaises(KeyError):
+            pdata["missing"] = 1
+
+    def test_to_wire(self):
+        game = GameEngine()
+        game.add_player("Player1")
+        game.buy("Player1", "TIN", 2)
+        self.assertEqual(
+            game.player_data["Player1"].to_wire(),
+            {
+                "balance": 500,
+                "shares": {"LEAD": 0, "ZINC": 0, "TIN": 2, "GOLD": 0},
+                "loan": 0,
+                "bankrupt": False,
+                "trades_count": 1,
+            },
+        )
+
+
+class TestValuation(unittest.TestCase):
+    def setUp(self):
+        self.game = GameEngine()
+        for name in ["Player1", "Player2", "Player3"]:
+            self.game.add_player(name)
+
+    def test_player_values(self):
+        self.game.player_data["Player2"]["shares"]["GOLD"] = 2
+        self.game.player_data["Player3"]["shares"]["LEAD"] = 10
+        self.assertEqual(
+            self.game.get_player_values(),
+            [
+                {"name": "Player1", "totalValue": 1000},
+                {"name": "Player2", "totalValue": 3500},
+                {"name": "Player3", "totalValue": 1100},
+            ],
+        )
+
+    def test_max_loan_uses_own_row(self):
+        self.game.player_data["Player2"]["shares"]["TIN"] = 4
+        self.assertEqual(self.game.calculate_max_loan("Player1"), 500)
+        self.assertEqual(self.game.calculate_max_loan("Player2"), 1000)
+
+    def test_millionaires_and_final_scores(self):
+        self.game.target_value = 5000
+        self.game.player_data["Player1"]["shares"]["GOLD"] = 4
+        self.game.player_data["Player1"]["loan"] = 500
+        self.assertEqual(self.game.check_millionaires(), ["Player1"])
+
+        scores = self.game.calculate_final_scores()
+        self.assertEqual(scores[0]["name"], "Player1")
+        self.assertEqual(scores[0]["total_value"], 1000 + 5000 - 500)
+
+    def test_price_moves_alone_cross_thresholds(self):
+        self.game.target_value = 5000
+        self.game.player_data["Player1"]["shares"]["GOLD"] = 4
+        self.game.player_data["Player2"]["shares"]["TIN"] = 4
+        self.game.player_data["Player2"]["loan"] = 1900
+        self.assertEqual(self.game.check_millionaires(), ["Player1"])
+        self.assertEqual(self.game.check_end_of_turn_bankruptcy(), [])
+
+        # Nobody trades; GOLD falls back under the target and TIN under the loan
+        self.game.share_prices["GOLD"] = 900
+        self.game.share_prices["TIN"] = 200
+        self.assertEqual(self.game.check_millionaires(), [])
+        self.assertEqual(
+            self.game.check_end_of_turn_bankruptcy(), ["Player2 IS BANKRUPT!"]
+        )
+        self.game.share_prices["GOLD"] = 1250
+        self.assertEqual(self.game.check_millionaires(), ["Player1"])
+
+    def test_interest_compounds_when_read(self):
+        self.game.player_data["Player1"]["loan"] = 700
+        self.game.player_data["Player2"]["loan"] = 9  # Too small to grow
+        self.assertEqual(self.game.check_end_of_turn_bankruptcy(), [])
+
+        # 700 -> 770 -> 847 -> 931 -> 1024: more than the 1000 balance
+        bankrupt_after = []
+        for rounds in range(1, 6):
+            self.game.collect_loan_interest()
+            if self.game.check_end_of_turn_bankruptcy():
+                bankrupt_after.append(rounds)
+        self.assertEqual(bankrupt_after, [4])
+
+        loan = 700
+        for _ in range(5):
+            loan += int(loan * 0.1)
+        self.assertEqual(self.game.player_data["Player1"]["loan"], loan)
+        self.assertEqual(self.game.player_data["Player2"]["loan"], 9)
+        self.game.player_data["Player1"]["loan"] = 100
+        self.game.collect_loan_interest()
+        self.assertEqual(self.game.player_data["Player1"].to_wire()["loan"], 110)
+
+    def test_split_skips_bankrupt_players(self):
+        for name in self.game.players:
+            self.game.player_data[name]["shares"]["LEAD"] = 5
+        version = self.game.version
+        self.game.split_share("LEAD")
+        self.game.player_data["Player3"]["bankrupt"] = True
+        self.game.split_share("LEAD")
+        self.game.issue_bonus("LEAD")
+        self.assertEqual(
+            [self.game.player_data[n]["shares"]["LEAD"] for n in self.game.players],
+            [30, 30, 15],
+        )
+        self.assertEqual(self.game.share_prices["LEAD"], 2)
+        patch = self.game.state_patch(version)
+        self.assertEqual(patch["players"]["Player1"]["shares"]["LEAD"], 30)
+
+    def test_running_totals_match_column_sums(self):
+        game = GameEngine(seed=7)
+        for i in range(6):
+            game.add_player(f"P{i}")
+        for _ in range(40):
+            name = game.get_current_player()
+            share = game.rng.choice(SHARES)
+            if not game.buy(name, share, game.rng.randint(1, 20))[0]:
+                game.sell(name, share, 1)
+            if game.rng.random() < 0.2:
+                game.player_data[name]["loan"] = 10**6
+                game.check_bankruptcy(name)  # Forced liquidation
+            game.end_turn()
+            self.assertEqual(
+                game.holdings.column_totals(),
+                {
+                    s: sum(p["shares"][s] for p in game.player_data.values())
+                    for s in SHARES
+                },
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
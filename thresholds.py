@@ -0,0 +1,165 @@
+"""
+Which players' net worth may have crossed zero (bankrupt) or the target value
+(won) since it was last computed, so the end of a turn only revalues those
+"""
+
+import heapq
+from operator import sub
+from typing import Callable, List, Optional, Set, Tuple
+
+# (drift, or interest round, at which the seat could first cross the line,
+#  seat, stamp)
+Entry = Tuple[int, int, int]
+
+
+class ThresholdIndex:
+    """
+    A seat's net worth is balance - loan + holdings . prices, linear in the
+    prices: if no price moved by more than d since it was computed, it moved
+    by at most d times the shares the seat holds. `drift` adds those d up, and
+    each seat waits in a heap keyed by the drift at which it could first
+    cross a line. Seats whose balance, loan or shares change are recorded
+    again by the caller; older heap entries are skipped by their stamp.
+
+    Splits and bonus issues change holdings without a write, but at most
+    double them: after n of them a seat holds at most 2**n times what it
+    held when recorded. So drift is counted in units of 2**-actions of a
+    price step, which keeps the bound exact in integers.
+
+    Loan interest only ever lowers net worth, by a known amount per round.
+    Where it pushes a seat towards a line, half the gap is left to interest
+    and half to prices, and the seat also waits in a heap keyed by the round
+    its loan has grown by its half.
+    """
+
+    def __init__(self, interest: Optional[Callable[[int], int]] = None):
+        self.interest = interest  # One round of interest on a loan
+        self.target: Optional[int] = None
+        self.drift = 0
+        self.actions = 0  # Splits and bonus issues so far
+        self.rounds = 0  # Rounds of interest charged so far
+        self.prices: List[int] = []  # Price vector drift was last advanced to
+        self.stamps: List[int] = []  # Per seat, the stamp of its live entries
+        self.lower: List[Entry] = []
+        self.upper: List[Entry] = []
+        self.charged: List[Entry] = []
+        self.broke: Set[int] = set()  # Active seats with net worth below 0
+        self.rich: Set[int] = set()  # Seats with net worth of at least target
+        self.rich_idle: Set[int] = set()  # The bankrupt ones among them
+        self.due: Set[int] = set()
+
+    def _move(self, prices: List[int]) -> None:
+        if self.prices:
+            step = max(map(abs, map(sub, prices, self.prices)))
+            self.drift += step << self.actions
+        self.prices = prices
+
+    def action(self, before: List[int], after: List[int], step: int) -> None:
+        """
+        A split or bonus issue that changed prices from before to after and
+        the value of any one share held by an active seat by at most step
+        """
+        self._move(before)
+        self.drift += step << self.actions
+        self.actions += 1
+        self.prices = after
+        if before != after:
+            # Bankrupt seats sit out splits and only lose the price drop
+            self.due.update(self.rich_idle)
+
+    def charge(self) -> None:
+        """A round of interest on every loan"""
+        self.rounds += 1
+        heap = self.charged
+        while heap and heap[0][0] <= self.rounds:
+            _, seat, stamp = heapq.heappop(heap)
+            if stamp == self.stamps[seat]:
+                self.due.add(seat)
+
+    def advance(self, prices: List[int]) -> Set[int]:
+        """Move to new prices; the seats that may have crossed a line"""
+        self._move(prices)
+        due, self.due = self.due, set()
+        for heap in (self.lower, self.upper):
+            while heap and heap[0][0] <= self.drift:
+                _, seat, stamp = heapq.heappop(heap)
+                if stamp == self.stamps[seat]:
+                    due.add(seat)
+        return due
+
+    def record(
+        self, seat: int, net: int, held: int, active: bool, loan: int = 0
+    ) -> None:
+        """A seat's exact net worth, share count and loan at the current prices"""
+        while len(self.stamps) <= seat:
+            self.stamps.append(0)
+        self.stamps[seat] += 1
+        stamp = self.stamps[seat]
+
+        if active and net < 0:
+            self.broke.add(seat)
+        else:
+            self.broke.discard(seat)
+        if net >= self.target:
+            self.rich.add(seat)
+        else:
+            self.rich.discard(seat)
+        if net >= self.target and not active:
+            self.rich_idle.add(seat)
+        else:
+            self.rich_idle.discard(seat)
+
+        if active:
+            if net >= 0:
+                self._watch(self.lower, seat, stamp, net + 1, held, loan)
+            else:
+                self._watch(self.lower, seat, stamp, -net, held)
+        if net < self.target:
+            self._watch(self.upper, seat, stamp, self.target - net, held)
+        else:
+            self._watch(self.upper, seat, stamp, net - self.target + 1, held, loan)
+        if len(self.lower) + len(self.upper) + len(self.charged) > (
+            6 * len(self.stamps) + 64
+        ):
+            self._compact()
+
+    def _watch(
+        self,
+        heap: List[Entry],
+        seat: int,
+        stamp: int,
+        gap: int,
+        held: int,
+        loan: int = 0,
+    ) -> None:
+        """
+        Wait for a seat gap away from a line; loan is given when interest
+        pushes it that way
+        """
+        growing = self.interest is not None and self.interest(loan) > 0
+        if growing:
+            share = (gap + 1) // 2 if held else gap  # Interest's part of the gap
+            heapq.heappush(self.charged, (self._round(loan, share), seat, stamp))
+            gap -= share
+        if held:
+            # Crossing needs held * (drift - now) >= gap in today's units,
+            # i.e. gap << actions in drift's
+            key = self.drift - (-(gap << self.actions) // held)
+            heapq.heappush(heap, (key, seat, stamp))
+
+    def _round(self, loan: int, amount: int) -> int:
+        """The interest round by which loan will have grown by amount"""
+        rounds = self.rounds
+        grown = 0
+        while grown < amount:
+            step = self.interest(loan)
+            loan += step
+            grown += step
+            rounds += 1
+        return rounds
+
+    def _compact(self) -> None:
+        """Drop entries of seats recorded again since"""
+        for heap in (self.lower, self.upper, self.charged):
+            heap[:] = [e for e in heap if e[2] == self.stamps[e[1]]]
+            heapq.heapify(heap)